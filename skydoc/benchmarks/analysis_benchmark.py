@@ -0,0 +1,174 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the analysis time of skylark_doc on a synthetic workspace.
+
+Generates a workspace with a graph of skylark_library targets and a
+skylark_doc target documenting all of them, then runs bazel build --nobuild
+on it. Packages are loaded once, by a warm-up run; each sample then changes
+a --define, which discards the analysis cache, so it measures the analysis
+of the whole graph, including the creation of the skylark_doc actions.
+"""
+
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+# internal imports
+
+import gflags
+
+gflags.DEFINE_string('skydoc_workspace', '',
+    'The root of the skydoc source tree, which the synthetic workspace uses '
+    'as @io_bazel_skydoc.')
+gflags.DEFINE_string('bazel', 'bazel', 'The bazel binary.')
+gflags.DEFINE_integer('packages', 200,
+    'The number of packages, each with a skylark_library.')
+gflags.DEFINE_integer('files_per_package', 10,
+    'The number of .bzl files of each skylark_library.')
+gflags.DEFINE_integer('deps_per_package', 3,
+    'The number of skylark_library targets, from earlier packages, that each '
+    'skylark_library depends on.')
+gflags.DEFINE_integer('repeat', 5,
+    'The number of times the analysis is run. The median time is reported.')
+gflags.DEFINE_bool('keep_workspace', False,
+    'Whether to keep the synthetic workspace, whose path is printed.')
+
+FLAGS = gflags.FLAGS
+
+_WORKSPACE = """\
+local_repository(
+    name = "io_bazel_skydoc",
+    path = "%s",
+)
+git_repository(
+    name = "io_bazel_rules_sass",
+    remote = "https://github.com/bazelbuild/rules_sass.git",
+    tag = "0.0.3",
+)
+git_repository(
+    name = "bazel_skylib",
+    remote = "https://github.com/bazelbuild/bazel-skylib.git",
+    tag = "0.2.0",
+)
+
+load("@io_bazel_rules_sass//sass:sass.bzl", "sass_repositories")
+sass_repositories()
+
+load("@io_bazel_skydoc//skylark:skylark.bzl", "skydoc_repositories")
+skydoc_repositories()
+"""
+
+_BZL_FILE = '''\
+"""Rules number %(index)d."""
+
+def _impl(ctx):
+  return struct()
+
+rule_%(index)d = rule(
+    implementation = _impl,
+    attrs = {"deps": attr.label_list()},
+)
+"""A rule.
+
+Args:
+  deps: The dependencies.
+"""
+'''
+
+
+def _write(path, content):
+  if not os.path.exists(os.path.dirname(path)):
+    os.makedirs(os.path.dirname(path))
+  with open(path, 'w') as f:
+    f.write(content)
+
+
+def make_workspace(root):
+  """Writes the synthetic workspace to root."""
+  rng = random.Random(0)
+  _write(os.path.join(root, 'WORKSPACE'),
+         _WORKSPACE % os.path.abspath(FLAGS.skydoc_workspace))
+  libraries = []
+  for i in range(FLAGS.packages):
+    package = 'pkg_%d' % i
+    srcs = []
+    for j in range(FLAGS.files_per_package):
+      src = 'rules_%d.bzl' % j
+      _write(os.path.join(root, package, src),
+             _BZL_FILE % {'index': i * FLAGS.files_per_package + j})
+      srcs.append(src)
+    deps = rng.sample(libraries, min(len(libraries), FLAGS.deps_per_package))
+    _write(os.path.join(root, package, 'BUILD'), textwrap.dedent("""\
+        load("@bazel_skylib//:skylark_library.bzl", "skylark_library")
+
+        skylark_library(
+            name = "lib",
+            srcs = %r,
+            deps = %r,
+            visibility = ["//visibility:public"],
+        )
+        """) % (srcs, sorted(deps)))
+    libraries.append('//%s:lib' % package)
+  _write(os.path.join(root, 'BUILD'), textwrap.dedent("""\
+      load("@io_bazel_skydoc//skylark:skylark.bzl", "skylark_doc")
+
+      filegroup(name = "dummy")
+
+      skylark_doc(
+          name = "docs",
+          srcs = %r,
+          format = "html",
+      )
+      """) % libraries)
+
+
+def _analyze(root, define):
+  start = time.time()
+  subprocess.check_call(
+      [FLAGS.bazel, 'build', '--nobuild', '--define=sample=%s' % define,
+       '//:docs'], cwd=root)
+  return time.time() - start
+
+
+def main(argv):
+  if not FLAGS.skydoc_workspace:
+    sys.stderr.write('--skydoc_workspace is required.')
+    sys.exit(1)
+
+  root = tempfile.mkdtemp()
+  try:
+    make_workspace(root)
+    # Fetches the external repositories and loads the packages.
+    _analyze(root, 'warmup')
+    times = sorted(_analyze(root, str(i)) for i in range(FLAGS.repeat))
+    subprocess.check_call([FLAGS.bazel, 'shutdown'], cwd=root)
+  finally:
+    if FLAGS.keep_workspace:
+      print('Workspace: %s' % root)
+    else:
+      shutil.rmtree(root)
+
+  print('Packages: %d, documented .bzl files: %d' %
+        (FLAGS.packages, FLAGS.packages * FLAGS.files_per_package))
+  print('Analysis: median %.2f s, slowest %.2f s' %
+        (times[len(times) // 2], times[-1]))
+
+
+if __name__ == '__main__':
+  main(FLAGS(sys.argv))
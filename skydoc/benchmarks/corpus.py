@@ -0,0 +1,215 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Generates synthetic corpora of .bzl files for benchmarks.
+
+Each file has a docstring, load()s a constant from some of the files before
+it, and defines documented rules, whose attributes use the loaded constants,
+and documented macros. The same seed and sizes always generate the same
+corpus.
+"""
+
+import os
+import random
+# internal imports
+
+# The package of the generated files, relative to the corpus root.
+PACKAGE = 'pkg'
+
+# Words that names and documentation are made of.
+_WORDS = [
+    'android', 'archive', 'binary', 'bundle', 'cc', 'compile', 'config',
+    'copts', 'data', 'defines', 'deps', 'docker', 'env', 'exports', 'flags',
+    'go', 'header', 'image', 'import', 'includes', 'java', 'jvm', 'library',
+    'linkopts', 'main', 'manifest', 'module', 'output', 'package', 'path',
+    'plugin', 'proto', 'python', 'resources', 'runtime', 'scala', 'srcs',
+    'strip', 'test', 'toolchain', 'visibility', 'web',
+]
+
+# Attribute constructors, and the value of their default, if any. {constant}
+# is replaced with a constant loaded from another file, if there is one.
+_ATTRIBUTES = [
+    'attr.label_list(allow_files = True)',
+    'attr.label(mandatory = True)',
+    'attr.string(default = {constant})',
+    'attr.string_list(default = [{constant}])',
+    'attr.int(default = 3)',
+    'attr.bool(default = True)',
+    'attr.output()',
+]
+
+
+class CorpusOptions(object):
+  """The sizes of a synthetic corpus."""
+
+  def __init__(self, files=100, rules_per_file=5, attrs_per_rule=10,
+               macros_per_file=3, macro_args=5, docstring_words=40,
+               load_fanout=3, seed=0):
+    """Inits CorpusOptions.
+
+    Args:
+      files: The number of .bzl files.
+      rules_per_file: The number of rules defined by each file.
+      attrs_per_rule: The number of attributes of each rule.
+      macros_per_file: The number of macros defined by each file.
+      macro_args: The number of arguments of each macro, besides name.
+      docstring_words: The number of words of the description of each file,
+        rule, macro, attribute and argument.
+      load_fanout: The number of earlier files each file load()s from.
+      seed: The seed of the random generator.
+    """
+    self.files = files
+    self.rules_per_file = rules_per_file
+    self.attrs_per_rule = attrs_per_rule
+    self.macros_per_file = macros_per_file
+    self.macro_args = macro_args
+    self.docstring_words = docstring_words
+    self.load_fanout = load_fanout
+    self.seed = seed
+
+  def to_dict(self):
+    return dict(self.__dict__)
+
+
+def _sentence(rng, words):
+  text = ' '.join(rng.choice(_WORDS) for _ in range(max(words, 1)))
+  return text.capitalize() + '.'
+
+
+def _wrap(text, indent, continuation_indent=None):
+  """Wraps text in lines of at most 80 characters.
+
+  The first line is indented with indent, and the others with
+  continuation_indent, which defaults to indent.
+  """
+  if continuation_indent is None:
+    continuation_indent = indent
+  lines = []
+  line = indent
+  for word in text.split():
+    if len(line) + len(word) + 1 > 80 and line.strip():
+      lines.append(line.rstrip())
+      line = continuation_indent
+    line += word + ' '
+  lines.append(line.rstrip())
+  return '\n'.join(lines)
+
+
+def _constant(index):
+  return 'CONSTANT_%d' % index
+
+
+def _file_name(index):
+  return 'rules_%d.bzl' % index
+
+
+def _bzl_file(rng, options, index):
+  """Returns the content of the index-th file."""
+  loaded = sorted(rng.sample(range(index), min(index, options.load_fanout)))
+  words = options.docstring_words
+  lines = [
+      '"""Synthetic rules %d.' % index,
+      '',
+      _wrap(_sentence(rng, words), ''),
+      '"""',
+      '',
+  ]
+  for loaded_index in loaded:
+    lines.append('load(":%s", "%s")' % (_file_name(loaded_index),
+                                        _constant(loaded_index)))
+  lines += [
+      '',
+      '%s = "%s"' % (_constant(index), rng.choice(_WORDS)),
+      '',
+      'def _impl(ctx):',
+      '  return struct()',
+      '',
+  ]
+
+  for rule_index in range(options.rules_per_file):
+    name = '%s_%d_%d' % (rng.choice(_WORDS), index, rule_index)
+    attrs = []
+    docs = []
+    for attr_index in range(options.attrs_per_rule):
+      attr_name = '%s_%d' % (rng.choice(_WORDS), attr_index)
+      constant = (_constant(rng.choice(loaded)) if loaded else
+                  '"%s"' % rng.choice(_WORDS))
+      attrs.append('        "%s": %s,' % (
+          attr_name, rng.choice(_ATTRIBUTES).format(constant=constant)))
+      docs.append(_wrap('%s: %s' % (attr_name, _sentence(rng, words)),
+                        '  ', '    '))
+    lines += [
+        '%s = rule(' % name,
+        '    implementation = _impl,',
+        '    attrs = {',
+    ] + attrs + [
+        '    },',
+        ')',
+        '"""%s' % _sentence(rng, 4),
+        '',
+        _wrap(_sentence(rng, words), ''),
+        '',
+        'Args:',
+        '  name: A unique name for this rule.',
+    ] + docs + [
+        '"""',
+        '',
+    ]
+
+  for macro_index in range(options.macros_per_file):
+    name = '%s_macro_%d_%d' % (rng.choice(_WORDS), index, macro_index)
+    args = ['arg_%d' % i for i in range(options.macro_args)]
+    lines += [
+        'def %s(%s):' % (name, ', '.join(
+            ['name'] + ['%s = None' % arg for arg in args] + ['**kwargs'])),
+        '  """%s' % _sentence(rng, 4),
+        '',
+        _wrap(_sentence(rng, words), '  '),
+        '',
+        '  Args:',
+        '    name: A unique name for this rule.',
+    ] + [_wrap('%s: %s' % (arg, _sentence(rng, words)), '    ', '      ')
+         for arg in args] + [
+        '    **kwargs: Attributes of the underlying rule.',
+        '  """',
+        '  pass',
+        '',
+    ]
+  return '\n'.join(lines)
+
+
+def generate(root, options):
+  """Writes a synthetic corpus to root.
+
+  Args:
+    root: The directory to write the corpus to, which is the workspace root
+      the files' load()s are relative to.
+    options: The CorpusOptions.
+
+  Returns:
+    The list of the paths of the .bzl files, relative to root.
+  """
+  rng = random.Random(options.seed)
+  package_dir = os.path.join(root, PACKAGE)
+  if not os.path.exists(package_dir):
+    os.makedirs(package_dir)
+  with open(os.path.join(package_dir, 'BUILD'), 'w') as f:
+    f.write('')
+  paths = []
+  for index in range(options.files):
+    path = os.path.join(PACKAGE, _file_name(index))
+    with open(os.path.join(root, path), 'w') as f:
+      f.write(_bzl_file(rng, options, index))
+    paths.append(path)
+  return paths
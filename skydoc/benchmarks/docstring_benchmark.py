@@ -0,0 +1,93 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of common.parse_docstring on docstrings of increasing length.
+
+Prints the time taken to parse docstrings with a growing number of documented
+attributes. Parsing is linear in the length of the docstring, so the time per
+line should stay roughly constant as the docstrings grow.
+"""
+
+import sys
+import timeit
+# internal imports
+
+import gflags
+
+from skydoc import common
+
+gflags.DEFINE_integer('min_attributes', 500,
+    'The number of attributes documented in the smallest docstring.')
+gflags.DEFINE_integer('steps', 6,
+    'The number of docstring sizes to measure. Each size doubles the number '
+    'of attributes of the previous one.')
+gflags.DEFINE_integer('repeat', 5,
+    'The number of times each docstring is parsed. The fastest time is '
+    'reported.')
+gflags.DEFINE_float('max_slowdown', 0,
+    'If set, exit with an error if the time per line of the largest '
+    'docstring is more than this many times that of the smallest one.')
+
+FLAGS = gflags.FLAGS
+
+
+def make_docstring(num_attributes):
+  """Returns a docstring documenting num_attributes attributes."""
+  lines = [
+      'A macro with many attributes.',
+      '',
+      'Generated macros can have very long docstrings.',
+      '',
+      'Args:',
+  ]
+  for i in range(num_attributes):
+    lines.append('  attr_%d: The first line of the description of attribute '
+                 '%d, which' % (i, i))
+    lines.append('    continues on a second line with <b>markup</b> & more')
+    lines.append('    and ends on a third one.')
+  lines.extend([
+      '',
+      'Outputs:',
+      '  out: The output.',
+      '',
+      'Example:',
+      '  foo(name = "foo")',
+  ])
+  return '\n'.join(lines)
+
+
+def main(argv):
+  print('%12s %10s %12s %14s' % ('attributes', 'lines', 'seconds',
+                                 'us per line'))
+  per_line = []
+  num_attributes = FLAGS.min_attributes
+  for _ in range(FLAGS.steps):
+    doc = make_docstring(num_attributes)
+    num_lines = doc.count('\n') + 1
+    seconds = min(timeit.repeat(lambda: common.parse_docstring(doc),
+                                repeat=FLAGS.repeat, number=1))
+    per_line.append(seconds / num_lines)
+    print('%12d %10d %12.4f %14.3f' % (num_attributes, num_lines, seconds,
+                                       per_line[-1] * 1e6))
+    num_attributes *= 2
+
+  slowdown = per_line[-1] / per_line[0]
+  print('Time per line of the largest docstring is %.2fx that of the '
+        'smallest.' % slowdown)
+  if FLAGS.max_slowdown and slowdown > FLAGS.max_slowdown:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main(FLAGS(sys.argv))
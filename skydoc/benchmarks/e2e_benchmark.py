@@ -0,0 +1,203 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Times skydoc end to end on a synthetic corpus and checks for regressions.
+
+Generates a corpus with corpus.generate and times main.main on it for each
+configuration: Markdown and HTML, written to a zip archive and to a
+directory. All runs share one process, like the actions of a persistent
+worker, but the memoized Markdown is cleared before each run. The median
+time of each configuration is compared with the baseline, by default
+e2e_baseline.json next to this file, and the benchmark fails if it is slower
+than the baseline by more than the threshold.
+
+Times depend on the machine, so the baseline should be recorded, with
+--update_baseline, on the machine the benchmark is run on. The baseline is
+only compared with runs on a corpus of the same sizes.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+# internal imports
+
+import gflags
+
+from skydoc import main as skydoc_main
+from skydoc import template_loader
+from skydoc.benchmarks import corpus
+
+gflags.DEFINE_integer('files', 100, 'The number of .bzl files.')
+gflags.DEFINE_integer('rules_per_file', 5,
+    'The number of rules defined by each file.')
+gflags.DEFINE_integer('attrs_per_rule', 10,
+    'The number of attributes of each rule.')
+gflags.DEFINE_integer('macros_per_file', 3,
+    'The number of macros defined by each file.')
+gflags.DEFINE_integer('macro_args', 5,
+    'The number of arguments of each macro, besides name.')
+gflags.DEFINE_integer('docstring_words', 40,
+    'The number of words of each description.')
+gflags.DEFINE_integer('load_fanout', 3,
+    'The number of earlier files each file load()s from.')
+gflags.DEFINE_integer('seed', 0, 'The seed of the corpus generator.')
+gflags.DEFINE_bool('benchmark_resolve_loads', False,
+    'Whether to run skydoc with --resolve_loads, which evaluates the loaded '
+    'files.')
+gflags.DEFINE_integer('repeat', 5,
+    'The number of timed runs of each configuration. The median time is '
+    'compared with the baseline.')
+gflags.DEFINE_string('baseline',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                 'e2e_baseline.json'),
+    'The JSON file holding the baseline times and regression thresholds.')
+gflags.DEFINE_bool('update_baseline', False,
+    'Write the times of this run to --baseline instead of comparing them.')
+gflags.DEFINE_float('threshold', 0,
+    'If set, the fraction by which a configuration may be slower than the '
+    'baseline, instead of the threshold stored in the baseline.')
+
+FLAGS = gflags.FLAGS
+
+# The default fraction by which a configuration may be slower than the
+# baseline.
+DEFAULT_THRESHOLD = 0.25
+
+# (name, format, zip) of the configurations timed.
+CONFIGS = [
+    ('markdown-zip', 'markdown', True),
+    ('markdown-dir', 'markdown', False),
+    ('html-zip', 'html', True),
+    ('html-dir', 'html', False),
+]
+
+
+def _run_skydoc(argv):
+  """Runs skydoc in process, as a persistent worker does."""
+  try:
+    skydoc_main.main(skydoc_main.FLAGS(argv))
+  finally:
+    skydoc_main.FLAGS.Reset()
+
+
+def time_config(root, bzl_files, output_format, output_zip, resolve_loads,
+                repeat):
+  """Returns the sorted times of repeat runs of skydoc in a configuration."""
+  times = []
+  for _ in range(repeat):
+    output_dir = tempfile.mkdtemp()
+    try:
+      argv = ['skydoc', '--format=%s' % output_format, '--overview',
+              '--strip_prefix=%s' % os.path.join(root, corpus.PACKAGE)]
+      if output_zip:
+        argv.append('--output_file=%s' % os.path.join(output_dir, 'docs.zip'))
+      else:
+        argv += ['--zip=false', '--output_dir=%s' % output_dir]
+      if resolve_loads:
+        argv += ['--resolve_loads', '--workspace_root=%s' % root]
+      template_loader.markdown_filter.clear()
+      start = time.time()
+      _run_skydoc(argv + bzl_files)
+      times.append(time.time() - start)
+    finally:
+      shutil.rmtree(output_dir)
+  return sorted(times)
+
+
+def compare(results, baseline, threshold=None):
+  """Compares the median times of results with those of baseline.
+
+  Args:
+    results: Dict mapping each configuration to its median time in seconds.
+    baseline: The baseline, as written by --update_baseline.
+    threshold: If set, overrides the threshold of the baseline.
+
+  Returns:
+    The list of (config, time, baseline time, limit) tuples of the
+    configurations that regressed.
+  """
+  threshold = threshold or baseline.get('threshold', DEFAULT_THRESHOLD)
+  regressions = []
+  for config, median in sorted(results.iteritems()):
+    baseline_median = baseline['median_s'].get(config)
+    if baseline_median is None:
+      continue
+    limit = baseline_median * (1 + threshold)
+    if median > limit:
+      regressions.append((config, median, baseline_median, limit))
+  return regressions
+
+
+def main(argv):
+  # The flags are shared with skydoc, whose runs reset them.
+  options = corpus.CorpusOptions(
+      FLAGS.files, FLAGS.rules_per_file, FLAGS.attrs_per_rule,
+      FLAGS.macros_per_file, FLAGS.macro_args, FLAGS.docstring_words,
+      FLAGS.load_fanout, FLAGS.seed)
+  resolve_loads = FLAGS.benchmark_resolve_loads
+  repeat = FLAGS.repeat
+  baseline_path = FLAGS.baseline
+  update_baseline = FLAGS.update_baseline
+  threshold = FLAGS.threshold
+
+  root = tempfile.mkdtemp()
+  try:
+    bzl_files = [os.path.join(root, path)
+                 for path in corpus.generate(root, options)]
+    # Imports and templates are loaded by the first run.
+    time_config(root, bzl_files, 'html', True, resolve_loads, 1)
+    results = {}
+    for name, output_format, output_zip in CONFIGS:
+      times = time_config(root, bzl_files, output_format, output_zip,
+                          resolve_loads, repeat)
+      results[name] = times[len(times) // 2]
+      print('%-13s median %.3f s, %.0f files/s, fastest %.3f s' %
+            (name, results[name], options.files / results[name], times[0]))
+  finally:
+    shutil.rmtree(root)
+
+  corpus_options = options.to_dict()
+  corpus_options['resolve_loads'] = resolve_loads
+  if update_baseline:
+    with open(baseline_path, 'w') as f:
+      json.dump({
+          'corpus': corpus_options,
+          'threshold': threshold or DEFAULT_THRESHOLD,
+          'median_s': dict((config, round(median, 4))
+                           for config, median in results.iteritems()),
+      }, f, indent=2, separators=(',', ': '), sort_keys=True)
+      f.write('\n')
+    print('Wrote %s' % baseline_path)
+    return
+
+  with open(baseline_path) as f:
+    baseline = json.load(f)
+  if baseline['corpus'] != corpus_options:
+    print('Not comparing with %s, which is for a different corpus: %s' %
+          (baseline_path, json.dumps(baseline['corpus'], sort_keys=True)))
+    return
+  regressions = compare(results, baseline, threshold)
+  for config, median, baseline_median, limit in regressions:
+    print('REGRESSION: %s took %.3f s, more than %.3f s (baseline %.3f s)' %
+          (config, median, limit, baseline_median))
+  if regressions:
+    sys.exit(1)
+  print('No regression from %s.' % baseline_path)
+
+
+if __name__ == '__main__':
+  main(FLAGS(sys.argv))
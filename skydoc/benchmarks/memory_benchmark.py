@@ -0,0 +1,113 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reports the memory retained by the rule.RuleSet view model.
+
+Builds RuleSets for a synthetic set of BuildLanguage protos the way main does,
+dropping each proto once its RuleSet is built, and reports the memory still
+allocated while all RuleSets are alive, as they are until every page is
+written. Run it before and after a change to rule.py to compare.
+
+Memory is measured with tracemalloc where available. Otherwise, the growth of
+the resident set size of the process is reported.
+"""
+
+import gc
+import resource
+import sys
+# internal imports
+
+import gflags
+
+from skydoc import build_pb2
+from skydoc import rule
+
+try:
+  import tracemalloc
+except ImportError:
+  tracemalloc = None
+
+gflags.DEFINE_integer('rulesets', 200, 'The number of rule sets.')
+gflags.DEFINE_integer('rules', 20, 'The number of rules per rule set.')
+gflags.DEFINE_integer('attributes', 30, 'The number of attributes per rule.')
+
+FLAGS = gflags.FLAGS
+
+_ATTRIBUTE_TYPES = [
+    build_pb2.Attribute.LABEL_LIST,
+    build_pb2.Attribute.STRING,
+    build_pb2.Attribute.BOOLEAN,
+    build_pb2.Attribute.LABEL,
+]
+
+
+def make_language(index):
+  """Returns a synthetic BuildLanguage proto."""
+  language = build_pb2.BuildLanguage()
+  for i in range(FLAGS.rules):
+    rule_proto = language.rule.add()
+    rule_proto.name = 'rule_%d_%d' % (index, i)
+    rule_proto.type = build_pb2.RuleDefinition.RULE
+    rule_proto.documentation = (
+        'Rule %d of rule set %d.\n\nLonger description of the rule.' %
+        (i, index))
+    for j in range(FLAGS.attributes):
+      attribute = rule_proto.attribute.add()
+      attribute.name = 'name' if j == 0 else 'attr_%d' % j
+      attribute.type = _ATTRIBUTE_TYPES[j % len(_ATTRIBUTE_TYPES)]
+      attribute.mandatory = j == 0
+      attribute.documentation = 'Documentation of attribute %d.' % j
+      if j % 2:
+        attribute.default = "''"
+  return language
+
+
+def _resident_bytes():
+  """Returns the resident set size of the process in bytes."""
+  try:
+    with open('/proc/self/statm') as f:
+      return int(f.read().split()[1]) * resource.getpagesize()
+  except IOError:
+    # Only the peak is available, in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _allocated_bytes():
+  gc.collect()
+  if tracemalloc:
+    return tracemalloc.get_traced_memory()[0]
+  return _resident_bytes()
+
+
+def main(argv):
+  if tracemalloc:
+    tracemalloc.start()
+  before = _allocated_bytes()
+  rulesets = []
+  for i in range(FLAGS.rulesets):
+    rulesets.append(rule.RuleSet('pkg/rules_%d.bzl' % i, make_language(i),
+                                 'Rules %d' % i, '', '', 'html'))
+  after = _allocated_bytes()
+
+  num_attributes = FLAGS.rulesets * FLAGS.rules * FLAGS.attributes
+  print('Method: %s' % ('tracemalloc' if tracemalloc else 'resident set size'))
+  print('Rule sets: %d, rules: %d, attributes: %d' %
+        (FLAGS.rulesets, FLAGS.rulesets * FLAGS.rules, num_attributes))
+  print('Retained: %.1f MB (%d bytes per attribute)' %
+        ((after - before) / 1024.0 / 1024.0, (after - before) / num_attributes))
+  return rulesets
+
+
+if __name__ == '__main__':
+  main(FLAGS(sys.argv))
@@ -0,0 +1,148 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reports the size of the search index and the cost of a lookup.
+
+Indexes a synthetic set of rule sets with search_index.SearchIndex, and
+reports the sizes of the shards and the time the search page needs to decode
+the shards a query loads and intersect their document IDs, which is done
+here the same way. The time to download the shards is not included; it is
+proportional to their size.
+"""
+
+import json
+import random
+import sys
+import time
+# internal imports
+
+import gflags
+
+from skydoc import build_pb2
+from skydoc import rule
+from skydoc import search_index
+
+gflags.DEFINE_integer('rulesets', 100, 'The number of rule sets.')
+gflags.DEFINE_integer('rules', 20, 'The number of rules per rule set.')
+gflags.DEFINE_integer('attributes', 25, 'The number of attributes per rule.')
+gflags.DEFINE_integer('queries', 200, 'The number of random queries run.')
+
+FLAGS = gflags.FLAGS
+
+# Words that names and descriptions are made of.
+_WORDS = [
+    'android', 'archive', 'binary', 'bundle', 'cc', 'compile', 'config',
+    'copts', 'data', 'defines', 'deps', 'docker', 'env', 'exports', 'flags',
+    'go', 'header', 'image', 'import', 'includes', 'java', 'jvm', 'library',
+    'linkopts', 'main', 'manifest', 'module', 'output', 'package', 'path',
+    'plugin', 'proto', 'python', 'resources', 'runtime', 'scala', 'srcs',
+    'strip', 'test', 'toolchain', 'visibility', 'web',
+]
+
+
+def _name(rng, words):
+  return '_'.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _sentence(rng):
+  return ' '.join(rng.choice(_WORDS) for _ in range(12)).capitalize() + '.'
+
+
+def make_ruleset(rng, index):
+  """Returns a synthetic RuleSet."""
+  language = build_pb2.BuildLanguage()
+  for i in range(FLAGS.rules):
+    rule_proto = language.rule.add()
+    rule_proto.name = '%s_%d' % (_name(rng, 2), i)
+    rule_proto.type = build_pb2.RuleDefinition.RULE
+    rule_proto.documentation = _sentence(rng)
+    for j in range(FLAGS.attributes):
+      attribute = rule_proto.attribute.add()
+      attribute.name = '%s_%d' % (_name(rng, 2), j)
+      attribute.type = build_pb2.Attribute.STRING
+      attribute.documentation = _sentence(rng)
+  return rule.RuleSet('pkg/rules_%d.bzl' % index, language,
+                      'Rules %d' % index, _sentence(rng), '', 'html')
+
+
+def _load(files, name):
+  """Decodes a shard the way the search page does."""
+  content = files.get('%s/%s.js' % (search_index.SEARCH_DIR, name))
+  if content is None:
+    return {}
+  return json.loads(content[content.index(',') + 1:content.rindex(')')])
+
+
+def lookup(files, shards, query):
+  """Returns the IDs of the documents matching every word of query."""
+  result = None
+  for word in query.lower().split():
+    prefix = word[:search_index.PREFIX_LENGTH]
+    matches = set()
+    for key in shards:
+      if not key.startswith(prefix) and not prefix.startswith(key):
+        continue
+      for token, deltas in _load(files, 't_' + key).iteritems():
+        if token.startswith(word):
+          doc_id = 0
+          for delta in deltas:
+            doc_id += delta
+            matches.add(doc_id)
+    result = matches if result is None else result & matches
+  return result or set()
+
+
+def main(argv):
+  rng = random.Random(0)
+  rulesets = [make_ruleset(rng, i) for i in range(FLAGS.rulesets)]
+
+  files = {}
+  def add_file(path, content):
+    files[path] = content
+
+  start = time.time()
+  index = search_index.SearchIndex(lambda output_file: output_file + '.html')
+  for ruleset in rulesets:
+    index.add_ruleset(add_file, ruleset)
+  shards = index.finish(add_file)
+  build_time = time.time() - start
+
+  token_sizes = sorted(len(content) for path, content in files.iteritems()
+                       if '/t_' in path)
+  doc_sizes = sorted(len(content) for path, content in files.iteritems()
+                     if '/d_' in path)
+
+  times = []
+  for _ in range(FLAGS.queries):
+    query = ' '.join(rng.choice(_WORDS)[:rng.randint(2, 6)]
+                     for _ in range(rng.randint(1, 2)))
+    start = time.time()
+    lookup(files, shards, query)
+    times.append(time.time() - start)
+  times.sort()
+
+  print('Documents: %d, attributes: %d' %
+        (index.num_docs, FLAGS.rulesets * FLAGS.rules * FLAGS.attributes))
+  print('Index built in %.2f s' % build_time)
+  print('Token shards: %d, median %d bytes, largest %d bytes' %
+        (len(token_sizes), token_sizes[len(token_sizes) // 2],
+         token_sizes[-1]))
+  print('Document shards: %d, largest %d bytes' %
+        (len(doc_sizes), doc_sizes[-1]))
+  print('Lookup: median %.1f ms, slowest %.1f ms' %
+        (times[len(times) // 2] * 1000, times[-1] * 1000))
+
+
+if __name__ == '__main__':
+  main(FLAGS(sys.argv))
@@ -0,0 +1,96 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the cold start cost of compiled and precompiled templates.
+
+Each sample runs in a fresh Python process, which creates the Jinja
+environment and loads every template, as skydoc does on its first action.
+Templates are either compiled from their .jinja sources or loaded from an
+archive written by template_loader.compile_templates. The time to import
+jinja2 itself is not included.
+"""
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+# internal imports
+
+import gflags
+
+from skydoc import template_loader
+
+gflags.DEFINE_integer('repeat', 20,
+    'The number of processes started for each loader. The median time is '
+    'reported.')
+gflags.DEFINE_string('template_dir',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 'templates'),
+    'The directory containing the .jinja templates.')
+gflags.DEFINE_bool('child', False,
+    'Internal: loads the templates once and prints the time taken.')
+gflags.DEFINE_string('compiled_templates', '',
+    'Internal: the archive of precompiled templates loaded by --child, or '
+    'empty to compile the templates from their sources.')
+
+FLAGS = gflags.FLAGS
+
+
+def _load_templates():
+  start = time.time()
+  env = template_loader.create_environment(
+      FLAGS.template_dir, FLAGS.compiled_templates, '', 'html')
+  for path in glob.glob(os.path.join(FLAGS.template_dir, '*.jinja')):
+    env.get_template(os.path.basename(path))
+  print(time.time() - start)
+
+
+def _median_time(compiled_templates):
+  times = []
+  for _ in range(FLAGS.repeat):
+    output = subprocess.check_output([
+        sys.executable, '-m', 'skydoc.benchmarks.startup_benchmark',
+        '--child', '--compiled_templates=%s' % compiled_templates,
+        '--template_dir=%s' % FLAGS.template_dir])
+    times.append(float(output))
+  times.sort()
+  return times[len(times) // 2]
+
+
+def main(argv):
+  if FLAGS.child:
+    _load_templates()
+    return
+
+  temp_dir = tempfile.mkdtemp()
+  try:
+    compiled_templates = os.path.join(temp_dir, 'compiled_templates.zip')
+    template_loader.compile_templates(
+        glob.glob(os.path.join(FLAGS.template_dir, '*.jinja')),
+        compiled_templates)
+    from_sources = _median_time('')
+    precompiled = _median_time(compiled_templates)
+  finally:
+    shutil.rmtree(temp_dir)
+
+  print('Templates compiled at startup: %.1f ms' % (from_sources * 1000))
+  print('Precompiled templates:         %.1f ms' % (precompiled * 1000))
+  print('Speedup: %.1fx' % (from_sources / precompiled))
+
+
+if __name__ == '__main__':
+  main(FLAGS(sys.argv))
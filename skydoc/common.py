@@ -14,6 +14,7 @@
 
 """Common functions for skydoc."""
 
+import ast
 import re
 import textwrap
 from xml.sax.saxutils import escape
@@ -44,6 +45,19 @@ def leading_whitespace(line):
   return len(line) - len(line.lstrip())
 
 
+def parse_bzl(bzl_file):
+  """Reads and parses the given .bzl file.
+
+  Args:
+    bzl_file: The .bzl file to parse.
+
+  Returns:
+    The ast.Module for the .bzl file.
+  """
+  with open(bzl_file) as f:
+    return ast.parse(f.read(), bzl_file)
+
+
 def validate_strip_prefix(strip_prefix, bzl_files):
   if not strip_prefix:
     return strip_prefix
@@ -56,91 +70,38 @@ def validate_strip_prefix(strip_prefix, bzl_files):
           % (path, strip_prefix))
   return prefix
 
-def _parse_attribute_docs(attr_docs, lines, index):
-  """Extracts documentation in the form of name: description.
-
-  This includes documentation for attributes and outputs.
-
-  Args:
-    attr_docs: A dict used to store the extracted documentation.
-    lines: List containing the input docstring split into lines.
-    index: The index in lines containing the heading that begins the
-        documentation, such as "Args:" or "Outputs:".
-
-  Returns:
-    Returns the next index after the documentation to resume processing
-    documentation in the caller.
-  """
-  attr = None  # Current attribute name
-  desc = None  # Description for current attribute
-  args_leading_ws = leading_whitespace(lines[index])
-  i = index + 1
-  while i < len(lines):
-    line = lines[i]
-    # If a blank line is encountered, we have finished parsing the "Args"
-    # section.
-    if line.strip() and leading_whitespace(line) == args_leading_ws:
-      break
-    # In practice, users sometimes add a "-" prefix, so we strip it even
-    # though it is not recommended by the style guide
-    pattern = re.compile(r"""
-        # Any amount of leading whitespace, plus an optional "-" prefix.
-        ^\s*-?\s*
-        # The attribute name, plus an optional "**" prefix for a **kwargs
-        # attribute.
-        ((?:\*\*)?[`\{\}\%\.\w\*]+)
-        # A colon plus any amount of whitespace to separate the attribute name
-        # from the description text.
-        :\s*
-        # The attribute description text.
-        (.*)
-    """, re.VERBOSE)
-    match = re.search(pattern, line)
-    if match:  # We have found a new attribute
-      if attr:
-        attr_docs[attr] = escape(desc)
-      attr, desc = match.group(1), match.group(2)
-    elif attr:
-      # Merge documentation when it is multiline
-      desc = desc + "\n" + line.strip()
-    i += + 1
-
-  if attr:
-    attr_docs[attr] = escape(desc).strip()
-
-  return i
-
-
-def _parse_example_docs(examples, lines, index):
-  """Extracts example documentation.
-
-  Args:
-    examples: A list to contain the lines containing the example documentation.
-    lines: List containing the input docstring split into lines.
-    index: The index in lines containing "Example[s]:", which begins the
-        example documentation.
-
-  Returns:
-    Returns the next index after the attribute documentation to resume
-    processing documentation in the caller.
-  """
-  heading_leading_ws = leading_whitespace(lines[index])
-  i = index + 1
-  while i < len(lines):
-    line = lines[i]
-    if line.strip() and leading_whitespace(line) == heading_leading_ws:
-      break
-    examples.append(line)
-    i += 1
-
-  return i
+# In practice, users sometimes add a "-" prefix, so we strip it even though it
+# is not recommended by the style guide.
+_ATTRIBUTE_PATTERN = re.compile(r"""
+    # Any amount of leading whitespace, plus an optional "-" prefix.
+    ^\s*-?\s*
+    # The attribute name, plus an optional "**" prefix for a **kwargs
+    # attribute.
+    ((?:\*\*)?[`\{\}\%\.\w\*]+)
+    # A colon plus any amount of whitespace to separate the attribute name
+    # from the description text.
+    :\s*
+    # The attribute description text.
+    (.*)
+""", re.VERBOSE)
+"""Matches the first line of the documentation of an attribute or output."""
+
+# States of the docstring parser.
+_DESCRIPTION = 0
+_ATTRIBUTES = 1
+_EXAMPLES = 2
 
 
 def parse_docstring(doc):
   """Analyzes the documentation string for attributes.
 
   This looks for the "Args:" separator to fetch documentation for each
-  attribute. The "Args" section ends at the first blank line.
+  attribute. The "Args" section ends at the first line indented like its
+  heading. "Outputs:" and "Example[s]:" sections are handled the same way.
+
+  The docstring is parsed in a single pass over its lines, and multiline
+  descriptions are accumulated in lists that are joined once, so parsing time
+  is linear in the length of the docstring.
 
   Args:
     doc: The documentation string
@@ -152,23 +113,48 @@ def parse_docstring(doc):
   attr_docs = {}
   output_docs = {}
   examples = []
-  lines = doc.split("\n")
   docs = []
-  i = 0
-  while i < len(lines):
-    line = lines[i]
-    if line.strip() == ARGS_HEADING:
-      i = _parse_attribute_docs(attr_docs, lines, i)
-      continue
-    elif line.strip() == EXAMPLES_HEADING or line.strip() == EXAMPLE_HEADING:
-      i = _parse_example_docs(examples, lines, i)
-      continue
-    elif line.strip() == OUTPUTS_HEADING:
-      i = _parse_attribute_docs(output_docs, lines, i)
-      continue
-
-    docs.append(line)
-    i += 1
+
+  state = _DESCRIPTION
+  heading_leading_ws = 0
+  section = None  # The dict the current attribute section is stored in.
+  attr = None  # Current attribute name
+  desc = None  # List of the lines of the description of the current attribute
+  for line in doc.split("\n"):
+    stripped = line.strip()
+    if (state != _DESCRIPTION and stripped and
+        leading_whitespace(line) == heading_leading_ws):
+      # A line indented like the heading ends the section.
+      if attr:
+        section[attr] = escape("\n".join(desc)).strip()
+        attr = None
+      state = _DESCRIPTION
+
+    if state == _DESCRIPTION:
+      if stripped == ARGS_HEADING or stripped == OUTPUTS_HEADING:
+        state = _ATTRIBUTES
+        section = attr_docs if stripped == ARGS_HEADING else output_docs
+        heading_leading_ws = leading_whitespace(line)
+      elif stripped == EXAMPLES_HEADING or stripped == EXAMPLE_HEADING:
+        state = _EXAMPLES
+        heading_leading_ws = leading_whitespace(line)
+      else:
+        docs.append(line)
+    elif state == _ATTRIBUTES:
+      match = _ATTRIBUTE_PATTERN.match(line)
+      if match:  # We have found a new attribute
+        if attr:
+          section[attr] = escape("\n".join(desc))
+        attr = match.group(1)
+        desc = [match.group(2)]
+      elif attr:
+        # Merge documentation when it is multiline
+        desc.append(stripped)
+    else:
+      examples.append(line)
+
+  if attr:
+    section[attr] = escape("\n".join(desc)).strip()
 
   doc = "\n".join(docs).strip()
   examples_doc = textwrap.dedent("\n".join(examples)).strip()
@@ -0,0 +1,37 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Precompiles the skydoc templates given on the command line."""
+
+import sys
+# internal imports
+import gflags
+
+from skydoc import template_loader
+
+gflags.DEFINE_string('output_file', '',
+    'The zip archive of precompiled templates to write.')
+
+FLAGS = gflags.FLAGS
+
+
+def main(argv):
+  if not FLAGS.output_file:
+    sys.stderr.write('--output_file is required.')
+    sys.exit(1)
+  template_loader.compile_templates(argv[1:], FLAGS.output_file)
+
+
+if __name__ == '__main__':
+  main(FLAGS(sys.argv))
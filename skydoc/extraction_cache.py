@@ -0,0 +1,181 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent, content-addressed cache of extracted documentation."""
+
+import hashlib
+import inspect
+import os
+import tempfile
+# internal imports
+
+from skydoc import common
+from skydoc import file_extractor
+from skydoc import load_extractor
+from skydoc import macro_extractor
+from skydoc import manifest
+from skydoc import module_loader
+from skydoc import rule_extractor
+from skydoc import static_rule_extractor
+from skydoc.stubs import attr
+from skydoc.stubs import skylark_globals
+
+CACHE_VERSION = '1'
+"""Bump to invalidate all existing cache entries."""
+
+FINGERPRINTED_MODULES = [
+    attr,
+    skylark_globals,
+    common,
+    file_extractor,
+    load_extractor,
+    macro_extractor,
+    module_loader,
+    rule_extractor,
+    static_rule_extractor,
+]
+"""Modules whose source determines the documentation extracted from a file."""
+
+
+def stubs_fingerprint():
+  """Returns a fingerprint of the Skylark stubs and the extractors.
+
+  Any change to the stubs or to the code that extracts documentation changes
+  the fingerprint, which invalidates all cache entries created by a different
+  version of skydoc.
+  """
+  digest = hashlib.sha256(CACHE_VERSION)
+  for module in FINGERPRINTED_MODULES:
+    digest.update(module.__name__)
+    digest.update(inspect.getsource(module))
+  return digest.hexdigest()
+
+
+class ExtractionCache(object):
+  """On-disk cache of ExtractedFile protos keyed by the content of a file.
+
+  Each entry is stored in its own file under cache_dir. The modification time
+  of an entry is updated whenever it is used, and the least recently used
+  entries are evicted once the total size of the cache exceeds max_size.
+
+  Entries for files whose load()ed symbols were resolved record the digests of
+  the files they loaded, and are only used while those files are unchanged.
+  """
+
+  def __init__(self, cache_dir, max_size, options='', workspace_root='',
+               resolve_loads=False):
+    """Inits ExtractionCache.
+
+    Args:
+      cache_dir: The directory to store cache entries in.
+      max_size: The maximum total size of the cache entries in bytes.
+      options: String describing the extraction options, such as whether
+        load()ed symbols are resolved. Entries are only shared between runs
+        with the same options.
+      workspace_root: The directory that the paths of load()ed files are
+        relative to.
+      resolve_loads: Whether load()ed symbols are resolved. Relative labels
+        are then resolved against the package of the loading file, so its path
+        is part of the key.
+    """
+    self.__cache_dir = cache_dir
+    self.__max_size = max_size
+    self.__workspace_root = workspace_root
+    self.__resolve_loads = resolve_loads
+    digest = hashlib.sha256(stubs_fingerprint())
+    digest.update(options)
+    self.__fingerprint = digest.hexdigest()
+    self.hits = 0
+    self.misses = 0
+
+  def key(self, bzl_file):
+    """Returns the cache key for the given .bzl file.
+
+    The key covers the content of the file, which also determines the symbols
+    it load()s, the fingerprint of the stubs and extractors and the extraction
+    options. If load()ed symbols are resolved, it also covers the path of the
+    file, which the files it load()s depend on.
+    """
+    digest = hashlib.sha256(self.__fingerprint)
+    if self.__resolve_loads:
+      digest.update(os.path.normpath(bzl_file))
+      digest.update('\0')
+    with open(bzl_file, 'rb') as f:
+      digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+  def _entry_path(self, key):
+    return os.path.join(self.__cache_dir, key[:2], key)
+
+  def contains(self, key):
+    """Returns whether there is an entry for key, without reading it.
+
+    The entry may still be unusable, in which case get returns None, if a file
+    it load()ed has changed.
+    """
+    return os.path.isfile(self._entry_path(key))
+
+  def get(self, key):
+    """Returns the cached ExtractedFile for key, or None if there is none."""
+    path = self._entry_path(key)
+    try:
+      with open(path, 'rb') as f:
+        extracted = file_extractor.ExtractedFile.parse(f.read())
+      os.utime(path, None)
+    except (IOError, OSError):
+      self.misses += 1
+      return None
+    for loaded_file, digest in extracted.loaded_files.iteritems():
+      if manifest.file_digest(
+          os.path.join(self.__workspace_root, loaded_file)) != digest:
+        self.misses += 1
+        return None
+    self.hits += 1
+    return extracted
+
+  def put(self, key, extracted):
+    """Adds the file_extractor.ExtractedFile to the cache under key."""
+    path = self._entry_path(key)
+    entry_dir = os.path.dirname(path)
+    if not os.path.exists(entry_dir):
+      os.makedirs(entry_dir)
+    # Write to a temporary file first so that concurrent runs sharing the cache
+    # never see a partially written entry.
+    fd, temp_path = tempfile.mkstemp(dir=entry_dir)
+    with os.fdopen(fd, 'wb') as f:
+      f.write(extracted.to_proto().SerializeToString())
+    os.rename(temp_path, path)
+
+  def evict(self):
+    """Deletes the least recently used entries until the cache fits."""
+    entries = []
+    total_size = 0
+    for dirpath, _, filenames in os.walk(self.__cache_dir):
+      for filename in filenames:
+        path = os.path.join(dirpath, filename)
+        try:
+          stat = os.stat(path)
+        except OSError:
+          continue
+        entries.append((stat.st_mtime, path, stat.st_size))
+        total_size += stat.st_size
+
+    for _, path, size in sorted(entries):
+      if total_size <= self.__max_size:
+        break
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+      total_size -= size
@@ -0,0 +1,206 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import extraction_cache
+from skydoc import file_extractor
+from skydoc import manifest
+from skydoc import module_loader
+
+
+def _extracted_file(name):
+  language = build_pb2.BuildLanguage()
+  rule = language.rule.add()
+  rule.name = name
+  rule.type = build_pb2.RuleDefinition.RULE
+  return file_extractor.ExtractedFile(language, name + ' title', 'description')
+
+
+class ExtractionCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.cache_dir = os.path.join(self.temp_dir, 'cache')
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def write_bzl(self, name, src):
+    path = os.path.join(self.temp_dir, name)
+    with open(path, 'w') as f:
+      f.write(src)
+    return path
+
+  def test_get_put(self):
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    bzl_file = self.write_bzl('foo.bzl', 'foo = 1\n')
+    key = cache.key(bzl_file)
+    self.assertIsNone(cache.get(key))
+
+    cache.put(key, _extracted_file('foo'))
+    extracted = cache.get(key)
+    self.assertEqual('foo', extracted.language.rule[0].name)
+    self.assertEqual('foo title', extracted.title)
+    self.assertEqual('description', extracted.description)
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(1, cache.misses)
+
+  def test_key_depends_on_content(self):
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    foo = self.write_bzl('foo.bzl', 'foo = 1\n')
+    bar = self.write_bzl('bar.bzl', 'foo = 1\n')
+    baz = self.write_bzl('baz.bzl', 'foo = 2\n')
+    self.assertEqual(cache.key(foo), cache.key(bar))
+    self.assertNotEqual(cache.key(foo), cache.key(baz))
+
+  def test_evicts_least_recently_used(self):
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    keys = ['%064x' % i for i in range(3)]
+    for key in keys:
+      cache.put(key, _extracted_file('rule_%s' % key[-1]))
+    entry_size = os.path.getsize(os.path.join(self.cache_dir, '00', keys[0]))
+    # Make the first entry the most recently used one.
+    for i, key in enumerate(keys):
+      path = os.path.join(self.cache_dir, key[:2], key)
+      os.utime(path, (1000 + i, 1000 + i))
+    cache.get(keys[0])
+
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 2 * entry_size)
+    cache.evict()
+    self.assertIsNotNone(cache.get(keys[0]))
+    self.assertIsNone(cache.get(keys[1]))
+    self.assertIsNotNone(cache.get(keys[2]))
+
+  def test_extract_files_uses_cache(self):
+    bzl_file = self.write_bzl('foo.bzl', textwrap.dedent("""\
+        \"\"\"Foo rules.\"\"\"
+
+        def foo_macro(name):
+          pass
+        """))
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    cold = list(file_extractor.extract_files([bzl_file], cache=cache))
+    self.assertEqual(0, cache.hits)
+
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    warm = list(file_extractor.extract_files([bzl_file], cache=cache))
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(cold[0].language, warm[0].language)
+    self.assertEqual('Foo rules.', warm[0].title)
+
+  def test_extract_files_reads_entries_lazily(self):
+    bzl_files = [self.write_bzl('%s.bzl' % name, '"""%s rules."""\n' % name)
+                 for name in ['foo', 'bar']]
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    list(file_extractor.extract_files(bzl_files, cache=cache))
+
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    extracted_files = file_extractor.extract_files(bzl_files, cache=cache)
+    self.assertEqual('foo rules.', next(extracted_files).title)
+    self.assertEqual(1, cache.hits)
+    self.assertEqual('bar rules.', next(extracted_files).title)
+    self.assertEqual(2, cache.hits)
+    self.assertEqual(0, cache.misses)
+
+  def test_extract_files_reextracts_unusable_entry(self):
+    self.write_bzl('BUILD', '')
+    self.write_bzl('defs.bzl', 'X = "old"\n')
+    bzl_files = [
+        self.write_bzl('foo.bzl', '"""Foo."""\nload(":defs.bzl", "X")\n'),
+        self.write_bzl('bar.bzl', '"""Bar."""\n'),
+    ]
+    loader = module_loader.ModuleLoader(self.temp_dir)
+    cache = extraction_cache.ExtractionCache(
+        self.cache_dir, 1024 * 1024, workspace_root=self.temp_dir,
+        resolve_loads=True)
+    list(file_extractor.extract_files(bzl_files, cache=cache,
+                                      module_loader=loader))
+
+    self.write_bzl('defs.bzl', 'X = "new"\n')
+    cache = extraction_cache.ExtractionCache(
+        self.cache_dir, 1024 * 1024, workspace_root=self.temp_dir,
+        resolve_loads=True)
+    extracted_files = list(file_extractor.extract_files(
+        bzl_files, jobs=2, cache=cache,
+        module_loader=module_loader.ModuleLoader(self.temp_dir)))
+    self.assertEqual(['Foo.', 'Bar.'], [e.title for e in extracted_files])
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(1, cache.misses)
+
+  def test_same_content_in_different_packages(self):
+    src = textwrap.dedent("""\
+        load(":defs.bzl", "ATTRS")
+
+        def _impl(ctx):
+          return struct()
+
+        foo_rule = rule(implementation = _impl, attrs = ATTRS)
+        \"\"\"A rule.\"\"\"
+        """)
+    bzl_files = []
+    for package, attribute in [('pkg_a', 'a_only'), ('pkg_b', 'b_only')]:
+      os.makedirs(os.path.join(self.temp_dir, package))
+      self.write_bzl(os.path.join(package, 'BUILD'), '')
+      self.write_bzl(os.path.join(package, 'defs.bzl'),
+                     'ATTRS = {"%s": attr.string()}\n' % attribute)
+      bzl_files.append(self.write_bzl(os.path.join(package, 'rules.bzl'), src))
+
+    def extract():
+      cache = extraction_cache.ExtractionCache(
+          self.cache_dir, 1024 * 1024, workspace_root=self.temp_dir,
+          resolve_loads=True)
+      extracted_files = file_extractor.extract_files(
+          bzl_files, cache=cache,
+          module_loader=module_loader.ModuleLoader(self.temp_dir))
+      return [[a.name for a in extracted.language.rule[0].attribute]
+              for extracted in extracted_files]
+
+    expected = [['name', 'a_only'], ['name', 'b_only']]
+    self.assertEqual(expected, extract())
+    self.assertEqual(expected, extract())
+
+  def test_changed_loaded_file_invalidates_entry(self):
+    cache = extraction_cache.ExtractionCache(
+        self.cache_dir, 1024 * 1024, workspace_root=self.temp_dir)
+    bzl_file = self.write_bzl('foo.bzl', 'load(":defs.bzl", "X")\n')
+    self.write_bzl('defs.bzl', 'X = 1\n')
+    extracted = _extracted_file('foo')
+    extracted.loaded_files = {
+        'defs.bzl': manifest.file_digest(os.path.join(self.temp_dir,
+                                                      'defs.bzl')),
+    }
+    key = cache.key(bzl_file)
+    cache.put(key, extracted)
+    self.assertIsNotNone(cache.get(key))
+
+    self.write_bzl('defs.bzl', 'X = 2\n')
+    self.assertIsNone(cache.get(key))
+
+  def test_key_depends_on_options(self):
+    bzl_file = self.write_bzl('foo.bzl', 'foo = 1\n')
+    cache = extraction_cache.ExtractionCache(self.cache_dir, 1024 * 1024)
+    resolving_cache = extraction_cache.ExtractionCache(
+        self.cache_dir, 1024 * 1024, 'resolve_loads=True')
+    self.assertNotEqual(cache.key(bzl_file), resolving_cache.key(bzl_file))
+
+
+if __name__ == '__main__':
+  unittest.main()
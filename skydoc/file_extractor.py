@@ -0,0 +1,298 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Extracts all documentation from a .bzl file using a single parse."""
+
+import collections
+import multiprocessing
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import common
+from skydoc import isolated_pool
+from skydoc import load_extractor
+from skydoc import macro_extractor
+from skydoc import module_loader as module_loader_lib
+from skydoc import profiler
+from skydoc import rule_extractor
+
+# The number of files each worker process may extract ahead of the file whose
+# result is consumed, which bounds the results held in memory when rendering
+# is slower than extraction.
+PENDING_PER_JOB = 2
+
+
+class ExtractedFile(object):
+  """Simple class to contain the documentation extracted from a .bzl file."""
+
+  def __init__(self, language, title, description, loaded_files=None):
+    self.language = language
+    self.title = title
+    self.description = description
+    # Dict mapping the .bzl files load()ed to resolve symbols to the digests
+    # of their content.
+    self.loaded_files = loaded_files or {}
+
+  def to_proto(self):
+    """Returns an ExtractedFile proto containing the documentation."""
+    proto = build_pb2.ExtractedFile()
+    proto.language.CopyFrom(self.language)
+    proto.title = self.title
+    proto.description = self.description
+    for path, digest in sorted(self.loaded_files.iteritems()):
+      loaded_file = proto.loaded_file.add()
+      loaded_file.path = path
+      loaded_file.digest = digest
+    return proto
+
+  @staticmethod
+  def from_proto(proto):
+    """Creates an ExtractedFile from an ExtractedFile proto."""
+    loaded_files = dict((loaded_file.path, loaded_file.digest)
+                        for loaded_file in proto.loaded_file)
+    return ExtractedFile(proto.language, proto.title, proto.description,
+                         loaded_files)
+
+  @staticmethod
+  def parse(serialized):
+    """Creates an ExtractedFile from a serialized ExtractedFile proto."""
+    proto = build_pb2.ExtractedFile()
+    proto.ParseFromString(serialized)
+    return ExtractedFile.from_proto(proto)
+
+
+def merge_languages(macro_language, rule_language):
+  for rule in rule_language.rule:
+    new_rule = macro_language.rule.add()
+    new_rule.CopyFrom(rule)
+  return macro_language
+
+
+def extract(bzl_file, module_loader=None, static=False):
+  """Extracts the documentation for all public rules and macros in a file.
+
+  The .bzl file is read and parsed once. The resulting AST is shared by the
+  load, macro and rule extractors, and is compiled for evaluation against the
+  Skylark stubs.
+
+  Args:
+    bzl_file: The .bzl file to extract documentation from.
+    module_loader: A module_loader.ModuleLoader used to resolve the symbols
+      load()ed by the file, or None to stub them out.
+    static: Whether to extract the rules without running the file whenever
+      possible.
+
+  Returns:
+    An ExtractedFile containing the merged BuildLanguage proto and the title
+    and description from the file docstring.
+
+  Raises:
+    load_extractor.LoadExtractorError: If the load() statements in the file are
+      invalid or form a cycle.
+  """
+  with profiler.span('extract', file=bzl_file):
+    with profiler.span('parse'):
+      tree = common.parse_bzl(bzl_file)
+    with profiler.span('LoadExtractor'):
+      load_symbols = load_extractor.LoadExtractor().extract(bzl_file, tree)
+
+    # TODO(dzc): Make MacroDocExtractor and RuleDocExtractor stateless.
+    macro_doc_extractor = macro_extractor.MacroDocExtractor()
+    rule_doc_extractor = rule_extractor.RuleDocExtractor()
+    with profiler.span('MacroDocExtractor'):
+      macro_doc_extractor.parse_bzl(bzl_file, tree)
+    rule_doc_extractor.parse_bzl(bzl_file, load_symbols, tree, module_loader,
+                                 static)
+    merged_language = merge_languages(macro_doc_extractor.proto(),
+                                      rule_doc_extractor.proto())
+    return ExtractedFile(merged_language, macro_doc_extractor.title,
+                         macro_doc_extractor.description,
+                         rule_doc_extractor.loaded_files())
+
+
+# The module loader of a worker process, shared by all the files it extracts.
+_worker_module_loader = None
+
+# Whether a worker process extracts rules statically.
+_worker_static = False
+
+
+def _init_worker(workspace_root, static, profile=False):
+  """Sets up the extraction options of a worker process.
+
+  Args:
+    workspace_root: The workspace root of the parent's module loader, or None
+      if load()ed symbols are not resolved.
+    static: Whether to extract rules statically.
+    profile: Whether to record the spans of the profiler.
+  """
+  global _worker_module_loader, _worker_static
+  if workspace_root is not None:
+    _worker_module_loader = module_loader_lib.ModuleLoader(workspace_root)
+  _worker_static = static
+  if profile:
+    profiler.enable('extraction worker')
+  else:
+    # Forked workers inherit the state of the parent's profiler.
+    profiler.disable()
+
+
+def _extract_serialized(bzl_file):
+  """Extracts the documentation for a file in a worker process.
+
+  Returns:
+    A (serialized, events) pair of the serialized ExtractedFile proto, which
+    is cheap to send back to the parent process, and the profiler events
+    recorded while extracting it.
+  """
+  extracted = extract(bzl_file, _worker_module_loader, _worker_static)
+  return extracted.to_proto().SerializeToString(), profiler.take_events()
+
+
+def _parse_serialized(result):
+  """Returns the ExtractedFile returned by _extract_serialized."""
+  serialized, events = result
+  profiler.add_events(events)
+  return ExtractedFile.parse(serialized)
+
+
+def _extract_isolated(bzl_files, jobs, workspace_root, static, timeout,
+                      memory_limit):
+  """Extracts the given files in isolated processes with a budget per file.
+
+  Files that run over their budget are reported and their result is None.
+  """
+  pool = isolated_pool.IsolatedPool(
+      max(jobs, 1), timeout, memory_limit, _init_worker,
+      (workspace_root, static, profiler.enabled()),
+      PENDING_PER_JOB * max(jobs, 1))
+  for result in pool.imap(_extract_serialized, bzl_files):
+    if isinstance(result, isolated_pool.BudgetExceeded):
+      print('WARNING: Skipping %s: %s.' % (result.item, result.reason))
+      yield None
+    else:
+      yield _parse_serialized(result)
+
+
+def _imap_bounded(pool, func, items, max_pending):
+  """Like pool.imap, but with at most max_pending results pending at a time.
+
+  pool.imap submits all items at once and queues their results until they are
+  requested, so they pile up when they are consumed more slowly than they are
+  produced.
+  """
+  pending = collections.deque()
+  for item in items:
+    pending.append(pool.apply_async(func, (item,)))
+    if len(pending) >= max_pending:
+      yield pending.popleft().get()
+  while pending:
+    yield pending.popleft().get()
+
+
+def _extract_uncached(bzl_files, jobs, module_loader, static, timeout,
+                      memory_limit):
+  """Extracts the given files, in a pool of jobs processes if jobs > 1."""
+  # Modules cannot be shared between processes, so each worker memoizes the
+  # modules it loads in its own loader.
+  workspace_root = module_loader.workspace_root if module_loader else None
+  if timeout or memory_limit:
+    for extracted in _extract_isolated(bzl_files, jobs, workspace_root, static,
+                                       timeout, memory_limit):
+      yield extracted
+    return
+
+  jobs = min(jobs, len(bzl_files))
+  if jobs <= 1:
+    for bzl_file in bzl_files:
+      yield extract(bzl_file, module_loader, static)
+    return
+
+  pool = multiprocessing.Pool(jobs, _init_worker,
+                              (workspace_root, static, profiler.enabled()))
+  try:
+    for result in _imap_bounded(pool, _extract_serialized, bzl_files,
+                                PENDING_PER_JOB * jobs):
+      yield _parse_serialized(result)
+    pool.close()
+  finally:
+    pool.terminate()
+    pool.join()
+
+
+def extract_files(bzl_files, jobs=1, cache=None, module_loader=None,
+                  static=False, timeout=None, memory_limit=None):
+  """Extracts the documentation for each of the given files.
+
+  If jobs is greater than 1, the files are extracted in a pool of worker
+  processes. Either way, the results are produced in the order of bzl_files so
+  that the generated documentation does not depend on the number of jobs.
+
+  If timeout or memory_limit is set, each file is extracted in one of jobs
+  isolated worker processes, which is killed and replaced if the file runs
+  over its budget. Such files are reported and skipped.
+
+  Args:
+    bzl_files: List of .bzl files to extract documentation from.
+    jobs: The number of worker processes to use, or 0 to use one per CPU.
+    cache: An extraction_cache.ExtractionCache. If set, files found in the
+      cache are neither parsed nor evaluated, and newly extracted files are
+      added to it.
+    module_loader: A module_loader.ModuleLoader used to resolve the symbols
+      load()ed by the files, or None to stub them out.
+    static: Whether to extract the rules without running the files whenever
+      possible.
+    timeout: If set, the maximum time in seconds that extracting a single file
+      may take.
+    memory_limit: If set, the maximum size in bytes of the address space of a
+      process extracting a file.
+
+  Yields:
+    An ExtractedFile for each file in bzl_files, or None for files that were
+    skipped because they ran over their budget. Errors raised while extracting
+    a file are raised when its result is requested.
+  """
+  if jobs == 0:
+    jobs = multiprocessing.cpu_count()
+  if not cache:
+    for extracted in _extract_uncached(bzl_files, jobs, module_loader, static,
+                                       timeout, memory_limit):
+      yield extracted
+    return
+
+  # Entries are only read when their file's turn comes, so that a warm cache
+  # is not held in memory all at once.
+  with profiler.span('cache keys', files=len(bzl_files)):
+    keys = [cache.key(bzl_file) for bzl_file in bzl_files]
+    cached = [cache.contains(key) for key in keys]
+  misses = _extract_uncached(
+      [bzl_file for bzl_file, hit in zip(bzl_files, cached) if not hit], jobs,
+      module_loader, static, timeout, memory_limit)
+  for bzl_file, key, hit in zip(bzl_files, keys, cached):
+    if hit:
+      with profiler.span('cache lookup', file=bzl_file):
+        extracted = cache.get(key)
+      if extracted is not None:
+        yield extracted
+        continue
+      # The entry is unusable since a file it load()ed has changed.
+      extracted = next(_extract_uncached([bzl_file], 1, module_loader, static,
+                                         timeout, memory_limit))
+    else:
+      cache.misses += 1
+      extracted = next(misses)
+    if extracted:
+      cache.put(key, extracted)
+    yield extracted
+  cache.evict()
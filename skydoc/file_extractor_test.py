@@ -0,0 +1,191 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing.pool
+import tempfile
+import textwrap
+import unittest
+# internal imports
+
+from google.protobuf import text_format
+from skydoc import build_pb2
+from skydoc import file_extractor
+from skydoc import load_extractor
+
+
+class FileExtractorTest(unittest.TestCase):
+
+  def extract(self, src):
+    with tempfile.NamedTemporaryFile() as tf:
+      tf.write(src)
+      tf.flush()
+      return file_extractor.extract(tf.name)
+
+  def test_rules_and_macros(self):
+    src = textwrap.dedent("""\
+        \"\"\"Title of the rule set.
+
+        Description of the rule set.
+        \"\"\"
+
+        load("//foo:bar.bzl", "bar_library")
+
+        def _impl(ctx):
+          return struct()
+
+        def foo_macro(name):
+          \"\"\"A macro.
+
+          Args:
+            name: The name.
+          \"\"\"
+          pass
+
+        foo_rule = rule(
+            implementation = _impl,
+            attrs = {
+                "deps": attr.label_list(default = [Label("//foo:bar")]),
+            },
+        )
+        \"\"\"A rule.
+
+        Args:
+          deps: The dependencies.
+        \"\"\"
+        """)
+
+    expected = textwrap.dedent("""\
+        rule {
+          name: "foo_macro"
+          documentation: "A macro."
+          attribute {
+            name: "name"
+            type: UNKNOWN
+            mandatory: true
+            documentation: "The name."
+          }
+          type: MACRO
+        }
+        rule {
+          name: "foo_rule"
+          documentation: "A rule."
+          attribute {
+            name: "name"
+            type: UNKNOWN
+            mandatory: true
+          }
+          attribute {
+            name: "deps"
+            type: LABEL_LIST
+            mandatory: false
+            documentation: "The dependencies."
+            default: "[\'//foo:bar\']"
+          }
+          type: RULE
+        }
+        """)
+    expected_proto = build_pb2.BuildLanguage()
+    text_format.Merge(expected, expected_proto)
+
+    extracted = self.extract(src)
+    self.assertEqual(expected_proto, extracted.language)
+    self.assertEqual('Title of the rule set.', extracted.title)
+    self.assertEqual('Description of the rule set.', extracted.description)
+
+  def test_extract_files_jobs(self):
+    srcs = []
+    for i in range(4):
+      srcs.append(textwrap.dedent("""\
+          \"\"\"Rule set %d.\"\"\"
+
+          def _impl(ctx):
+            return struct()
+
+          rule_%d = rule(
+              implementation = _impl,
+              attrs = {"dep_%d": attr.label()},
+          )
+          \"\"\"Rule %d.\"\"\"
+
+          def macro_%d(name):
+            pass
+          """ % (i, i, i, i, i)))
+    tfs = []
+    try:
+      for src in srcs:
+        tf = tempfile.NamedTemporaryFile()
+        tfs.append(tf)
+        tf.write(src)
+        tf.flush()
+      bzl_files = [tf.name for tf in tfs]
+
+      serial = list(file_extractor.extract_files(bzl_files))
+      parallel = list(file_extractor.extract_files(bzl_files, jobs=3))
+    finally:
+      for tf in tfs:
+        tf.close()
+
+    self.assertEqual(4, len(parallel))
+    for expected, actual in zip(serial, parallel):
+      self.assertEqual(expected.language, actual.language)
+      self.assertEqual(expected.title, actual.title)
+      self.assertEqual(expected.description, actual.description)
+    self.assertEqual(['macro_2', 'rule_2'],
+                     [r.name for r in parallel[2].language.rule])
+
+  def test_invalid_load(self):
+    src = textwrap.dedent("""\
+        load(load_label, "foo_library")
+        """)
+    self.assertRaises(load_extractor.LoadExtractorError, self.extract, src)
+
+  def test_extract_files_budget(self):
+    srcs = [
+        '"""Fast rules."""\n',
+        '"""Slow rules."""\n\nwhile True:\n  pass\n',
+    ]
+    tfs = []
+    try:
+      for src in srcs:
+        tf = tempfile.NamedTemporaryFile()
+        tfs.append(tf)
+        tf.write(src)
+        tf.flush()
+      extracted = list(file_extractor.extract_files(
+          [tf.name for tf in tfs], jobs=2, timeout=0.5))
+    finally:
+      for tf in tfs:
+        tf.close()
+
+    self.assertEqual('Fast rules.', extracted[0].title)
+    self.assertIsNone(extracted[1])
+
+  def test_imap_bounded(self):
+    started = []
+    def square(item):
+      started.append(item)
+      return item * item
+
+    thread_pool = multiprocessing.pool.ThreadPool(4)
+    try:
+      results = file_extractor._imap_bounded(thread_pool, square, range(10), 3)
+      self.assertEqual(0, next(results))
+      self.assertLessEqual(len(started), 3)
+      self.assertEqual([i * i for i in range(1, 10)], list(results))
+    finally:
+      thread_pool.terminate()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,218 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process pool that enforces a time and memory budget on each task.
+
+Unlike multiprocessing.Pool, a worker that runs over its budget is killed and
+replaced, and the task is reported as over budget instead of stalling the
+whole pool.
+"""
+
+import multiprocessing
+import select
+import time
+# internal imports
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+
+class BudgetExceeded(object):
+  """Result of a task that ran over its budget."""
+
+  def __init__(self, item, reason):
+    self.item = item
+    self.reason = reason
+
+
+class _Error(object):
+  """Result of a task that raised an exception."""
+
+  def __init__(self, error):
+    self.error = error
+
+
+def _worker_main(conn, func, memory_limit, initializer, initargs):
+  """Runs func for each item received on conn until None is received."""
+  if memory_limit:
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+  if initializer:
+    initializer(*initargs)
+  while True:
+    try:
+      item = conn.recv()
+    except EOFError:
+      return
+    if item is None:
+      return
+    try:
+      result = ('ok', func(item))
+    except MemoryError:
+      result = ('memory', None)
+    except Exception as e:
+      result = ('error', e)
+    try:
+      conn.send(result)
+    except Exception as e:
+      # The exception raised by func could not be pickled.
+      conn.send(('error', RuntimeError('%s: %s' % (type(e).__name__, e))))
+
+
+class _Worker(object):
+  """A worker process and the task it is running."""
+
+  def __init__(self, func, memory_limit, initializer, initargs):
+    self.conn, child_conn = multiprocessing.Pipe()
+    self.process = multiprocessing.Process(
+        target=_worker_main,
+        args=(child_conn, func, memory_limit, initializer, initargs))
+    self.process.daemon = True
+    self.process.start()
+    child_conn.close()
+    self.index = None
+    self.item = None
+    self.deadline = None
+
+  def run(self, index, item, timeout):
+    self.index = index
+    self.item = item
+    self.deadline = time.time() + timeout if timeout else None
+    self.conn.send(item)
+
+  def done(self):
+    self.index = None
+    self.item = None
+    self.deadline = None
+
+  def kill(self):
+    self.process.terminate()
+    self.process.join()
+    self.conn.close()
+
+  def stop(self):
+    try:
+      self.conn.send(None)
+    except IOError:
+      pass
+    self.process.join(1.0)
+    if self.process.is_alive():
+      self.kill()
+    else:
+      self.conn.close()
+
+
+class IsolatedPool(object):
+  """Pool of worker processes that run each task within a budget."""
+
+  def __init__(self, processes, timeout=None, memory_limit=None,
+               initializer=None, initargs=(), max_pending=None):
+    """Inits IsolatedPool.
+
+    Args:
+      processes: The number of worker processes.
+      timeout: The maximum time in seconds a single task may take, or None.
+      memory_limit: The maximum size in bytes of the address space of a worker
+        process, or None. Only enforced on platforms with the resource module.
+      initializer: Function called with initargs when each worker starts,
+        including the workers started to replace killed ones.
+      initargs: Arguments for initializer.
+      max_pending: If set, the maximum number of items started before the
+        result of the first unfinished item is requested, which bounds the
+        results held in memory by imap.
+    """
+    self.__processes = processes
+    self.__timeout = timeout
+    self.__memory_limit = memory_limit if resource else None
+    self.__initializer = initializer
+    self.__initargs = initargs
+    self.__max_pending = max_pending
+
+  def _start_worker(self, func):
+    return _Worker(func, self.__memory_limit, self.__initializer,
+                   self.__initargs)
+
+  def imap(self, func, items):
+    """Runs func for each of the items and yields the results in order.
+
+    The result of an item whose task ran over its time or memory budget, or
+    whose worker process died, is a BudgetExceeded. If func raises an
+    exception, it is raised when the result of its item is requested.
+    """
+    items = list(items)
+    workers = [self._start_worker(func)
+               for _ in range(min(self.__processes, len(items)))]
+    results = {}
+    next_item = 0
+    next_result = 0
+    try:
+      while next_result < len(items):
+        while next_result in results:
+          result = results.pop(next_result)
+          next_result += 1
+          if isinstance(result, _Error):
+            raise result.error
+          yield result
+        if next_result == len(items):
+          break
+
+        # Items are started once the results before them are requested, so
+        # that at most max_pending items are ahead of the first unfinished one.
+        for worker in workers:
+          if (worker.index is None and next_item < len(items) and
+              (not self.__max_pending or
+               next_item - next_result < self.__max_pending)):
+            worker.run(next_item, items[next_item], self.__timeout)
+            next_item += 1
+
+        busy = [worker for worker in workers if worker.index is not None]
+        wait = None
+        if self.__timeout:
+          wait = max(0, min(worker.deadline for worker in busy) - time.time())
+        ready, _, _ = select.select([worker.conn for worker in busy], [], [],
+                                    wait)
+
+        for i, worker in enumerate(workers):
+          if worker.index is None:
+            continue
+          if worker.conn in ready:
+            try:
+              status, value = worker.conn.recv()
+            except EOFError:
+              status, value = 'died', None
+            if status == 'ok':
+              results[worker.index] = value
+            elif status == 'error':
+              results[worker.index] = _Error(value)
+            else:
+              reason = ('exceeded the memory budget' if status == 'memory'
+                        else 'worker process died')
+              results[worker.index] = BudgetExceeded(worker.item, reason)
+              worker.kill()
+              workers[i] = self._start_worker(func)
+              continue
+            worker.done()
+          elif worker.deadline and time.time() >= worker.deadline:
+            results[worker.index] = BudgetExceeded(
+                worker.item, 'exceeded the time budget of %gs' % self.__timeout)
+            worker.kill()
+            workers[i] = self._start_worker(func)
+    finally:
+      for worker in workers:
+        if worker.index is None:
+          worker.stop()
+        else:
+          worker.kill()
@@ -0,0 +1,95 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+# internal imports
+
+from skydoc import isolated_pool
+
+
+def _task(item):
+  if item == 'loop':
+    while True:
+      time.sleep(0.01)
+  elif item == 'allocate':
+    return 'x' * (1024 * 1024 * 1024)
+  elif item == 'crash':
+    os._exit(1)
+  elif item == 'raise':
+    raise ValueError('Bad item.')
+  elif os.path.isabs(item):
+    open(item, 'w').close()
+  return item.upper()
+
+
+class IsolatedPoolTest(unittest.TestCase):
+
+  def test_results_in_order(self):
+    pool = isolated_pool.IsolatedPool(3, timeout=10)
+    items = ['item%d' % i for i in range(10)]
+    self.assertEqual([item.upper() for item in items],
+                     list(pool.imap(_task, items)))
+
+  def test_timeout(self):
+    pool = isolated_pool.IsolatedPool(2, timeout=0.2)
+    start = time.time()
+    results = list(pool.imap(_task, ['a', 'loop', 'b', 'loop', 'c']))
+    self.assertLess(time.time() - start, 5)
+    self.assertEqual(['A', 'B', 'C'], [results[0], results[2], results[4]])
+    for result in [results[1], results[3]]:
+      self.assertIsInstance(result, isolated_pool.BudgetExceeded)
+      self.assertEqual('loop', result.item)
+      self.assertIn('time budget', result.reason)
+
+  def test_memory_limit(self):
+    pool = isolated_pool.IsolatedPool(1, memory_limit=512 * 1024 * 1024)
+    results = list(pool.imap(_task, ['allocate', 'a']))
+    self.assertIsInstance(results[0], isolated_pool.BudgetExceeded)
+    self.assertIn('memory budget', results[0].reason)
+    self.assertEqual('A', results[1])
+
+  def test_crash(self):
+    pool = isolated_pool.IsolatedPool(1, timeout=10)
+    results = list(pool.imap(_task, ['crash', 'a']))
+    self.assertIsInstance(results[0], isolated_pool.BudgetExceeded)
+    self.assertEqual('A', results[1])
+
+  def test_error_is_raised(self):
+    pool = isolated_pool.IsolatedPool(2, timeout=10)
+    results = pool.imap(_task, ['a', 'raise', 'b'])
+    self.assertEqual('A', next(results))
+    with self.assertRaisesRegexp(ValueError, 'Bad item.'):
+      next(results)
+
+  def test_max_pending(self):
+    temp_dir = tempfile.mkdtemp()
+    try:
+      paths = [os.path.join(temp_dir, name) for name in ['a', 'b', 'c']]
+      pool = isolated_pool.IsolatedPool(3, timeout=0.5, max_pending=2)
+      results = pool.imap(_task, ['loop'] + paths)
+      self.assertIsInstance(next(results), isolated_pool.BudgetExceeded)
+      # Only the first two items were started while the first one ran.
+      self.assertEqual([True, False, False],
+                       [os.path.exists(path) for path in paths])
+      self.assertEqual([path.upper() for path in paths], list(results))
+    finally:
+      shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -17,6 +17,8 @@
 import ast
 from collections import namedtuple
 
+from skydoc import common
+
 LoadSymbol = namedtuple('LoadSymbol', ['label', 'symbol', 'alias'])
 """Information about a symbol loaded from another .bzl file."""
 
@@ -29,14 +31,12 @@ class LoadExtractorError(Exception):
 class LoadExtractor(object):
   """Extracts information on symbols load()ed from other .bzl files."""
 
-  def _extract_loads(self, bzl_file):
+  def _extract_loads(self, bzl_file, tree=None):
     """Walks the AST and extracts information on loaded symbols."""
     load_symbols = []
     try:
-      tree = None
-      with open(bzl_file) as f:
-        tree = ast.parse(f.read(), bzl_file)
-      key = None
+      if tree is None:
+        tree = common.parse_bzl(bzl_file)
       for node in ast.iter_child_nodes(tree):
         if not isinstance(node, ast.Expr):
           continue
@@ -91,7 +91,7 @@ class LoadExtractor(object):
       else:
         symbols.add(load.symbol)
 
-  def extract(self, bzl_file):
+  def extract(self, bzl_file, tree=None):
     """Extracts symbols loaded from other .bzl files.
 
     Walks the AST of the .bzl files and extracts information about symbols
@@ -103,10 +103,11 @@ class LoadExtractor(object):
 
     Args:
       bzl_file: The .bzl file to extract load symbols from.
+      tree: The ast.Module of bzl_file if it has already been parsed.
 
     Returns:
       List of LoadSymbol objects.
     """
-    load_symbols = self._extract_loads(bzl_file)
+    load_symbols = self._extract_loads(bzl_file, tree)
     self._validate_loads(load_symbols)
     return load_symbols
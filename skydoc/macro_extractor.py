@@ -117,14 +117,16 @@ class MacroDocExtractor(object):
       output.template = template
       output.documentation = doc
 
-  def parse_bzl(self, bzl_file):
+  def parse_bzl(self, bzl_file, tree=None):
     """Extracts documentation for all public macros from the given .bzl file.
 
     Args:
       bzl_file: The .bzl file to extract macro documentation from.
+      tree: The ast.Module of bzl_file if it has already been parsed.
     """
     try:
-      tree = ast.parse(open(bzl_file).read(), bzl_file)
+      if tree is None:
+        tree = common.parse_bzl(bzl_file)
       self._add_file_docs(tree)
       for stmt in tree.body:
         if isinstance(stmt, ast.FunctionDef) and not stmt.name.startswith("_"):
@@ -16,20 +16,30 @@
 
 # internal imports
 import gflags
-import jinja2
-import mistune
+import json
 import os
 import re
 import shutil
+import struct
 import sys
 import tempfile
+import time
 import zipfile
 
 from skydoc import common
+from skydoc import extraction_cache
+from skydoc import file_extractor
 from skydoc import load_extractor
-from skydoc import macro_extractor
+from skydoc import manifest
+from skydoc import module_loader as module_loader_lib
+from skydoc import persistent_worker
+from skydoc import profiler
+from skydoc import proto_export
 from skydoc import rule
-from skydoc import rule_extractor
+from skydoc import run_stats
+from skydoc import search_index
+from skydoc import template_loader
+from skydoc import watch
 
 gflags.DEFINE_string('output_dir', '',
     'The directory to write the output generated documentation to if '
@@ -44,6 +54,54 @@ gflags.DEFINE_bool('zip', True,
     'default or as specified by --output_file. If --zip is false, then '
     'skydoc will generate documentation, either in Markdown or HTML as '
     'specifed by --format, in the current directory or --output_dir if set.')
+gflags.DEFINE_string('zip_compression', 'stored',
+    'How the files in the zip archive are compressed if --zip=true. Possible '
+    'values are stored, deflated and best, which uses the best codec '
+    'supported by the Python zipfile module.')
+gflags.DEFINE_bool('shared_nav', False,
+    'If generating HTML, write the navigation listing all rule sets once, to '
+    'nav.js, which every page loads, instead of inlining it in every page. '
+    'Browsers cache nav.js, so the navigation is only downloaded once.')
+gflags.DEFINE_integer('split_threshold', 0,
+    'If positive, rule sets with more rules, macros and repository rules '
+    'than this are documented on an index page plus a page for each of '
+    'them, instead of on a single page.')
+gflags.DEFINE_list('export_formats', [],
+    'Comma-separated formats to export the extracted BuildLanguage protos in, '
+    'along with the documentation: binary, json and delimited. Not supported '
+    'with --incremental or --watch.')
+gflags.DEFINE_bool('extract_only', False,
+    'Only extract the documentation of the input .bzl files, and write it to '
+    '--output_file as a stream of length-delimited ExtractedFile protos, to '
+    'be rendered by a later run with --from_extracted.')
+gflags.DEFINE_bool('from_extracted', False,
+    'Render the documentation extracted by runs with --extract_only: the '
+    'inputs are the files they wrote, or the extracted_files.pb written by '
+    '--export_formats=delimited, instead of .bzl files. The paths in the '
+    'latter are already relative to the --strip_prefix it was written with. '
+    'Not supported with --incremental, --watch or --extract_only.')
+gflags.DEFINE_string('profile', '',
+    'If set, the path of a file to write a profile of the run to, in the '
+    'Chrome trace event format, which chrome://tracing loads. It records the '
+    'time spent in each stage for each file, including in worker processes. '
+    'Not supported with --watch.')
+gflags.DEFINE_string('stats_json', '',
+    'If set, the path of a file to write the statistics of the run to, as '
+    'JSON: the number of files and of rules, macros, repository rules and '
+    'attributes extracted, the size of the outputs, the wall and CPU time of '
+    'each stage, the hit rates of the caches and the slowest files. Not '
+    'supported with --incremental or --watch.')
+gflags.DEFINE_integer('stats_slowest_files', run_stats.SLOWEST_FILES,
+    'The number of slowest files listed by --stats_json, with the time of '
+    'each of their stages.')
+gflags.DEFINE_bool('search_index', False,
+    'If generating HTML, write a search page and a prebuilt index of the rule '
+    'sets, rules and attributes it searches. Not supported with '
+    '--incremental or --watch.')
+gflags.DEFINE_integer('zip_compression_level', -1,
+    'The compression level used with --zip_compression=deflated, or -1 for '
+    'the default of the codec. Not supported: the zipfile module of Python '
+    '2.7 always uses the default level, so any other value is rejected.')
 gflags.DEFINE_string('strip_prefix', '',
     'The directory prefix to strip from all generated docs, which are '
     'generated in subdirectories that match the package structure of the '
@@ -56,6 +114,62 @@ gflags.DEFINE_string('link_ext', 'html',
     'The file extension used for links in the generated documentation')
 gflags.DEFINE_string('site_root', '',
     'The site root to be prepended to all URLs in the generated documentation')
+gflags.DEFINE_integer('jobs', 1,
+    'The number of worker processes used to extract documentation from the '
+    'input .bzl files, or 0 to use one per CPU. Output does not depend on '
+    'the number of jobs.')
+gflags.DEFINE_string('cache_dir', '',
+    'If set, the directory of a persistent cache of the documentation '
+    'extracted from .bzl files, keyed by their content. Files found in the '
+    'cache are neither parsed nor evaluated.')
+gflags.DEFINE_integer('cache_size_mb', 512,
+    'The maximum size of the cache in --cache_dir in megabytes. The least '
+    'recently used entries are evicted once it is exceeded.')
+gflags.DEFINE_bool('resolve_loads', False,
+    'Whether to resolve the symbols load()ed by the input .bzl files by '
+    'evaluating the files they are loaded from, so that rules using '
+    'attributes or values defined in other files are documented in full. '
+    'Each loaded file is evaluated once per run. If false, loaded symbols '
+    'are stubbed out with the empty string.')
+gflags.DEFINE_bool('static_extraction', False,
+    'Whether to extract rules from the syntax tree of the input .bzl files '
+    'without running them. rule(), repository_rule() and attr.*() calls and '
+    'simple module-level constants are recognized, and files using anything '
+    'else to define rules are evaluated against the stubs as usual. '
+    'Files load()ed with --resolve_loads are still evaluated.')
+gflags.DEFINE_float('file_timeout_s', 0,
+    'If set, the maximum time in seconds that extracting the documentation '
+    'from a single .bzl file may take. Files are then extracted in isolated '
+    'worker processes, and files that run over the budget are reported and '
+    'skipped.')
+gflags.DEFINE_integer('file_memory_mb', 0,
+    'If set, the maximum size in megabytes of the address space of a worker '
+    'process extracting the documentation from a .bzl file. Files are then '
+    'extracted in isolated worker processes, and files that run over the '
+    'budget are reported and skipped.')
+gflags.DEFINE_string('workspace_root', '',
+    'The directory that the labels of load() statements are resolved '
+    'against with --resolve_loads. Files in external repositories are looked '
+    'up under external/<name>, as in the execution root of Bazel actions.')
+
+gflags.DEFINE_bool('incremental', False,
+    'Whether to only regenerate the documentation for the .bzl files that '
+    'changed since the last run that wrote to --output_dir. Requires '
+    '--zip=false. A manifest of the inputs and outputs is written to '
+    '--output_dir to detect changes.')
+
+gflags.DEFINE_bool('watch', False,
+    'Whether to keep running after generating the documentation and '
+    'regenerate it whenever an input .bzl file changes. Only the rule sets '
+    'of the changed files, and the overview and navigation if needed, are '
+    'regenerated. Requires --zip=false.')
+gflags.DEFINE_integer('watch_interval_ms', 100,
+    'How often to check the input files for changes in --watch mode, in '
+    'milliseconds.')
+gflags.DEFINE_integer('serve_port', 0,
+    'If set in --watch mode, the port of a local preview server for the '
+    'documentation in --output_dir. Pages served by it reload automatically '
+    'when they are regenerated.')
 
 FLAGS = gflags.FLAGS
 
@@ -64,22 +178,41 @@ DEFAULT_OUTPUT_FILE = 'skydoc.zip'
 
 WORKSPACE_DIR = 'io_bazel_skydoc'
 TEMPLATE_PATH = 'skydoc/templates'
+COMPILED_TEMPLATES_PATH = 'skydoc/compiled_templates.zip'
 CSS_PATH = 'skydoc/sass'
 
 CSS_FILE = 'main.css'
+NAV_SCRIPT_FILE = 'nav.js'
+SEARCH_PAGE = 'search'
+
+ZIP_COMPRESSION_TYPES = ['stored', 'deflated', 'best']
+
+# The zip archive is reproducible: its entries have fixed metadata and are
+# listed in sorted order, so that identical inputs produce identical bytes.
+# The timestamp is the earliest one the zip format supports.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# Mode of the files in the zip archive: regular files readable by everyone.
+ZIP_FILE_MODE = 0o100644
+ZIP_CREATE_SYSTEM_UNIX = 3
+
+# Jinja environments, and the templates loaded by them, are kept for the
+# lifetime of the process so that they stay warm across persistent worker
+# requests.
+_jinja_environments = {}
 
 def _create_jinja_environment(site_root, link_ext):
-  env = jinja2.Environment(
-      loader=jinja2.FileSystemLoader(_runfile_path(TEMPLATE_PATH)),
-      keep_trailing_newline=True,
-      line_statement_prefix='%')
-  env.filters['markdown'] = lambda text: jinja2.Markup(mistune.markdown(text))
-  env.filters['doc_link'] = (
-      lambda fname: site_root + '/' + fname + '.' + link_ext)
-  env.filters['link'] = lambda fname: site_root + '/' + fname
+  key = (site_root, link_ext)
+  if key in _jinja_environments:
+    return _jinja_environments[key]
+  env = template_loader.create_environment(
+      _runfile_path(TEMPLATE_PATH), _runfile_path(COMPILED_TEMPLATES_PATH),
+      site_root, link_ext)
+  _jinja_environments[key] = env
   return env
 
 
+_runfiles_dir = None
+
 # TODO(dzc): Remove this workaround once we switch to a self-contained Python
 # binary format such as PEX.
 def _runfile_path(path):
@@ -97,6 +230,10 @@ def _runfile_path(path):
     Returns path prepended with the absolute path to the root of the runfiles
     tree.
   """
+  global _runfiles_dir
+  if _runfiles_dir:
+    return os.path.join(_runfiles_dir, WORKSPACE_DIR, path)
+
   script_filename = os.path.abspath(sys.argv[0])
   while True:
     runfiles_dir = script_filename + '.runfiles'
@@ -115,20 +252,19 @@ def _runfile_path(path):
       break
 
     raise AssertionError('Cannot find .runfiles directory.')
+  _runfiles_dir = runfiles_dir
   return os.path.join(runfiles_dir, WORKSPACE_DIR, path)
 
-def merge_languages(macro_language, rule_language):
-  for rule in rule_language.rule:
-    new_rule = macro_language.rule.add()
-    new_rule.CopyFrom(rule)
-  return macro_language
-
 class WriterOptions(object):
   def __init__(self, output_dir, output_file, output_zip, overview,
-               overview_filename, link_ext, site_root):
+               overview_filename, link_ext, site_root,
+               zip_compression='stored', shared_nav=False, search_index=False):
     self.output_dir = output_dir
     self.output_file = output_file
     self.output_zip = output_zip
+    self.zip_compression = zip_compression
+    self.shared_nav = shared_nav
+    self.search_index = search_index
     self.overview = overview
     self.overview_filename = overview_filename
     self.link_ext = link_ext
@@ -137,194 +273,813 @@ class WriterOptions(object):
     if len(self.site_root) > 0 and self.site_root.endswith('/'):
         self.site_root = self.site_root[:-1]
 
-class MarkdownWriter(object):
-  """Writer for generating documentation in Markdown."""
+def _zip_compression(compression):
+  """Returns the zipfile constant of one of ZIP_COMPRESSION_TYPES."""
+  if compression == 'stored':
+    return zipfile.ZIP_STORED
+  if compression == 'deflated':
+    return zipfile.ZIP_DEFLATED
+  # Prefer the codecs with the best compression that zipfile supports.
+  for name in ['ZIP_LZMA', 'ZIP_BZIP2']:
+    if hasattr(zipfile, name):
+      return getattr(zipfile, name)
+  return zipfile.ZIP_DEFLATED
 
-  def __init__(self, writer_options):
-    self.__options = writer_options
-    self.__env = _create_jinja_environment(self.__options.site_root,
-                                           self.__options.link_ext)
+def _zip_entry_name(output_path):
+  """Returns the relative, /-separated name of an output in the zip archive."""
+  name = os.path.normpath(os.path.splitdrive(output_path)[1])
+  name = name.replace(os.sep, '/')
+  return name.lstrip('/')
 
-  def write(self, rulesets):
-    """Write the documentation for the rules contained in rulesets."""
-    try:
-      temp_dir = tempfile.mkdtemp()
-      output_files = []
-      for ruleset in rulesets:
-        if not ruleset.empty():
-          output_files.append(self._write_ruleset(temp_dir, ruleset))
-      if self.__options.overview:
-        output_files.append(self._write_overview(temp_dir, rulesets))
-
-      if self.__options.output_zip:
-        # We are generating a zip archive containing all the documentation.
-        # Write each documentation file generated in the temp directory to the
-        # zip file.
-        with zipfile.ZipFile(self.__options.output_file, 'w') as zf:
-          for output_file, output_path in output_files:
-            zf.write(output_file, output_path)
+class _Output(object):
+  """Destination of the generated documentation files.
+
+  Files are added one at a time and are written to the zip archive or to the
+  output directory right away, so that documentation is written as it is
+  generated. Rendered pages are written to zip archives straight from memory.
+  """
+
+  def __init__(self, options):
+    self.__options = options
+    self.__zip = None
+    if options.output_zip:
+      self.__zip = zipfile.ZipFile(options.output_file, 'w',
+                                   _zip_compression(options.zip_compression),
+                                   allowZip64=True)
+    # Dict mapping the path of each output file to the .bzl file it documents,
+    # or to None for outputs that are not specific to a single rule set.
+    self.outputs = {}
+    # Dict mapping the path of each output file to its size in bytes.
+    self.sizes = {}
+    # The directories created for the output files.
+    self.__created_dirs = []
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *unused_exc_info):
+    self.close()
+
+  def add(self, output_path, content, bzl_file=None):
+    """Writes content to output_path, relative to the output root."""
+    if isinstance(content, unicode):
+      content = content.encode('utf-8')
+    span_args = {'output': output_path}
+    if bzl_file:
+      span_args['file'] = bzl_file
+    with profiler.span('write', **span_args):
+      if self.__zip:
+        self._write_zip_entry(output_path, content)
       else:
-        # We are generating documentation in the output_dir directory. Copy each
-        # documentation file to output_dir.
-        for output_file, output_path in output_files:
-          dest_file = os.path.join(self.__options.output_dir, output_path)
-          dest_dir = os.path.dirname(dest_file)
-          if not os.path.exists(dest_dir):
-            os.makedirs(dest_dir)
-          shutil.copyfile(output_file, dest_file)
-
-    finally:
-      # Delete temporary directory.
-      shutil.rmtree(temp_dir)
-
-  def _write_ruleset(self, output_dir, ruleset):
-    # Load template and render Markdown.
-    template = self.__env.get_template('markdown.jinja')
-    out = template.render(ruleset=ruleset)
-
-    # Write output to file. Output files are created in a directory structure
-    # that matches that of the input file.
-    output_path = ruleset.output_file + '.md'
-    output_file = "%s/%s" % (output_dir, output_path)
-    file_dirname = os.path.dirname(output_file)
-    if not os.path.exists(file_dirname):
-      os.makedirs(file_dirname)
-    with open(output_file, "w") as f:
-      f.write(out)
-    return (output_file, output_path)
-
-  def _write_overview(self, output_dir, rulesets):
-    template = self.__env.get_template('markdown_overview.jinja')
-    out = template.render(rulesets=rulesets)
-
-    output_file = "%s/%s.md" % (output_dir, self.__options.overview_filename)
-    with open(output_file, "w") as f:
-      f.write(out)
-    return (output_file, "%s.md" % self.__options.overview_filename)
-
-class HtmlWriter(object):
+        with open(self._output_dir_path(output_path), "w") as f:
+          f.write(content)
+    self.outputs[output_path] = bzl_file
+    self.sizes[output_path] = len(content)
+
+  def add_file(self, path, output_path):
+    """Copies the file at path to output_path, relative to the output root."""
+    with profiler.span('write', output=output_path):
+      if self.__zip:
+        with open(path, "rb") as f:
+          self._write_zip_entry(output_path, f.read())
+      else:
+        shutil.copyfile(path, self._output_dir_path(output_path))
+    self.outputs[output_path] = None
+    self.sizes[output_path] = os.path.getsize(path)
+
+  def _write_zip_entry(self, output_path, content):
+    info = zipfile.ZipInfo(_zip_entry_name(output_path), ZIP_DATE_TIME)
+    info.compress_type = self.__zip.compression
+    info.create_system = ZIP_CREATE_SYSTEM_UNIX
+    info.external_attr = ZIP_FILE_MODE << 16
+    self.__zip.writestr(info, content)
+
+  def _output_dir_path(self, output_path):
+    # Output files are created in a directory structure that matches that of
+    # the input files.
+    dest_file = os.path.join(self.__options.output_dir, output_path)
+    dest_dir = os.path.dirname(dest_file)
+    if not os.path.exists(dest_dir):
+      created_dir = dest_dir
+      while created_dir and not os.path.exists(created_dir):
+        self.__created_dirs.append(created_dir)
+        created_dir = os.path.dirname(created_dir)
+      os.makedirs(dest_dir)
+    return dest_file
+
+  def close(self):
+    if self.__zip:
+      # Entries are written as they are generated; the central directory,
+      # which is what readers list, is sorted by name.
+      self.__zip.filelist.sort(key=lambda info: info.filename)
+      self.__zip.close()
+
+  def discard(self):
+    """Closes the output and deletes the files and directories it created."""
+    self.close()
+    if self.__options.output_zip:
+      if os.path.exists(self.__options.output_file):
+        os.remove(self.__options.output_file)
+      return
+    for output_path in self.outputs:
+      path = os.path.join(self.__options.output_dir, output_path)
+      if os.path.exists(path):
+        os.remove(path)
+    # Subdirectories sort after their parent, so they are deleted first.
+    for created_dir in sorted(self.__created_dirs, reverse=True):
+      if os.path.isdir(created_dir) and not os.listdir(created_dir):
+        os.rmdir(created_dir)
+
+class _Writer(object):
+  """Base class of the writers, which render the documentation pages.
+
+  Pages are written to an _Output one rule set at a time by write_ruleset.
+  Writers that need the summaries of all rule sets before they render any
+  page, such as the HTML writer for its navigation, set needs_summaries and
+  must be passed the summaries with set_summaries first.
+  """
+
+  needs_summaries = False
+
+  def __init__(self, options):
+    self._options = options
+    self._env = _create_jinja_environment(self._options.site_root,
+                                          self._options.link_ext)
+
+  def open(self):
+    """Returns the _Output to write the documentation to."""
+    return _Output(self._options)
+
+  def set_summaries(self, summaries):
+    """Sets the RuleSetSummary objects of all rule sets."""
+    pass
+
+  def write_ruleset(self, output, ruleset):
+    """Renders the pages of the RuleSet and writes them to output.
+
+    A split rule set is written as an index page, listing its definitions,
+    and a page for each definition.
+    """
+    if ruleset.empty():
+      return
+    if not ruleset.split:
+      self._write_page(output, ruleset, ruleset.output_file,
+                       ruleset.definitions)
+      return
+    self._write_page(output, ruleset, ruleset.output_file, [])
+    for definition in ruleset.definitions:
+      self._write_page(output, ruleset, definition.output_file, [definition],
+                       definition)
+
+  def _write_page(self, output, ruleset, output_file, definitions,
+                  page_rule=None):
+    page_path = self._page_path(output_file)
+    with profiler.span('render', file=ruleset.bzl_file, output=page_path):
+      content = self._render_ruleset(ruleset, definitions, page_rule)
+    output.add(page_path, content, ruleset.bzl_file)
+
+  def write_overview(self, output, summaries):
+    """Renders the overview page, if it is enabled, and writes it to output."""
+    if self._options.overview:
+      with profiler.span('render', output=self._overview_path()):
+        content = self._render_overview(summaries)
+      output.add(self._overview_path(), content)
+
+  def finish(self, output):
+    """Writes the files shared by all pages to output."""
+    pass
+
+  def write(self, rulesets, summaries=None, write_overview=True):
+    """Write the documentation for the rules contained in rulesets.
+
+    Args:
+      rulesets: List of RuleSets to write documentation pages for.
+      summaries: List of RuleSetSummary objects for all rule sets, used to
+        render the navigation and the overview. Defaults to rulesets.
+      write_overview: Whether to write the overview page if it is enabled.
+
+    Returns:
+      Dict mapping the path of each output file to the .bzl file it documents,
+      or to None for outputs that are not specific to a single rule set.
+    """
+    if summaries is None:
+      summaries = rulesets
+    self.set_summaries(summaries)
+    with self.open() as output:
+      for ruleset in rulesets:
+        self.write_ruleset(output, ruleset)
+      if write_overview:
+        self.write_overview(output, summaries)
+      self.finish(output)
+    return output.outputs
+
+class MarkdownWriter(_Writer):
+  """Writer for generating documentation in Markdown."""
+
+  def _page_path(self, output_file):
+    return output_file + '.md'
+
+  def _render_ruleset(self, ruleset, definitions, page_rule=None):
+    template = self._env.get_template('markdown.jinja')
+    return template.render(ruleset=ruleset, definitions=definitions,
+                           page_rule=page_rule)
+
+  def _overview_path(self):
+    return "%s.md" % self._options.overview_filename
+
+  def _render_overview(self, summaries):
+    template = self._env.get_template('markdown_overview.jinja')
+    return template.render(rulesets=summaries)
+
+class HtmlWriter(_Writer):
   """Writer for generating documentation in HTML."""
 
+  needs_summaries = True
+
   def __init__(self, options):
-    self.__options = options
-    self.__env = _create_jinja_environment(self.__options.site_root,
-                                           self.__options.link_ext)
+    super(HtmlWriter, self).__init__(options)
+    self.__nav = None
+    self.__search_index = None
 
-  def write(self, rulesets):
+  def set_summaries(self, summaries):
     # Generate navigation used for all rules.
-    nav_template = self.__env.get_template('nav.jinja')
-    nav = nav_template.render(
-        rulesets=rulesets,
-        overview=self.__options.overview,
-        overview_filename=self.__options.overview_filename)
+    nav_template = self._env.get_template('nav.jinja')
+    with profiler.span('render', output='nav'):
+      self.__nav = nav_template.render(
+          rulesets=summaries,
+          overview=self._options.overview,
+          overview_filename=self._options.overview_filename,
+          search=self._options.search_index,
+          search_page=SEARCH_PAGE)
+    if self._options.search_index:
+      self.__search_index = search_index.SearchIndex(
+          self._env.filters['doc_link'])
+
+  def write_ruleset(self, output, ruleset):
+    super(HtmlWriter, self).write_ruleset(output, ruleset)
+    if self.__search_index and not ruleset.empty():
+      with profiler.span('search_index', file=ruleset.bzl_file):
+        self.__search_index.add_ruleset(output.add, ruleset)
+
+  def finish(self, output):
+    output.add_file(os.path.join(_runfile_path(CSS_PATH), CSS_FILE), CSS_FILE)
+    if self.__search_index:
+      shards = self.__search_index.finish(output.add)
+      search_root = self._env.filters['link'](search_index.SEARCH_DIR) + '/'
+      output.add('%s.html' % SEARCH_PAGE, self._render_page(
+          'search.jinja', 'Search',
+          config=search_index.page_config(search_root, shards)))
+    if self._options.shared_nav:
+      # nav.js fills in the navigation of the page that loads it.
+      nav_script = 'document.getElementById("drawer-nav").innerHTML = %s;\n' % (
+          json.dumps(self.__nav))
+      output.add(NAV_SCRIPT_FILE, nav_script)
+
+  def _render_page(self, template_name, title, **kwargs):
+    return self._env.get_template(template_name).render(
+        title=title, nav=self.__nav, shared_nav=self._options.shared_nav,
+        **kwargs)
+
+  def _page_path(self, output_file):
+    return output_file + '.html'
+
+  def _render_ruleset(self, ruleset, definitions, page_rule=None):
+    title = page_rule.name if page_rule else ruleset.title
+    return self._render_page('html.jinja', title, ruleset=ruleset,
+                             definitions=definitions, page_rule=page_rule)
+
+  def _overview_path(self):
+    return "%s.html" % self._options.overview_filename
 
+  def _render_overview(self, summaries):
+    return self._render_page('html_overview.jinja', 'Overview',
+                             rulesets=summaries)
+
+def _iter_extracted(bzl_files, cache, module_loader):
+  """Extracts the given .bzl files and yields (bzl_file, ExtractedFile) pairs.
+
+  Files skipped because they ran over their --file_timeout_s or
+  --file_memory_mb budget are not yielded.
+  """
+  extracted_files = file_extractor.extract_files(
+      bzl_files, FLAGS.jobs, cache, module_loader, FLAGS.static_extraction,
+      FLAGS.file_timeout_s or None, FLAGS.file_memory_mb * 1024 * 1024 or None)
+  for bzl_file in bzl_files:
     try:
-      temp_dir = tempfile.mkdtemp()
-      output_files = []
-      for ruleset in rulesets:
-        if not ruleset.empty():
-          output_files.append(self._write_ruleset(temp_dir, ruleset, nav))
-      if self.__options.overview:
-        output_files.append(self._write_overview(temp_dir, rulesets, nav))
-
-      if self.__options.output_zip:
-        with zipfile.ZipFile(self.__options.output_file, 'w') as zf:
-          for output_file, output_path in output_files:
-            zf.write(output_file, output_path)
-          zf.write(os.path.join(_runfile_path(CSS_PATH), CSS_FILE),
-                                '%s' % CSS_FILE)
+      extracted = next(extracted_files)
+    except load_extractor.LoadExtractorError as e:
+      print("ERROR: Error extracting loaded symbols from %s: %s" %
+            (bzl_file, str(e)))
+      sys.exit(2)
+
+    if extracted:
+      yield bzl_file, extracted
+
+def _write_extracted(extracted_files, output_file):
+  """Writes the (bzl_file, ExtractedFile) pairs as delimited protos."""
+  with open(output_file, 'wb') as f:
+    for bzl_file, extracted in extracted_files:
+      proto_export.write_delimited(
+          f, proto_export.exported_proto(bzl_file, extracted))
+
+def _read_extracted(paths, strip_prefix):
+  """Yields the (bzl_file, ExtractedFile) pairs stored in the given files.
+
+  The files are written by --extract_only or --export_formats=delimited.
+  """
+  for path in paths:
+    with open(path, 'rb') as f:
+      for proto in proto_export.read_delimited(f):
+        bzl_file = proto.bzl_file.encode('utf-8')
+        try:
+          common.validate_strip_prefix(strip_prefix, [bzl_file])
+        except common.InputError as err:
+          print(err.message)
+          sys.exit(1)
+        yield bzl_file, file_extractor.ExtractedFile.from_proto(proto)
+
+def _create_ruleset(bzl_file, extracted, strip_prefix):
+  with profiler.span('RuleSet', file=bzl_file):
+    return rule.RuleSet(bzl_file, extracted.language, extracted.title,
+                        extracted.description, strip_prefix, FLAGS.format,
+                        FLAGS.split_threshold)
+
+def _extract_rulesets(bzl_files, strip_prefix, cache, module_loader,
+                      loaded_files=None):
+  """Extracts the RuleSets documented in the given .bzl files.
+
+  If loaded_files is a dict, the files load()ed by each .bzl file to resolve
+  symbols are recorded in it, keyed by the .bzl file. Files skipped because
+  they ran over their --file_timeout_s or --file_memory_mb budget have no
+  RuleSet.
+  """
+  rulesets = []
+  for bzl_file, extracted in _iter_extracted(bzl_files, cache, module_loader):
+    if loaded_files is not None:
+      loaded_files[bzl_file] = extracted.loaded_files
+    rulesets.append(_create_ruleset(bzl_file, extracted, strip_prefix))
+  return rulesets
+
+def _write_streaming(writer, extracted_files, strip_prefix, exporter=None):
+  """Renders and writes the documentation one file at a time.
+
+  extracted_files is an iterable of (bzl_file, ExtractedFile) pairs, which
+  are extracted or read as they are iterated. Each page is written as soon as
+  its .bzl file is extracted, and only the summary of its rule set is kept for
+  the overview, so memory does not grow with the size of the rule sets. If
+  the writer needs the summaries of all rule sets before rendering any page,
+  the extracted files are spooled to a temporary file as serialized protos
+  until all of them are extracted.
+
+  If exporter is set, it exports each extracted file as it is extracted.
+
+  Returns:
+    Dict mapping the path of each output file to its size in bytes.
+  """
+  summaries = []
+  output = writer.open()
+  try:
+    with output:
+      if not writer.needs_summaries:
+        for bzl_file, extracted in extracted_files:
+          ruleset = _create_ruleset(bzl_file, extracted, strip_prefix)
+          writer.write_ruleset(output, ruleset)
+          summaries.append(rule.RuleSetSummary.from_ruleset(ruleset))
+          if exporter:
+            exporter.add(output, ruleset, extracted)
       else:
-        for output_file, output_path in output_files:
-          dest_file = os.path.join(self.__options.output_dir, output_path)
-          dest_dir = os.path.dirname(dest_file)
-          if not os.path.exists(dest_dir):
-            os.makedirs(dest_dir)
-          shutil.copyfile(output_file, dest_file)
-
-        # Copy CSS file.
-        shutil.copyfile(os.path.join(_runfile_path(CSS_PATH), CSS_FILE),
-                        os.path.join(self.__options.output_dir, CSS_FILE))
-    finally:
-      # Delete temporary directory.
-      shutil.rmtree(temp_dir)
-
-  def _write_ruleset(self, output_dir, ruleset, nav):
-    # Load template and render markdown.
-    template = self.__env.get_template('html.jinja')
-    out = template.render(title=ruleset.title, ruleset=ruleset, nav=nav)
-
-    # Write output to file. Output files are created in a directory structure
-    # that matches that of the input file.
-    output_path = ruleset.output_file + '.html'
-    output_file = "%s/%s" % (output_dir, output_path)
-    file_dirname = os.path.dirname(output_file)
-    if not os.path.exists(file_dirname):
-      os.makedirs(file_dirname)
-    with open(output_file, "w") as f:
-      f.write(out)
-    return (output_file, output_path)
-
-  def _write_overview(self, output_dir, rulesets, nav):
-    template = self.__env.get_template('html_overview.jinja')
-    out = template.render(title='Overview', rulesets=rulesets, nav=nav)
-
-    output_file = "%s/%s.html" % (output_dir, self.__options.overview_filename)
-    with open(output_file, "w") as f:
-      f.write(out)
-    return (output_file, "%s.html" % self.__options.overview_filename)
+        with tempfile.TemporaryFile() as spool:
+          spooled_files = []
+          for bzl_file, extracted in extracted_files:
+            ruleset = _create_ruleset(bzl_file, extracted, strip_prefix)
+            summaries.append(rule.RuleSetSummary.from_ruleset(ruleset))
+            if exporter:
+              exporter.add(output, ruleset, extracted)
+            serialized = extracted.to_proto().SerializeToString()
+            spool.write(struct.pack('>I', len(serialized)))
+            spool.write(serialized)
+            spooled_files.append(bzl_file)
+
+          writer.set_summaries(summaries)
+          spool.seek(0)
+          for bzl_file in spooled_files:
+            size, = struct.unpack('>I', spool.read(4))
+            extracted = file_extractor.ExtractedFile.parse(spool.read(size))
+            writer.write_ruleset(
+                output, _create_ruleset(bzl_file, extracted, strip_prefix))
+      writer.write_overview(output, summaries)
+      writer.finish(output)
+      if exporter:
+        exporter.finish(output)
+  except BaseException:
+    # Pages are written as their files are extracted, so a run that fails
+    # midway deletes them rather than leave partial documentation behind.
+    output.discard()
+    raise
+  return output.sizes
+
+def _options_digest():
+  """Returns a digest of everything besides the inputs that affects output."""
+  template_dir = _runfile_path(TEMPLATE_PATH)
+  templates = {}
+  for template in os.listdir(template_dir):
+    templates[template] = manifest.file_digest(
+        os.path.join(template_dir, template))
+  return manifest.json_digest({
+      'format': FLAGS.format,
+      'strip_prefix': FLAGS.strip_prefix,
+      'overview': FLAGS.overview,
+      'overview_filename': FLAGS.overview_filename,
+      'link_ext': FLAGS.link_ext,
+      'site_root': FLAGS.site_root,
+      'resolve_loads': FLAGS.resolve_loads,
+      'workspace_root': FLAGS.workspace_root,
+      'static_extraction': FLAGS.static_extraction,
+      'shared_nav': FLAGS.shared_nav,
+      'split_threshold': FLAGS.split_threshold,
+      'stubs': extraction_cache.stubs_fingerprint(),
+      'templates': templates,
+  })
+
+def _write_incremental(writer, bzl_files, strip_prefix, cache, module_loader):
+  """Regenerates the documentation in --output_dir for changed inputs only.
+
+  The manifest written by the previous run is used to find the .bzl files that
+  changed since then. Only those are extracted and rendered. The overview and
+  the HTML navigation, which is inlined in every HTML page, are only rendered
+  again if the summaries they are generated from changed. Outputs of inputs
+  that were removed are deleted. With --resolve_loads, a change to a load()ed
+  file also counts as a change to the files that load it.
+  """
+  output_dir = FLAGS.output_dir
+  old = manifest.Manifest.load(output_dir)
+  current = manifest.Manifest(_options_digest())
+  previous = old
+  if previous.options_digest != current.options_digest:
+    previous = manifest.Manifest()
+
+  changed_files = []
+  for bzl_file in bzl_files:
+    input_digest = manifest.file_digest(bzl_file)
+    entry = previous.reusable_entry(output_dir, bzl_file, input_digest,
+                                    FLAGS.workspace_root)
+    if entry:
+      current.entries[bzl_file] = manifest.ManifestEntry(
+          entry.input_digest, entry.summary, list(entry.outputs),
+          entry.loaded_files)
+    else:
+      current.entries[bzl_file] = manifest.ManifestEntry(input_digest)
+      changed_files.append(bzl_file)
+
+  loaded_files = {}
+  rulesets = _extract_rulesets(changed_files, strip_prefix, cache,
+                               module_loader, loaded_files)
+  for ruleset in rulesets:
+    entry = current.entries[ruleset.bzl_file]
+    entry.summary = rule.RuleSetSummary.from_ruleset(ruleset)
+    entry.loaded_files = loaded_files[ruleset.bzl_file]
+  for bzl_file in changed_files:
+    if not current.entries[bzl_file].summary:
+      # The file was skipped, so it is not documented until it is fixed.
+      del current.entries[bzl_file]
+  bzl_files = [f for f in bzl_files if f in current.entries]
+  summaries = [current.entries[bzl_file].summary for bzl_file in bzl_files]
+  current.nav_digest = manifest.json_digest(
+      [summary.nav_key() for summary in summaries])
+  current.overview_digest = manifest.json_digest(
+      [summary.to_dict() for summary in summaries])
+
+  if FLAGS.format == 'html' and current.nav_digest != previous.nav_digest:
+    # The navigation is inlined in every HTML page, so every page needs to be
+    # rendered again.
+    changed = set(changed_files)
+    unchanged_files = [f for f in bzl_files if f not in changed]
+    rulesets.extend(_extract_rulesets(unchanged_files, strip_prefix, cache,
+                                      module_loader))
+    rulesets_by_file = dict((r.bzl_file, r) for r in rulesets)
+    rulesets = [rulesets_by_file[bzl_file] for bzl_file in bzl_files
+                if bzl_file in rulesets_by_file]
+
+  entry_outputs = set()
+  for entry in previous.entries.itervalues():
+    entry_outputs.update(entry.outputs)
+  shared_outputs = [output for output in previous.outputs
+                    if output not in entry_outputs]
+  write_overview = (current.overview_digest != previous.overview_digest or
+                    not previous.outputs_intact(output_dir, shared_outputs))
+
+  for ruleset in rulesets:
+    current.entries[ruleset.bzl_file].outputs = []
+  outputs = writer.write(rulesets, summaries, write_overview)
+  for output, bzl_file in outputs.iteritems():
+    current.outputs[output] = manifest.file_digest(
+        os.path.join(output_dir, output))
+    if bzl_file:
+      current.entries[bzl_file].outputs.append(output)
+  for entry in current.entries.itervalues():
+    for output in entry.outputs:
+      current.outputs.setdefault(output, previous.outputs.get(output))
+  for output in shared_outputs:
+    current.outputs.setdefault(output, previous.outputs[output])
+
+  for output in old.outputs:
+    if output not in current.outputs:
+      output_file = os.path.join(output_dir, output)
+      if os.path.exists(output_file):
+        os.remove(output_file)
+  current.save(output_dir)
+
+def _watch(writer, bzl_files, strip_prefix, cache, module_loader):
+  """Regenerates the documentation whenever an input file changes.
+
+  The rule sets of all files are kept in memory, so a change only requires
+  extracting and rendering the changed files. The overview is rendered again
+  if their summaries changed, and all HTML pages are if the navigation inlined
+  in them changed. With --resolve_loads, the files load()ed by the inputs are
+  watched too, and a change to one of them regenerates the inputs loading it.
+  """
+  loaded_files = {}
+  rulesets = _extract_rulesets(bzl_files, strip_prefix, cache, module_loader,
+                               loaded_files)
+  writer.write(rulesets)
+  rulesets_by_file = dict((ruleset.bzl_file, ruleset) for ruleset in rulesets)
+  summaries_by_file = dict(
+      (ruleset.bzl_file, rule.RuleSetSummary.from_ruleset(ruleset))
+      for ruleset in rulesets)
+
+  server = None
+  if FLAGS.serve_port:
+    server = watch.PreviewServer(FLAGS.output_dir, FLAGS.serve_port)
+    server.start()
+    print('Serving documentation at http://localhost:%d/' % FLAGS.serve_port)
+
+  watched_files = None
+  while True:
+    dependencies = sorted(
+        set(os.path.join(FLAGS.workspace_root, loaded_file)
+            for files in loaded_files.itervalues() for loaded_file in files) -
+        set(bzl_files))
+    if watched_files != bzl_files + dependencies:
+      watched_files = bzl_files + dependencies
+      watcher = watch.FileWatcher(watched_files)
+    print('Watching %d files for changes.' % len(watched_files))
+    changed = set(
+        watcher.wait_for_changes(FLAGS.watch_interval_ms / 1000.0))
+    start = time.time()
+    changed_files = [
+        f for f in bzl_files
+        if f in changed or any(
+            os.path.join(FLAGS.workspace_root, loaded_file) in changed
+            for loaded_file in loaded_files.get(f, {}))]
+    if module_loader:
+      module_loader.clear()
+    try:
+      changed_rulesets = _extract_rulesets(changed_files, strip_prefix, cache,
+                                           module_loader, loaded_files)
+    except (Exception, SystemExit) as e:
+      # Keep watching so that the error can be fixed without restarting.
+      print('ERROR: Failed to extract documentation from %s: %s' %
+            (', '.join(changed_files), e))
+      continue
+
+    old_summaries = [summaries_by_file[f] for f in bzl_files
+                     if f in summaries_by_file]
+    for ruleset in changed_rulesets:
+      rulesets_by_file[ruleset.bzl_file] = ruleset
+      summaries_by_file[ruleset.bzl_file] = (
+          rule.RuleSetSummary.from_ruleset(ruleset))
+    summaries = [summaries_by_file[f] for f in bzl_files
+                 if f in summaries_by_file]
+
+    write_overview = ([s.to_dict() for s in summaries] !=
+                      [s.to_dict() for s in old_summaries])
+    if (FLAGS.format == 'html' and
+        [s.nav_key() for s in summaries] !=
+        [s.nav_key() for s in old_summaries]):
+      changed_rulesets = [rulesets_by_file[f] for f in bzl_files
+                          if f in rulesets_by_file]
+    writer.write(changed_rulesets, summaries, write_overview)
+    print('Regenerated documentation for %s in %d ms.' %
+          (', '.join(changed_files), (time.time() - start) * 1000))
+    if server:
+      server.notify_reload()
+
+# Extraction caches kept warm across persistent worker requests.
+_extraction_caches = {}
 
 def main(argv):
   if FLAGS.output_dir and FLAGS.output_file:
     sys.stderr.write('Only one of --output_dir or --output_file can be set.')
     sys.exit(1)
 
+  if FLAGS.incremental and FLAGS.zip:
+    sys.stderr.write('--incremental requires --zip=false.')
+    sys.exit(1)
+
+  if FLAGS.watch and FLAGS.zip:
+    sys.stderr.write('--watch requires --zip=false.')
+    sys.exit(1)
+
+  if FLAGS.search_index and (FLAGS.incremental or FLAGS.watch):
+    sys.stderr.write('--search_index is not supported with --incremental or '
+                     '--watch.')
+    sys.exit(1)
+
+  if FLAGS.from_extracted and (FLAGS.incremental or FLAGS.watch or
+                               FLAGS.extract_only):
+    sys.stderr.write('--from_extracted is not supported with --incremental, '
+                     '--watch or --extract_only.')
+    sys.exit(1)
+
+  if FLAGS.extract_only and not FLAGS.output_file:
+    sys.stderr.write('--extract_only requires --output_file.')
+    sys.exit(1)
+
+  if FLAGS.profile and FLAGS.watch:
+    sys.stderr.write('--profile is not supported with --watch.')
+    sys.exit(1)
+
+  if FLAGS.stats_json and (FLAGS.incremental or FLAGS.watch):
+    sys.stderr.write('--stats_json is not supported with --incremental or '
+                     '--watch.')
+    sys.exit(1)
+
+  if FLAGS.export_formats and (FLAGS.incremental or FLAGS.watch):
+    sys.stderr.write('--export_formats is not supported with --incremental or '
+                     '--watch.')
+    sys.exit(1)
+
+  for export_format in FLAGS.export_formats:
+    if export_format not in proto_export.EXPORT_FORMATS:
+      sys.stderr.write('Invalid export format: %s. Possible values are %s.' %
+                       (export_format, ', '.join(proto_export.EXPORT_FORMATS)))
+      sys.exit(1)
+
+  if FLAGS.zip_compression not in ZIP_COMPRESSION_TYPES:
+    sys.stderr.write('Invalid zip compression: %s. Possible values are %s.' %
+                     (FLAGS.zip_compression, ', '.join(ZIP_COMPRESSION_TYPES)))
+    sys.exit(1)
+  if FLAGS.zip_compression_level != -1:
+    sys.stderr.write('--zip_compression_level is not supported by the zipfile '
+                     'module of Python 2.7.')
+    sys.exit(1)
+
   if not FLAGS.output_dir:
     FLAGS.output_dir = DEFAULT_OUTPUT_DIR
   if not FLAGS.output_file:
     FLAGS.output_file = DEFAULT_OUTPUT_FILE
 
-  bzl_files = argv[1:]
+  if FLAGS.from_extracted:
+    # The .bzl files are only known once the protos are read; each of them is
+    # validated as it is read.
+    bzl_files = []
+    extracted_paths = argv[1:]
+  else:
+    bzl_files = argv[1:]
+    extracted_paths = []
   try:
     strip_prefix = common.validate_strip_prefix(FLAGS.strip_prefix, bzl_files)
   except common.InputError as err:
     print(err.message)
     sys.exit(1)
 
-  rulesets = []
-  load_sym_extractor = load_extractor.LoadExtractor()
-  for bzl_file in bzl_files:
-    load_symbols = []
-    try:
-      load_symbols = load_sym_extractor.extract(bzl_file)
-    except load_extractor.LoadExtractorError as e:
-      print("ERROR: Error extracting loaded symbols from %s: %s" %
-            (bzl_file, str(e)))
-      sys.exit(2)
+  cache = None
+  if FLAGS.cache_dir:
+    cache_options = 'resolve_loads=%s workspace_root=%s static=%s' % (
+        FLAGS.resolve_loads, FLAGS.workspace_root, FLAGS.static_extraction)
+    cache_key = (FLAGS.cache_dir, FLAGS.cache_size_mb, cache_options)
+    if cache_key not in _extraction_caches:
+      _extraction_caches[cache_key] = extraction_cache.ExtractionCache(
+          FLAGS.cache_dir, FLAGS.cache_size_mb * 1024 * 1024, cache_options,
+          FLAGS.workspace_root, FLAGS.resolve_loads)
+    cache = _extraction_caches[cache_key]
+
+  module_loader = None
+  if FLAGS.resolve_loads:
+    module_loader = module_loader_lib.ModuleLoader(FLAGS.workspace_root)
+
+  stats = None
+  if FLAGS.stats_json:
+    stats = run_stats.RunStats()
+  if FLAGS.profile or stats:
+    # Starts each request with no recorded spans.
+    profiler.enable()
+  try:
+    start_time = time.time()
+    start_cpu_time = _cpu_time()
+    start_counters = _cache_counters(cache, module_loader)
+    _generate(bzl_files, extracted_paths, strip_prefix, cache, module_loader,
+              stats)
+    if stats:
+      counters = _cache_counters(cache, module_loader)
+      caches = dict(
+          (name, run_stats.cache_stats(hits - start_counters[name][0],
+                                       misses - start_counters[name][1]))
+          for name, (hits, misses) in counters.iteritems())
+      output_format = 'extracted' if FLAGS.extract_only else FLAGS.format
+      stats.write(FLAGS.stats_json, output_format, time.time() - start_time,
+                  _cpu_time() - start_cpu_time, profiler.events(), caches,
+                  FLAGS.stats_slowest_files)
+    if FLAGS.profile:
+      profiler.write(FLAGS.profile)
+  finally:
+    # A persistent worker must not keep recording spans after a failed
+    # request.
+    profiler.disable()
+
+def _cpu_time():
+  """Returns the CPU time of skydoc and of its finished worker processes."""
+  times = os.times()
+  return sum(times[:4])
+
+def _cache_counters(cache, module_loader):
+  """Returns the (hits, misses) counters of each cache used by the run."""
+  caches = {'markdown': template_loader.markdown_filter}
+  if cache:
+    caches['extraction'] = cache
+  if module_loader:
+    # Worker processes of --jobs have their own module loaders, whose hits
+    # are not counted.
+    caches['modules'] = module_loader
+  return dict((name, (c.hits, c.misses)) for name, c in caches.iteritems())
+
+def _counted(extracted_files, stats):
+  """Yields the (bzl_file, ExtractedFile) pairs, counting them in stats."""
+  for bzl_file, extracted in extracted_files:
+    stats.add_extracted(extracted)
+    yield bzl_file, extracted
+
+def _generate(bzl_files, extracted_paths, strip_prefix, cache, module_loader,
+              stats=None):
+  """Extracts the documentation and writes it as set by the flags.
+
+  If stats is set, the files extracted and the outputs written are counted
+  in it.
+  """
+  if FLAGS.extract_only:
+    extracted_files = _iter_extracted(bzl_files, cache, module_loader)
+    if stats:
+      extracted_files = _counted(extracted_files, stats)
+    _write_extracted(extracted_files, FLAGS.output_file)
+    if stats:
+      stats.add_outputs(
+          {FLAGS.output_file: os.path.getsize(FLAGS.output_file)})
+    return
 
-    # TODO(dzc): Make MacroDocExtractor and RuleDocExtractor stateless.
-    macro_doc_extractor = macro_extractor.MacroDocExtractor()
-    rule_doc_extractor = rule_extractor.RuleDocExtractor()
-    macro_doc_extractor.parse_bzl(bzl_file)
-    rule_doc_extractor.parse_bzl(bzl_file, load_symbols)
-    merged_language = merge_languages(macro_doc_extractor.proto(),
-                                      rule_doc_extractor.proto())
-    rulesets.append(
-        rule.RuleSet(bzl_file, merged_language, macro_doc_extractor.title,
-                     macro_doc_extractor.description, strip_prefix,
-                     FLAGS.format))
   writer_options = WriterOptions(
       FLAGS.output_dir, FLAGS.output_file, FLAGS.zip, FLAGS.overview,
-      FLAGS.overview_filename, FLAGS.link_ext, FLAGS.site_root)
+      FLAGS.overview_filename, FLAGS.link_ext, FLAGS.site_root,
+      FLAGS.zip_compression, FLAGS.shared_nav, FLAGS.search_index)
   if FLAGS.format == "markdown":
-    markdown_writer = MarkdownWriter(writer_options)
-    markdown_writer.write(rulesets)
+    writer = MarkdownWriter(writer_options)
   elif FLAGS.format == "html":
-    html_writer = HtmlWriter(writer_options)
-    html_writer.write(rulesets)
+    writer = HtmlWriter(writer_options)
   else:
     sys.stderr.write(
         'Invalid output format: %s. Possible values are markdown and html'
         % FLAGS.format)
+    return
+
+  if FLAGS.watch:
+    _watch(writer, bzl_files, strip_prefix, cache, module_loader)
+  elif FLAGS.incremental:
+    _write_incremental(writer, bzl_files, strip_prefix, cache, module_loader)
+  else:
+    exporter = None
+    if FLAGS.export_formats:
+      exporter = proto_export.Exporter(FLAGS.export_formats, strip_prefix)
+    if FLAGS.from_extracted:
+      extracted_files = _read_extracted(extracted_paths, strip_prefix)
+    else:
+      extracted_files = _iter_extracted(bzl_files, cache, module_loader)
+    if stats:
+      extracted_files = _counted(extracted_files, stats)
+    sizes = _write_streaming(writer, extracted_files, strip_prefix, exporter)
+    if stats:
+      stats.add_outputs(sizes)
+
+def _expand_params_files(argv):
+  """Replaces each @file argument with the arguments listed in the file.
+
+  Bazel passes long command lines in a params file, with one argument per
+  line.
+  """
+  expanded = []
+  for arg in argv:
+    if arg.startswith('@'):
+      with open(arg[1:]) as f:
+        expanded.extend(line for line in f.read().splitlines() if line)
+    else:
+      expanded.append(arg)
+  return expanded
+
+def _run_work_request(arguments):
+  """Generates documentation for a single persistent worker request."""
+  FLAGS.Reset()
+  main(FLAGS([sys.argv[0]] + _expand_params_files(arguments)))
 
 if __name__ == '__main__':
-  main(FLAGS(sys.argv))
+  if persistent_worker.PERSISTENT_WORKER_FLAG in sys.argv:
+    persistent_worker.run(_run_work_request)
+  else:
+    main(FLAGS(_expand_params_files(sys.argv)))
@@ -0,0 +1,509 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import distutils.spawn
+import hashlib
+import json
+import os
+import shutil
+import StringIO
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+import zipfile
+# internal imports
+
+from skydoc import main
+from skydoc import profiler
+
+
+class ReproducibleZipTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.bzl_files = []
+    for name in ['b', 'a']:
+      bzl_file = os.path.join(self.temp_dir, 'pkg', '%s.bzl' % name)
+      if not os.path.exists(os.path.dirname(bzl_file)):
+        os.makedirs(os.path.dirname(bzl_file))
+      with open(bzl_file, 'w') as f:
+        f.write(textwrap.dedent("""\
+            def _impl(ctx):
+              return struct()
+
+            %s_rule = rule(
+                implementation = _impl,
+                attrs = {"deps": attr.label_list()},
+            )
+            \"\"\"A rule.
+
+            Args:
+              deps: The dependencies.
+            \"\"\"
+            """ % name))
+      self.bzl_files.append(bzl_file)
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def generate(self, output_file, format):
+    main.FLAGS(['skydoc', '--format=%s' % format, '--overview',
+                '--output_file=%s' % output_file,
+                '--strip_prefix=%s' % self.temp_dir,
+                '--zip_compression=deflated'] + self.bzl_files)
+    try:
+      main.main(['skydoc'] + self.bzl_files)
+    finally:
+      main.FLAGS.Reset()
+    with open(output_file, 'rb') as f:
+      return hashlib.sha256(f.read()).hexdigest()
+
+  def check_reproducible(self, format):
+    first = self.generate(os.path.join(self.temp_dir, 'first.zip'), format)
+    # Touch the inputs, as a fresh checkout would.
+    for bzl_file in self.bzl_files:
+      os.utime(bzl_file, (0, 0))
+    second = self.generate(os.path.join(self.temp_dir, 'second.zip'), format)
+    self.assertEqual(first, second)
+
+    with zipfile.ZipFile(os.path.join(self.temp_dir, 'first.zip')) as zf:
+      names = zf.namelist()
+      self.assertEqual(sorted(names), names)
+      self.assertIn('pkg/a.%s' % ('md' if format == 'markdown' else format),
+                    names)
+      for info in zf.infolist():
+        self.assertNotIn(self.temp_dir, zf.read(info))
+        self.assertEqual(main.ZIP_DATE_TIME, info.date_time)
+        self.assertEqual(main.ZIP_FILE_MODE, info.external_attr >> 16)
+
+  def test_markdown_is_reproducible(self):
+    self.check_reproducible('markdown')
+
+  def test_html_is_reproducible(self):
+    self.check_reproducible('html')
+
+  def test_rendering_extracted_files_matches(self):
+    expected = self.generate(os.path.join(self.temp_dir, 'expected.zip'),
+                             'html')
+
+    extracted_paths = []
+    for bzl_file in self.bzl_files:
+      extracted_path = bzl_file + '.pb'
+      try:
+        main.main(main.FLAGS(['skydoc', '--extract_only',
+                              '--output_file=%s' % extracted_path, bzl_file]))
+      finally:
+        main.FLAGS.Reset()
+      extracted_paths.append(extracted_path)
+    # The sources are not read when rendering.
+    for bzl_file in self.bzl_files:
+      os.remove(bzl_file)
+
+    output_file = os.path.join(self.temp_dir, 'rendered.zip')
+    try:
+      main.main(main.FLAGS(['skydoc', '--format=html', '--overview',
+                            '--from_extracted',
+                            '--output_file=%s' % output_file,
+                            '--strip_prefix=%s' % self.temp_dir,
+                            '--zip_compression=deflated'] + extracted_paths))
+    finally:
+      main.FLAGS.Reset()
+    with open(output_file, 'rb') as f:
+      self.assertEqual(expected, hashlib.sha256(f.read()).hexdigest())
+
+
+class ZipCompressionTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.bzl_file = os.path.join(self.temp_dir, 'rules.bzl')
+    attrs = ''.join('"attr_%d": attr.string(),' % i for i in range(200))
+    docs = ''.join('  attr_%d: Attribute %d of the rule, with %s.\n' %
+                   (i, i, ' and '.join(str(j * i) for j in range(i % 7)))
+                   for i in range(200))
+    with open(self.bzl_file, 'w') as f:
+      f.write('def _impl(ctx):\n'
+              '  return struct()\n\n'
+              'foo_rule = rule(implementation = _impl, attrs = {%s})\n'
+              '"""A rule.\n\nArgs:\n%s"""\n' % (attrs, docs))
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def test_deflated(self):
+    output_file = os.path.join(self.temp_dir, 'docs.zip')
+    argv = ['skydoc', '--format=html', '--output_file=%s' % output_file,
+            '--zip_compression=deflated',
+            '--strip_prefix=%s' % self.temp_dir, self.bzl_file]
+    try:
+      main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+    with zipfile.ZipFile(output_file) as zf:
+      self.assertIsNone(zf.testzip())
+      info = zf.getinfo('rules.html')
+      self.assertEqual(zipfile.ZIP_DEFLATED, info.compress_type)
+      self.assertLess(info.compress_size, info.file_size)
+      self.assertIn('foo_rule', zf.read('rules.html'))
+
+  def test_level_is_rejected(self):
+    argv = ['skydoc', '--zip_compression=deflated',
+            '--zip_compression_level=9', self.bzl_file]
+    try:
+      with self.assertRaises(SystemExit):
+        main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+
+
+class SharedNavTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.bzl_file = os.path.join(self.temp_dir, 'pkg', 'rules.bzl')
+    os.makedirs(os.path.dirname(self.bzl_file))
+    with open(self.bzl_file, 'w') as f:
+      f.write(textwrap.dedent("""\
+          def _impl(ctx):
+            return struct()
+
+          foo_rule = rule(implementation = _impl)
+          \"\"\"A rule.\"\"\"
+          """))
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def test_nav_is_written_once(self):
+    output_dir = os.path.join(self.temp_dir, 'docs')
+    stats_file = os.path.join(self.temp_dir, 'stats.json')
+    argv = ['skydoc', '--format=html', '--zip=false', '--shared_nav',
+            '--output_dir=%s' % output_dir,
+            '--stats_json=%s' % stats_file,
+            '--strip_prefix=%s' % self.temp_dir, self.bzl_file]
+    stdout = sys.stdout
+    sys.stdout = StringIO.StringIO()
+    try:
+      main.main(main.FLAGS(argv))
+      printed = sys.stdout.getvalue()
+    finally:
+      sys.stdout = stdout
+      main.FLAGS.Reset()
+
+    with open(os.path.join(output_dir, 'pkg', 'rules.html')) as f:
+      page = f.read()
+    self.assertIn('<script src="/nav.js"></script>', page)
+    self.assertNotIn('/pkg/rules.html#foo_rule', page)
+    with open(os.path.join(output_dir, 'nav.js')) as f:
+      self.assertIn('/pkg/rules.html#foo_rule', f.read())
+    # The size of nav.js is reported in the stats rather than printed.
+    self.assertNotIn('nav.js', printed)
+    with open(stats_file) as f:
+      stats = json.load(f)
+    self.assertEqual(os.path.getsize(os.path.join(output_dir, 'nav.js')),
+                     stats['output']['bytes_by_extension']['js'])
+
+
+class ProfileTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.bzl_file = os.path.join(self.temp_dir, 'rules.bzl')
+    with open(self.bzl_file, 'w') as f:
+      f.write(textwrap.dedent("""\
+          def _impl(ctx):
+            return struct()
+
+          foo_rule = rule(implementation = _impl)
+          \"\"\"A *rule*.\"\"\"
+          """))
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def test_stages_are_traced(self):
+    trace_file = os.path.join(self.temp_dir, 'trace.json')
+    argv = ['skydoc', '--format=html',
+            '--output_file=%s' % os.path.join(self.temp_dir, 'docs.zip'),
+            '--profile=%s' % trace_file, self.bzl_file]
+    try:
+      main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+
+    with open(trace_file) as f:
+      events = json.load(f)['traceEvents']
+    names = set(event['name'] for event in events if event['ph'] == 'X')
+    for stage in ['extract', 'parse', 'LoadExtractor', 'exec',
+                  '_extract_docstrings', '_assemble_protos', 'RuleSet',
+                  'render', 'write']:
+      self.assertIn(stage, names)
+    extract, = [event for event in events if event['name'] == 'extract']
+    self.assertEqual(self.bzl_file, extract['args']['file'])
+
+  def test_stats_json(self):
+    stats_file = os.path.join(self.temp_dir, 'stats.json')
+    argv = ['skydoc', '--format=markdown',
+            '--output_file=%s' % os.path.join(self.temp_dir, 'docs.zip'),
+            '--stats_json=%s' % stats_file, self.bzl_file]
+    try:
+      main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+
+    with open(stats_file) as f:
+      stats = json.load(f)
+    self.assertEqual(1, stats['files'])
+    self.assertEqual(1, stats['definitions']['rules'])
+    self.assertEqual(1, stats['output']['files'])
+    self.assertGreater(stats['output']['bytes_by_extension']['md'], 0)
+    self.assertEqual([self.bzl_file],
+                     [f['file'] for f in stats['slowest_files']])
+    self.assertIn('exec', stats['slowest_files'][0]['stages'])
+    self.assertIn('markdown', stats['caches'])
+
+  def test_failed_run_disables_profiler(self):
+    with open(self.bzl_file, 'a') as f:
+      f.write('load(load_label, "foo_library")\n')
+    argv = ['skydoc', '--format=html',
+            '--output_file=%s' % os.path.join(self.temp_dir, 'docs.zip'),
+            '--profile=%s' % os.path.join(self.temp_dir, 'trace.json'),
+            self.bzl_file]
+    try:
+      with self.assertRaises(SystemExit):
+        main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+    self.assertFalse(profiler.enabled())
+
+
+class SplitRulesetTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.bzl_file = os.path.join(self.temp_dir, 'pkg', 'rules.bzl')
+    os.makedirs(os.path.dirname(self.bzl_file))
+    with open(self.bzl_file, 'w') as f:
+      f.write(textwrap.dedent("""\
+          def _impl(ctx):
+            return struct()
+
+          foo_rule = rule(
+              implementation = _impl,
+              attrs = {"deps": attr.label_list()},
+          )
+          \"\"\"A foo rule.\"\"\"
+
+          bar_rule = rule(implementation = _impl)
+          \"\"\"A bar rule.\"\"\"
+          """))
+    self.output_dir = os.path.join(self.temp_dir, 'docs')
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def generate(self, split_threshold):
+    argv = ['skydoc', '--format=html', '--zip=false', '--overview',
+            '--split_threshold=%d' % split_threshold,
+            '--output_dir=%s' % self.output_dir,
+            '--strip_prefix=%s' % self.temp_dir, self.bzl_file]
+    try:
+      main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+
+  def read(self, path):
+    with open(os.path.join(self.output_dir, path)) as f:
+      return f.read()
+
+  def test_large_ruleset_is_split(self):
+    self.generate(1)
+    index = self.read('pkg/rules.html')
+    self.assertIn('href="/pkg/rules/foo_rule.html#foo_rule"', index)
+    self.assertNotIn('<pre>', index)
+    page = self.read('pkg/rules/foo_rule.html')
+    self.assertIn('href="/pkg/rules.html"', page)
+    self.assertIn('<a href="#foo_rule.deps">deps</a>', page)
+    self.assertIn('id="foo_rule.deps"', page)
+    self.assertNotIn('bar_rule(', page)
+    self.assertIn('bar_rule(', self.read('pkg/rules/bar_rule.html'))
+    self.assertIn('href="/pkg/rules/bar_rule.html#bar_rule"',
+                  self.read('index.html'))
+
+  def test_small_ruleset_is_not_split(self):
+    self.generate(2)
+    self.assertIn('href="/pkg/rules.html#foo_rule"',
+                  self.read('index.html'))
+    self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'pkg',
+                                                 'rules')))
+
+
+# Runs the script of the search page in node, against a minimal DOM whose
+# script elements load the shards from the output directory asynchronously,
+# types each query of argv[2] in turn and prints the titles of the results of
+# each.
+_SEARCH_DRIVER = r"""
+var fs = require('fs');
+var path = require('path');
+var vm = require('vm');
+var outputDir = process.argv[1];
+var queries = JSON.parse(process.argv[2]);
+
+function element() {
+  return {
+    children: [], listeners: {}, textContent: '',
+    appendChild: function(child) { this.children.push(child); },
+    addEventListener: function(type, listener) {
+      this.listeners[type] = listener;
+    },
+    set innerHTML(html) { this.children = []; }
+  };
+}
+var elements = {};
+global.window = {location: {search: ''}};
+global.document = {
+  head: {
+    appendChild: function(script) {
+      setTimeout(function() {
+        vm.runInThisContext(
+            fs.readFileSync(path.join(outputDir, script.src), 'utf8'));
+        script.onload();
+      }, 0);
+    }
+  },
+  createElement: element,
+  getElementById: function(id) {
+    return elements[id] = elements[id] || element();
+  }
+};
+var page = fs.readFileSync(path.join(outputDir, 'search.html'), 'utf8');
+vm.runInThisContext(page.match(/<script>([^<]*skydocSearch[^]*?)<\/script>/)[1]);
+
+var results = [];
+function type(i) {
+  if (i == queries.length) {
+    console.log(JSON.stringify(results));
+    return;
+  }
+  var input = document.getElementById('search-input');
+  input.value = queries[i];
+  input.listeners.input();
+  setTimeout(function() {
+    results.push(document.getElementById('search-results').children.map(
+        function(item) { return item.children[0].textContent; }));
+    type(i + 1);
+  }, 50);
+}
+type(0);
+"""
+
+
+class FailedRunTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.bzl_files = []
+    good_src = textwrap.dedent("""\
+        def _impl(ctx):
+          return struct()
+
+        foo_rule = rule(implementation = _impl)
+        \"\"\"A rule.\"\"\"
+        """)
+    for name, src in [('good.bzl', good_src),
+                      ('bad.bzl', 'load(load_label, "foo_library")\n')]:
+      bzl_file = os.path.join(self.temp_dir, 'pkg', name)
+      if not os.path.exists(os.path.dirname(bzl_file)):
+        os.makedirs(os.path.dirname(bzl_file))
+      with open(bzl_file, 'w') as f:
+        f.write(src)
+      self.bzl_files.append(bzl_file)
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def run_skydoc(self, flags):
+    argv = (['skydoc', '--strip_prefix=%s' % self.temp_dir] + flags +
+            self.bzl_files)
+    try:
+      with self.assertRaises(SystemExit):
+        main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+
+  def test_zip_is_deleted(self):
+    output_file = os.path.join(self.temp_dir, 'docs.zip')
+    self.run_skydoc(['--output_file=%s' % output_file])
+    self.assertFalse(os.path.exists(output_file))
+
+  def test_written_files_are_deleted(self):
+    output_dir = os.path.join(self.temp_dir, 'docs')
+    os.makedirs(os.path.join(output_dir, 'other'))
+    self.run_skydoc(['--format=markdown', '--zip=false',
+                     '--output_dir=%s' % output_dir])
+    self.assertEqual(['other'], os.listdir(output_dir))
+
+
+class SearchPageTest(unittest.TestCase):
+
+  def setUp(self):
+    self.node = distutils.spawn.find_executable('node')
+    if not self.node:
+      self.skipTest('node is not installed')
+    self.temp_dir = tempfile.mkdtemp()
+    self.bzl_file = os.path.join(self.temp_dir, 'pkg', 'rules.bzl')
+    os.makedirs(os.path.dirname(self.bzl_file))
+    with open(self.bzl_file, 'w') as f:
+      f.write(textwrap.dedent("""\
+          def _impl(ctx):
+            return struct()
+
+          foo_rule = rule(implementation = _impl)
+          \"\"\"A foo rule.\"\"\"
+
+          food_rule = rule(implementation = _impl)
+          \"\"\"A food rule.\"\"\"
+          """))
+    self.output_dir = os.path.join(self.temp_dir, 'docs')
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def search(self, queries):
+    """Returns the titles of the results of each query, typed in turn."""
+    argv = ['skydoc', '--format=html', '--zip=false', '--search_index',
+            '--output_dir=%s' % self.output_dir,
+            '--strip_prefix=%s' % self.temp_dir, self.bzl_file]
+    try:
+      main.main(main.FLAGS(argv))
+    finally:
+      main.FLAGS.Reset()
+    return json.loads(subprocess.check_output(
+        [self.node, '-e', _SEARCH_DRIVER, self.output_dir,
+         json.dumps(queries)]))
+
+  def test_queries_reuse_loaded_shards(self):
+    results = self.search(['fo', 'foo', 'food', 'foo'])
+    self.assertEqual(4, len(results))
+    self.assertIn('food_rule', results[0])
+    self.assertIn('foo_rule', results[1])
+    self.assertEqual('food_rule', results[2][0])
+    self.assertNotIn('foo_rule', results[2])
+    self.assertEqual('foo_rule', results[3][0])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,168 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Manifest of the inputs and outputs of generated documentation.
+
+The manifest is written next to the generated documentation in incremental
+mode. It records the digest of each input .bzl file, the outputs generated
+from it and the summary of its rule set, so that the next run only needs to
+extract and render the rule sets whose inputs changed.
+"""
+
+import hashlib
+import json
+import os
+# internal imports
+
+from skydoc import rule
+
+MANIFEST_FILENAME = '.skydoc_manifest.json'
+
+MANIFEST_VERSION = 2
+
+
+def file_digest(path):
+  """Returns the SHA-256 digest of the file, or None if it does not exist."""
+  try:
+    with open(path, 'rb') as f:
+      return hashlib.sha256(f.read()).hexdigest()
+  except IOError:
+    return None
+
+
+def json_digest(value):
+  """Returns the SHA-256 digest of the JSON serialization of value."""
+  return hashlib.sha256(json.dumps(value, sort_keys=True)).hexdigest()
+
+
+class ManifestEntry(object):
+  """The manifest entry for a single input .bzl file."""
+
+  def __init__(self, input_digest, summary=None, outputs=None,
+               loaded_files=None):
+    """Inits ManifestEntry.
+
+    Args:
+      input_digest: The digest of the input .bzl file.
+      summary: The rule.RuleSetSummary of the rule set in the file.
+      outputs: List of paths of the outputs generated for the rule set,
+        relative to the output directory.
+      loaded_files: Dict mapping the paths of the .bzl files load()ed to
+        resolve symbols used by the input to their digests.
+    """
+    self.input_digest = input_digest
+    self.summary = summary
+    self.outputs = outputs or []
+    self.loaded_files = loaded_files or {}
+
+
+class Manifest(object):
+  """Manifest of the inputs and outputs of generated documentation."""
+
+  def __init__(self, options_digest=''):
+    """Inits Manifest.
+
+    Args:
+      options_digest: Digest of the options and templates used to generate the
+        documentation. Outputs are only reused if it did not change.
+    """
+    self.options_digest = options_digest
+    self.entries = {}
+    self.outputs = {}
+    self.nav_digest = ''
+    self.overview_digest = ''
+
+  @staticmethod
+  def load(output_dir):
+    """Loads the manifest from output_dir.
+
+    Returns:
+      The Manifest, or an empty Manifest if there is no valid manifest in
+      output_dir.
+    """
+    try:
+      with open(os.path.join(output_dir, MANIFEST_FILENAME)) as f:
+        value = json.load(f)
+    except (IOError, ValueError):
+      return Manifest()
+    if value.get('version') != MANIFEST_VERSION:
+      return Manifest()
+
+    manifest = Manifest(value['options_digest'])
+    for bzl_file, entry in value['entries'].iteritems():
+      manifest.entries[bzl_file] = ManifestEntry(
+          entry['input_digest'],
+          rule.RuleSetSummary.from_dict(entry['summary']),
+          entry['outputs'],
+          entry.get('loaded_files'))
+    manifest.outputs = value['outputs']
+    manifest.nav_digest = value['nav_digest']
+    manifest.overview_digest = value['overview_digest']
+    return manifest
+
+  def save(self, output_dir):
+    """Writes the manifest to output_dir."""
+    entries = {}
+    for bzl_file, entry in self.entries.iteritems():
+      entries[bzl_file] = {
+          'input_digest': entry.input_digest,
+          'summary': entry.summary.to_dict(),
+          'outputs': entry.outputs,
+          'loaded_files': entry.loaded_files,
+      }
+    value = {
+        'version': MANIFEST_VERSION,
+        'options_digest': self.options_digest,
+        'entries': entries,
+        'outputs': self.outputs,
+        'nav_digest': self.nav_digest,
+        'overview_digest': self.overview_digest,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), 'w') as f:
+      json.dump(value, f, indent=2, sort_keys=True)
+
+  def outputs_intact(self, output_dir, outputs):
+    """Returns True if the outputs are unchanged since they were recorded."""
+    for output in outputs:
+      if (output not in self.outputs or
+          file_digest(os.path.join(output_dir, output)) !=
+          self.outputs[output]):
+        return False
+    return True
+
+  def reusable_entry(self, output_dir, bzl_file, input_digest,
+                     workspace_root=''):
+    """Returns the entry for bzl_file if its outputs can be reused.
+
+    Args:
+      output_dir: The directory containing the generated documentation.
+      bzl_file: The input .bzl file.
+      input_digest: The current digest of bzl_file.
+      workspace_root: The directory that the paths of the files load()ed by
+        bzl_file are relative to.
+
+    Returns:
+      The ManifestEntry for bzl_file if neither the file nor the files it
+      load()ed changed and its outputs are intact, or None if it needs to be
+      regenerated.
+    """
+    entry = self.entries.get(bzl_file)
+    if not entry or entry.input_digest != input_digest:
+      return None
+    for loaded_file, digest in entry.loaded_files.iteritems():
+      if file_digest(os.path.join(workspace_root, loaded_file)) != digest:
+        return None
+    if not self.outputs_intact(output_dir, entry.outputs):
+      return None
+    return entry
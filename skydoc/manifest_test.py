@@ -0,0 +1,108 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+# internal imports
+
+from skydoc import manifest
+from skydoc import rule
+
+
+def _summary():
+  return rule.RuleSetSummary(
+      'foo', 'Foo Rules', 'Foo description.', 'pkg/foo',
+      [rule.RuleSummary('foo_binary', 'Builds a foo binary.', 'pkg/foo')],
+      [rule.RuleSummary('foo_macro', 'A foo macro.', 'pkg/foo')],
+      [])
+
+
+class ManifestTest(unittest.TestCase):
+
+  def setUp(self):
+    self.output_dir = tempfile.mkdtemp()
+    os.makedirs(os.path.join(self.output_dir, 'pkg'))
+    self.output = os.path.join(self.output_dir, 'pkg', 'foo.md')
+    with open(self.output, 'w') as f:
+      f.write('# Foo Rules\n')
+
+  def tearDown(self):
+    shutil.rmtree(self.output_dir)
+
+  def create_manifest(self):
+    m = manifest.Manifest('options')
+    m.entries['pkg/foo.bzl'] = manifest.ManifestEntry(
+        'input', _summary(), ['pkg/foo.md'])
+    m.outputs['pkg/foo.md'] = manifest.file_digest(self.output)
+    m.nav_digest = 'nav'
+    m.overview_digest = 'overview'
+    return m
+
+  def test_save_load(self):
+    self.create_manifest().save(self.output_dir)
+    m = manifest.Manifest.load(self.output_dir)
+    self.assertEqual('options', m.options_digest)
+    self.assertEqual('nav', m.nav_digest)
+    self.assertEqual('overview', m.overview_digest)
+    self.assertEqual(['pkg/foo.bzl'], m.entries.keys())
+    entry = m.entries['pkg/foo.bzl']
+    self.assertEqual('input', entry.input_digest)
+    self.assertEqual(['pkg/foo.md'], entry.outputs)
+    self.assertEqual(_summary().to_dict(), entry.summary.to_dict())
+    self.assertEqual(_summary().nav_key(), entry.summary.nav_key())
+
+  def test_load_missing(self):
+    m = manifest.Manifest.load(self.output_dir)
+    self.assertEqual('', m.options_digest)
+    self.assertEqual({}, m.entries)
+
+  def test_reusable_entry(self):
+    m = self.create_manifest()
+    self.assertIsNotNone(
+        m.reusable_entry(self.output_dir, 'pkg/foo.bzl', 'input'))
+    self.assertIsNone(
+        m.reusable_entry(self.output_dir, 'pkg/foo.bzl', 'changed'))
+    self.assertIsNone(
+        m.reusable_entry(self.output_dir, 'pkg/bar.bzl', 'input'))
+
+  def test_modified_output_not_reusable(self):
+    m = self.create_manifest()
+    with open(self.output, 'a') as f:
+      f.write('Edited by hand.\n')
+    self.assertIsNone(
+        m.reusable_entry(self.output_dir, 'pkg/foo.bzl', 'input'))
+    os.remove(self.output)
+    self.assertIsNone(
+        m.reusable_entry(self.output_dir, 'pkg/foo.bzl', 'input'))
+
+  def test_changed_loaded_file_not_reusable(self):
+    defs = os.path.join(self.output_dir, 'defs.bzl')
+    with open(defs, 'w') as f:
+      f.write('X = 1\n')
+    m = self.create_manifest()
+    m.entries['pkg/foo.bzl'].loaded_files = {
+        'defs.bzl': manifest.file_digest(defs),
+    }
+    self.assertIsNotNone(m.reusable_entry(
+        self.output_dir, 'pkg/foo.bzl', 'input', self.output_dir))
+    with open(defs, 'w') as f:
+      f.write('X = 2\n')
+    self.assertIsNone(m.reusable_entry(
+        self.output_dir, 'pkg/foo.bzl', 'input', self.output_dir))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,223 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resolves load()ed symbols by evaluating the .bzl files they come from."""
+
+import hashlib
+import os
+# internal imports
+
+from skydoc import common
+from skydoc import load_extractor
+from skydoc import rule_extractor
+
+BUILD_FILES = ['BUILD', 'BUILD.bazel']
+
+EXTERNAL_DIR = 'external'
+
+
+def _repository_root(path):
+  """Returns the root of the repository containing path.
+
+  Files in external repositories are found under external/<name> in the
+  execution root, as they are in Bazel actions.
+  """
+  parts = path.split(os.sep)
+  if len(parts) > 2 and parts[0] == EXTERNAL_DIR:
+    return os.path.join(parts[0], parts[1])
+  return ''
+
+
+def _package_dir(path, repository_root, workspace_root):
+  """Returns the directory of the package containing path.
+
+  The package is the closest enclosing directory that contains a BUILD file.
+  If there is none, the directory containing path is used.
+  """
+  package_dir = os.path.dirname(path)
+  while True:
+    for build_file in BUILD_FILES:
+      if os.path.isfile(os.path.join(workspace_root, package_dir, build_file)):
+        return package_dir
+    if not package_dir or package_dir == repository_root:
+      return os.path.dirname(path)
+    package_dir = os.path.dirname(package_dir)
+
+
+def resolve_label(label, bzl_file, workspace_root=''):
+  """Returns the path of the .bzl file referred to by a load() label.
+
+  Args:
+    label: The label from the load() statement, such as "//foo:bar.bzl",
+      "@repo//foo:bar.bzl", ":bar.bzl" or the deprecated "/foo/bar".
+    bzl_file: The path of the .bzl file containing the load() statement,
+      relative to workspace_root.
+    workspace_root: The directory that paths are relative to, laid out like
+      the execution root of a Bazel action.
+
+  Returns:
+    The path of the loaded .bzl file relative to workspace_root.
+  """
+  bzl_file = os.path.normpath(bzl_file)
+  repository_root = _repository_root(bzl_file)
+  if label.startswith('@'):
+    repository, _, label = label[1:].partition('//')
+    label = '//' + label
+    if repository:
+      repository_root = os.path.join(EXTERNAL_DIR, repository)
+
+  if label.startswith('//'):
+    package, _, name = label[2:].partition(':')
+    if not name:
+      name = os.path.basename(package)
+    path = os.path.join(repository_root, package, name)
+  elif label.startswith('/'):
+    # Deprecated path-style load of the form /foo/bar, without extension.
+    path = os.path.join(repository_root, label[1:] + '.bzl')
+  else:
+    name = label[1:] if label.startswith(':') else label
+    if not name.endswith('.bzl'):
+      name += '.bzl'
+    path = os.path.join(
+        _package_dir(bzl_file, repository_root, workspace_root), name)
+  return os.path.normpath(path)
+
+
+class _Module(object):
+  """A .bzl file evaluated by the ModuleLoader."""
+
+  def __init__(self, exports, loaded_files):
+    # Dict of the public global symbols defined by the module, or None if the
+    # module could not be evaluated.
+    self.exports = exports
+    # Dict of the paths of the .bzl files the module depends on, including
+    # itself, to their digests.
+    self.loaded_files = loaded_files
+
+
+class ModuleLoader(object):
+  """Evaluates load()ed .bzl files and memoizes the symbols they export.
+
+  Each .bzl file is evaluated at most once for the lifetime of the loader, no
+  matter how many files load it. Symbols that cannot be resolved, because the
+  file cannot be found or fails to evaluate against the stubs, fall back to the
+  empty string as if they were not resolved at all.
+  """
+
+  def __init__(self, workspace_root=''):
+    self.__workspace_root = workspace_root
+    self.__modules = {}
+    self.__loading = []
+    self.hits = 0
+    self.misses = 0
+
+  @property
+  def workspace_root(self):
+    """The directory that the paths of .bzl files are relative to."""
+    return self.__workspace_root
+
+  def clear(self):
+    """Forgets all evaluated modules, for instance because files changed."""
+    self.__modules = {}
+
+  def _load_module(self, path):
+    """Returns the _Module for the .bzl file at path, evaluating it if needed.
+
+    Raises:
+      load_extractor.LoadExtractorError: If there is a cycle in the load()
+        statements.
+    """
+    if path in self.__modules:
+      self.hits += 1
+      return self.__modules[path]
+    if path in self.__loading:
+      cycle = self.__loading[self.__loading.index(path):] + [path]
+      raise load_extractor.LoadExtractorError(
+          'Cycle in load() statements: %s' % ' -> '.join(cycle))
+
+    self.misses += 1
+    self.__loading.append(path)
+    try:
+      module = self._evaluate(path)
+    finally:
+      self.__loading.pop()
+    self.__modules[path] = module
+    return module
+
+  def _evaluate(self, path):
+    """Evaluates the .bzl file at path against the Skylark stubs."""
+    full_path = os.path.join(self.__workspace_root, path)
+    try:
+      with open(full_path) as f:
+        source = f.read()
+    except IOError:
+      print('WARNING: Cannot find %s; symbols loaded from it are not '
+            'resolved.' % path)
+      return _Module(None, {})
+    loaded_files = {path: hashlib.sha256(source).hexdigest()}
+
+    try:
+      tree = common.parse_bzl(full_path)
+      load_symbols = load_extractor.LoadExtractor().extract(full_path, tree)
+    except (SyntaxError, load_extractor.LoadExtractorError) as e:
+      print('WARNING: Cannot parse %s; symbols loaded from it are not '
+            'resolved: %s' % (path, e))
+      return _Module(None, loaded_files)
+
+    values, dependencies = self.resolve(path, load_symbols)
+    loaded_files.update(dependencies)
+    env = rule_extractor.create_stubs(rule_extractor.SKYLARK_STUBS,
+                                      load_symbols, values)
+    try:
+      exec(compile(tree, full_path, 'exec')) in env
+    except Exception as e:
+      print('WARNING: Cannot evaluate %s; symbols loaded from it are not '
+            'resolved: %s' % (path, e))
+      return _Module(None, loaded_files)
+
+    exports = {}
+    for name, value in env.iteritems():
+      if (not name.startswith('_') and
+          name not in rule_extractor.SKYLARK_GLOBAL_SYMBOLS):
+        exports[name] = value
+    return _Module(exports, loaded_files)
+
+  def resolve(self, bzl_file, load_symbols):
+    """Resolves the symbols load()ed by bzl_file.
+
+    Args:
+      bzl_file: The .bzl file containing the load() statements, relative to
+        the workspace root.
+      load_symbols: List of load_extractor.LoadSymbol objects extracted from
+        bzl_file.
+
+    Returns:
+      A tuple of a dict mapping the name each resolved symbol is bound to in
+      bzl_file to its value, and a dict mapping the paths of all .bzl files
+      loaded transitively to their digests.
+
+    Raises:
+      load_extractor.LoadExtractorError: If there is a cycle in the load()
+        statements.
+    """
+    values = {}
+    loaded_files = {}
+    for load_symbol in load_symbols:
+      path = resolve_label(load_symbol.label, bzl_file, self.__workspace_root)
+      module = self._load_module(path)
+      loaded_files.update(module.loaded_files)
+      if module.exports and load_symbol.symbol in module.exports:
+        name = load_symbol.alias or load_symbol.symbol
+        values[name] = module.exports[load_symbol.symbol]
+    return values, loaded_files
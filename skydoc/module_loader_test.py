@@ -0,0 +1,182 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import file_extractor
+from skydoc import load_extractor
+from skydoc import module_loader
+
+
+class ResolveLabelTest(unittest.TestCase):
+
+  def setUp(self):
+    self.workspace_root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(self.workspace_root, 'foo', 'bar'))
+    open(os.path.join(self.workspace_root, 'foo', 'BUILD'), 'w').close()
+
+  def tearDown(self):
+    shutil.rmtree(self.workspace_root)
+
+  def resolve(self, label, bzl_file):
+    return module_loader.resolve_label(label, bzl_file, self.workspace_root)
+
+  def test_absolute_label(self):
+    self.assertEqual('baz/defs.bzl',
+                     self.resolve('//baz:defs.bzl', 'foo/foo.bzl'))
+    self.assertEqual('baz/qux/defs.bzl',
+                     self.resolve('//baz/qux:defs.bzl', 'foo/foo.bzl'))
+
+  def test_external_label(self):
+    self.assertEqual('external/repo/baz/defs.bzl',
+                     self.resolve('@repo//baz:defs.bzl', 'foo/foo.bzl'))
+    self.assertEqual('external/repo/defs.bzl',
+                     self.resolve('//:defs.bzl', 'external/repo/foo/foo.bzl'))
+
+  def test_relative_label(self):
+    self.assertEqual('foo/defs.bzl', self.resolve(':defs.bzl', 'foo/foo.bzl'))
+    # The package of foo/bar/bar.bzl is foo, which contains the BUILD file.
+    self.assertEqual('foo/defs.bzl',
+                     self.resolve(':defs.bzl', 'foo/bar/bar.bzl'))
+
+  def test_deprecated_path_label(self):
+    self.assertEqual('baz/defs.bzl', self.resolve('/baz/defs', 'foo/foo.bzl'))
+
+
+class ModuleLoaderTest(unittest.TestCase):
+
+  def setUp(self):
+    self.workspace_root = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.workspace_root)
+
+  def write(self, path, src):
+    full_path = os.path.join(self.workspace_root, path)
+    if not os.path.exists(os.path.dirname(full_path)):
+      os.makedirs(os.path.dirname(full_path))
+    with open(full_path, 'w') as f:
+      f.write(textwrap.dedent(src))
+    return full_path
+
+  def extract(self, loader, path):
+    cwd = os.getcwd()
+    os.chdir(self.workspace_root)
+    try:
+      return file_extractor.extract(path, loader)
+    finally:
+      os.chdir(cwd)
+
+  def test_loaded_attrs_are_documented(self):
+    self.write('lib/defs.bzl', """\
+        load(":common.bzl", "COMMON_ATTRS")
+
+        COMPILE_ATTRS = dict(COMMON_ATTRS, srcs = attr.label_list())
+        """)
+    self.write('lib/common.bzl', """\
+        COMMON_ATTRS = {"deps": attr.label_list()}
+        """)
+    self.write('pkg/rules.bzl', """\
+        load("//lib:defs.bzl", "COMPILE_ATTRS")
+
+        def _impl(ctx):
+          return struct()
+
+        foo_library = rule(
+            implementation = _impl,
+            attrs = COMPILE_ATTRS,
+        )
+        \"\"\"A library.
+
+        Args:
+          deps: The dependencies.
+          srcs: The sources.
+        \"\"\"
+        """)
+
+    extracted = self.extract(module_loader.ModuleLoader(), 'pkg/rules.bzl')
+    self.assertEqual(1, len(extracted.language.rule))
+    attributes = dict((attribute.name, attribute)
+                      for attribute in extracted.language.rule[0].attribute)
+    self.assertEqual(['deps', 'name', 'srcs'], sorted(attributes))
+    self.assertEqual(build_pb2.Attribute.LABEL_LIST, attributes['srcs'].type)
+    self.assertEqual('The dependencies.', attributes['deps'].documentation)
+    self.assertEqual(['lib/common.bzl', 'lib/defs.bzl'],
+                     sorted(extracted.loaded_files))
+
+  def test_modules_are_memoized(self):
+    self.write('lib/defs.bzl', """\
+        DEPS_ATTRS = {"deps": attr.label_list()}
+        """)
+    for name in ['a', 'b', 'c']:
+      self.write('pkg/%s.bzl' % name, """\
+          load("//lib:defs.bzl", "DEPS_ATTRS")
+
+          def _impl(ctx):
+            return struct()
+
+          %s_rule = rule(implementation = _impl, attrs = DEPS_ATTRS)
+          \"\"\"A rule.\"\"\"
+          """ % name)
+
+    loader = module_loader.ModuleLoader()
+    for name in ['a', 'b', 'c']:
+      extracted = self.extract(loader, 'pkg/%s.bzl' % name)
+      self.assertEqual(['deps', 'name'], sorted(
+          attribute.name for attribute in extracted.language.rule[0].attribute))
+    self.assertEqual(1, loader.misses)
+    self.assertEqual(2, loader.hits)
+
+  def test_unresolved_symbols_are_stubbed(self):
+    self.write('pkg/rules.bzl', """\
+        load("//missing:defs.bzl", "MISSING")
+
+        def _impl(ctx):
+          return struct()
+
+        foo_rule = rule(
+            implementation = _impl,
+            attrs = {"mode": attr.string(default = MISSING)},
+        )
+        \"\"\"A rule.\"\"\"
+        """)
+
+    extracted = self.extract(module_loader.ModuleLoader(), 'pkg/rules.bzl')
+    self.assertEqual(['foo_rule'],
+                     [rule.name for rule in extracted.language.rule])
+    self.assertEqual({}, extracted.loaded_files)
+
+  def test_cycle(self):
+    self.write('pkg/a.bzl', """\
+        load(":b.bzl", "B")
+        A = 1
+        """)
+    self.write('pkg/b.bzl', """\
+        load(":a.bzl", "A")
+        B = 1
+        """)
+
+    with self.assertRaisesRegexp(load_extractor.LoadExtractorError,
+                                 'pkg/b.bzl -> pkg/a.bzl -> pkg/b.bzl'):
+      self.extract(module_loader.ModuleLoader(), 'pkg/a.bzl')
+
+
+if __name__ == '__main__':
+  unittest.main()
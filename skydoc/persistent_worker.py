@@ -0,0 +1,141 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Support for running skydoc as a Bazel persistent worker.
+
+A persistent worker reads WorkRequest protos from stdin and writes a
+WorkResponse proto to stdout for each of them. Both are length-delimited, that
+is, each message is preceded by its size encoded as a varint.
+"""
+
+import StringIO
+import sys
+import traceback
+# internal imports
+
+from skydoc import worker_protocol_pb2
+
+PERSISTENT_WORKER_FLAG = '--persistent_worker'
+
+
+def _read_varint(stream):
+  """Reads a varint from stream, or returns None at the end of the stream."""
+  result = 0
+  shift = 0
+  while True:
+    byte = stream.read(1)
+    if not byte:
+      if shift == 0:
+        return None
+      raise EOFError('Truncated varint in work request.')
+    value = ord(byte)
+    result |= (value & 0x7f) << shift
+    if not value & 0x80:
+      return result
+    shift += 7
+
+
+def _encode_varint(value):
+  """Returns the varint encoding of value."""
+  encoded = []
+  while True:
+    bits = value & 0x7f
+    value >>= 7
+    if value:
+      encoded.append(chr(bits | 0x80))
+    else:
+      encoded.append(chr(bits))
+      return ''.join(encoded)
+
+
+def read_work_request(stream):
+  """Reads the next WorkRequest from stream.
+
+  Returns:
+    The WorkRequest, or None if the end of the stream was reached.
+  """
+  size = _read_varint(stream)
+  if size is None:
+    return None
+  data = stream.read(size)
+  if len(data) != size:
+    raise EOFError('Truncated work request.')
+  request = worker_protocol_pb2.WorkRequest()
+  request.ParseFromString(data)
+  return request
+
+
+def write_work_response(stream, response):
+  """Writes the WorkResponse to stream."""
+  data = response.SerializeToString()
+  stream.write(_encode_varint(len(data)))
+  stream.write(data)
+  stream.flush()
+
+
+def _handle_request(handler, request):
+  """Runs handler for the request and returns its WorkResponse.
+
+  Anything the handler prints is captured and returned as the output of the
+  response, since stdout is reserved for the worker protocol. A SystemExit
+  raised by the handler sets the exit code of the response, and any other
+  exception fails the request without stopping the worker.
+  """
+  output = StringIO.StringIO()
+  stdout = sys.stdout
+  stderr = sys.stderr
+  sys.stdout = output
+  sys.stderr = output
+  exit_code = 0
+  try:
+    handler(list(request.arguments))
+  except SystemExit as e:
+    if e.code is None:
+      exit_code = 0
+    elif isinstance(e.code, int):
+      exit_code = e.code
+    else:
+      output.write(str(e.code))
+      exit_code = 1
+  except Exception:
+    traceback.print_exc(file=output)
+    exit_code = 1
+  finally:
+    sys.stdout = stdout
+    sys.stderr = stderr
+
+  response = worker_protocol_pb2.WorkResponse()
+  response.exit_code = exit_code
+  response.output = output.getvalue().decode('utf-8', 'replace')
+  response.request_id = request.request_id
+  return response
+
+
+def run(handler, stdin=None, stdout=None):
+  """Serves work requests until stdin is closed.
+
+  Args:
+    handler: Function called with the list of arguments of each WorkRequest.
+      The state it keeps between calls, such as parsed templates and caches,
+      stays warm for the next request.
+    stdin: The stream to read requests from. Defaults to sys.stdin.
+    stdout: The stream to write responses to. Defaults to sys.stdout.
+  """
+  stdin = stdin or sys.stdin
+  stdout = stdout or sys.stdout
+  while True:
+    request = read_work_request(stdin)
+    if request is None:
+      return
+    write_work_response(stdout, _handle_request(handler, request))
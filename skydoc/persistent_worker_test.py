@@ -0,0 +1,84 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import StringIO
+import sys
+import unittest
+# internal imports
+
+from skydoc import persistent_worker
+from skydoc import worker_protocol_pb2
+
+
+def _requests(*arguments):
+  stream = StringIO.StringIO()
+  for i, args in enumerate(arguments):
+    request = worker_protocol_pb2.WorkRequest()
+    request.arguments.extend(args)
+    request.request_id = i
+    data = request.SerializeToString()
+    stream.write(persistent_worker._encode_varint(len(data)))
+    stream.write(data)
+  stream.seek(0)
+  return stream
+
+
+def _responses(stream):
+  stream.seek(0)
+  responses = []
+  while True:
+    size = persistent_worker._read_varint(stream)
+    if size is None:
+      return responses
+    response = worker_protocol_pb2.WorkResponse()
+    response.ParseFromString(stream.read(size))
+    responses.append(response)
+
+
+class PersistentWorkerTest(unittest.TestCase):
+
+  def test_varint(self):
+    for value in [0, 1, 127, 128, 300, 2 ** 21, 2 ** 31 - 1]:
+      stream = StringIO.StringIO(persistent_worker._encode_varint(value))
+      self.assertEqual(value, persistent_worker._read_varint(stream))
+      self.assertIsNone(persistent_worker._read_varint(stream))
+
+  def test_run(self):
+    handled = []
+    def handler(arguments):
+      handled.append(arguments)
+      if arguments[0] == 'exit':
+        sys.stderr.write('exiting')
+        sys.exit(2)
+      if arguments[0] == 'raise':
+        raise ValueError('bad request')
+      print('processed %s' % ' '.join(arguments))
+
+    stdin = _requests(['--format=html', 'foo.bzl'], ['exit'], ['raise'],
+                      ['bar.bzl'])
+    stdout = StringIO.StringIO()
+    persistent_worker.run(handler, stdin, stdout)
+
+    self.assertEqual(4, len(handled))
+    responses = _responses(stdout)
+    self.assertEqual([0, 1, 2, 3], [r.request_id for r in responses])
+    self.assertEqual([0, 2, 1, 0], [r.exit_code for r in responses])
+    self.assertEqual('processed --format=html foo.bzl\n', responses[0].output)
+    self.assertEqual('exiting', responses[1].output)
+    self.assertIn('ValueError: bad request', responses[2].output)
+    self.assertEqual('processed bar.bzl\n', responses[3].output)
+
+
+if __name__ == '__main__':
+  unittest.main()
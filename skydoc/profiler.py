@@ -0,0 +1,172 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Records the time spent in each stage of skydoc as a Chrome trace.
+
+Stages are wrapped in spans:
+
+  with profiler.span('exec', file=bzl_file):
+    ...
+
+Spans are only recorded once the profiler is enabled, and cost a function
+call otherwise. The trace is written in the trace event format, which
+chrome://tracing and https://ui.perfetto.dev load. Worker processes record
+their own spans, which the parent adds with add_events; each process is shown
+as a thread of the trace, named after its role and process ID.
+"""
+
+import json
+import os
+import time
+# internal imports
+
+# The spans recorded by this process, as (name, start, duration, cpu_start,
+# cpu_duration, tid, args) tuples with times in microseconds, or None if the
+# profiler is disabled.
+_events = None
+
+# The name of the thread of the trace the spans of this process are shown on.
+_thread_name = 'main'
+
+# The names of the threads of the worker processes whose spans were added,
+# keyed by process ID.
+_worker_names = {}
+
+
+# The CPU time of the process.
+_cpu_clock = getattr(time, 'process_time', None) or time.clock
+
+
+def _now():
+  # Wall time, unlike the CPU time, is shared by the worker processes.
+  return int(time.time() * 1000000)
+
+
+def _cpu_now():
+  return int(_cpu_clock() * 1000000)
+
+
+def enable(thread_name='main'):
+  """Starts recording spans, dropping those already recorded."""
+  global _events, _thread_name
+  _events = []
+  _thread_name = thread_name
+  _worker_names.clear()
+
+
+def disable():
+  """Stops recording spans and drops those recorded."""
+  global _events
+  _events = None
+  _worker_names.clear()
+
+
+def enabled():
+  return _events is not None
+
+
+class _Span(object):
+  """Records the time spent in a with block as a complete event."""
+
+  __slots__ = ['__name', '__args', '__start', '__cpu_start']
+
+  def __init__(self, name, args):
+    self.__name = name
+    self.__args = args
+
+  def __enter__(self):
+    self.__start = _now()
+    self.__cpu_start = _cpu_now()
+    return self
+
+  def __exit__(self, *unused_exc_info):
+    _events.append((self.__name, self.__start, _now() - self.__start,
+                    self.__cpu_start, _cpu_now() - self.__cpu_start,
+                    os.getpid(), self.__args))
+
+
+class _NullSpan(object):
+  """Span used when the profiler is disabled."""
+
+  __slots__ = []
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *unused_exc_info):
+    pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **args):
+  """Returns a context manager recording the time spent in its block.
+
+  Args:
+    name: The name of the stage.
+    **args: Details shown with the span, such as the file it processes.
+  """
+  if _events is None:
+    return _NULL_SPAN
+  return _Span(name, args)
+
+
+def take_events():
+  """Returns the spans recorded by this process and forgets them.
+
+  Worker processes send them to the parent, which passes them to add_events.
+  """
+  global _events
+  events = (os.getpid(), _thread_name, _events or [])
+  if _events is not None:
+    _events = []
+  return events
+
+
+def add_events(events):
+  """Adds the spans returned by take_events in another process."""
+  if _events is None:
+    return
+  pid, thread_name, spans = events
+  _worker_names[pid] = thread_name
+  _events.extend(spans)
+
+
+def events():
+  """Returns the spans recorded by this process and added from workers."""
+  return list(_events or [])
+
+
+def write(path):
+  """Writes the recorded spans to path as a Chrome trace."""
+  pid = os.getpid()
+  thread_names = dict(_worker_names)
+  thread_names[pid] = _thread_name
+  trace_events = []
+  for tid, thread_name in sorted(thread_names.iteritems()):
+    trace_events.append({
+        'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+        'args': {'name': '%s (pid %d)' % (thread_name, tid)},
+    })
+  for name, start, duration, cpu_start, cpu_duration, tid, args in (
+      _events or []):
+    trace_events.append({
+        'name': name, 'cat': 'skydoc', 'ph': 'X', 'ts': start,
+        'dur': duration, 'tts': cpu_start, 'tdur': cpu_duration, 'pid': pid,
+        'tid': tid, 'args': args,
+    })
+  with open(path, 'w') as f:
+    json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f,
+              sort_keys=True)
@@ -0,0 +1,105 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+# internal imports
+
+from skydoc import profiler
+
+
+class ProfilerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.trace_file = os.path.join(self.temp_dir, 'trace.json')
+
+  def tearDown(self):
+    profiler.disable()
+    shutil.rmtree(self.temp_dir)
+
+  def trace(self):
+    profiler.write(self.trace_file)
+    with open(self.trace_file) as f:
+      return json.load(f)['traceEvents']
+
+  def test_disabled(self):
+    with profiler.span('extract', file='a.bzl'):
+      pass
+    self.assertFalse(profiler.enabled())
+    self.assertEqual([], profiler.take_events()[2])
+
+  def test_nested_spans(self):
+    profiler.enable()
+    with profiler.span('extract', file='a.bzl'):
+      with profiler.span('parse'):
+        pass
+    spans = [event for event in self.trace() if event['ph'] == 'X']
+    # Spans are recorded as they end.
+    self.assertEqual(['parse', 'extract'], [span['name'] for span in spans])
+    parse, extract = spans
+    self.assertEqual({'file': 'a.bzl'}, extract['args'])
+    self.assertLessEqual(extract['ts'], parse['ts'])
+    self.assertLessEqual(parse['ts'] + parse['dur'],
+                         extract['ts'] + extract['dur'])
+    self.assertEqual(os.getpid(), extract['tid'])
+
+  def test_span_records_exceptions(self):
+    profiler.enable()
+    with self.assertRaises(ValueError):
+      with profiler.span('exec'):
+        raise ValueError()
+    self.assertEqual(['exec'], [event['name'] for event in self.trace()
+                                if event['ph'] == 'X'])
+
+  def test_worker_events(self):
+    profiler.enable()
+    with profiler.span('render'):
+      pass
+    # Events of a worker, as returned by take_events in the worker process.
+    worker_events = (12345, 'extraction worker',
+                     [('extract', 10, 5, 3, 4, 12345, {'file': 'a.bzl'})])
+    profiler.add_events(worker_events)
+
+    events = self.trace()
+    thread_names = dict((event['tid'], event['args']['name'])
+                        for event in events if event['ph'] == 'M')
+    self.assertEqual({
+        os.getpid(): 'main (pid %d)' % os.getpid(),
+        12345: 'extraction worker (pid 12345)',
+    }, thread_names)
+    spans = dict((event['name'], event) for event in events
+                 if event['ph'] == 'X')
+    self.assertEqual(12345, spans['extract']['tid'])
+    self.assertEqual(4, spans['extract']['tdur'])
+    # All threads belong to the process of the trace.
+    self.assertEqual(set([os.getpid()]),
+                     set(event['pid'] for event in events))
+
+  def test_take_events(self):
+    profiler.enable('extraction worker')
+    with profiler.span('extract'):
+      pass
+    pid, thread_name, spans = profiler.take_events()
+    self.assertEqual(os.getpid(), pid)
+    self.assertEqual('extraction worker', thread_name)
+    self.assertEqual(['extract'], [span[0] for span in spans])
+    self.assertEqual([], profiler.take_events()[2])
+
+
+if __name__ == '__main__':
+  unittest.main()
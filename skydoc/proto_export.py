@@ -0,0 +1,141 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Exports the extracted documentation as protos for other tools.
+
+The BuildLanguage proto of each .bzl file is written next to its
+documentation page in the following formats:
+
+* binary: <page>.pb, the serialized BuildLanguage.
+* json: <page>.json, the BuildLanguage in the proto3 JSON format, with the
+  field names of build.proto.
+* delimited: a single extracted_files.pb for all .bzl files, holding an
+  ExtractedFile proto with bzl_file set to the path of each file relative to
+  --strip_prefix, each preceded by its size as a varint, as written by Java's
+  writeDelimitedTo.
+"""
+
+import tempfile
+# internal imports
+
+from google.protobuf import json_format
+
+from skydoc import build_pb2
+
+EXPORT_FORMATS = ['binary', 'json', 'delimited']
+
+DELIMITED_FILE = 'extracted_files.pb'
+
+
+def exported_proto(bzl_file, extracted):
+  """Returns the ExtractedFile proto of extracted, with bzl_file set."""
+  proto = extracted.to_proto()
+  proto.bzl_file = bzl_file
+  return proto
+
+
+def _encode_varint(value):
+  """Returns value encoded as a base 128 varint."""
+  encoded = bytearray()
+  while True:
+    byte = value & 0x7f
+    value >>= 7
+    if value:
+      encoded.append(byte | 0x80)
+    else:
+      encoded.append(byte)
+      return bytes(encoded)
+
+
+def write_delimited(f, message):
+  """Writes message to the file f, preceded by its size."""
+  serialized = message.SerializeToString()
+  f.write(_encode_varint(len(serialized)))
+  f.write(serialized)
+
+
+def read_delimited(f):
+  """Yields the ExtractedFile protos in a file written by write_delimited."""
+  while True:
+    size = 0
+    shift = 0
+    while True:
+      byte = f.read(1)
+      if not byte:
+        if shift:
+          raise ValueError('Truncated size of delimited message.')
+        return
+      size |= (ord(byte) & 0x7f) << shift
+      shift += 7
+      if not ord(byte) & 0x80:
+        break
+    serialized = f.read(size)
+    if len(serialized) != size:
+      raise ValueError('Truncated delimited message.')
+    proto = build_pb2.ExtractedFile()
+    proto.ParseFromString(serialized)
+    yield proto
+
+
+class Exporter(object):
+  """Writes the extracted protos of each .bzl file along with its pages."""
+
+  def __init__(self, formats, strip_prefix=''):
+    """Inits Exporter.
+
+    Args:
+      formats: The formats to export, a subset of EXPORT_FORMATS.
+      strip_prefix: The directory prefix stripped from the paths of the .bzl
+        files in the delimited export, as validated by
+        common.validate_strip_prefix.
+    """
+    self.__formats = frozenset(formats)
+    self.__strip_prefix = strip_prefix
+    self.__delimited = None
+    if 'delimited' in self.__formats:
+      # The stream is spooled to a temporary file, so that memory does not
+      # grow with the number of files.
+      self.__delimited = tempfile.NamedTemporaryFile()
+
+  def add(self, output, ruleset, extracted):
+    """Exports the ExtractedFile of a RuleSet.
+
+    Args:
+      output: The output that the documentation is written to, with the
+        interface of main._Output.
+      ruleset: The rule.RuleSet created from extracted.
+      extracted: The file_extractor.ExtractedFile.
+    """
+    if 'binary' in self.__formats:
+      output.add(ruleset.output_file + '.pb',
+                 extracted.language.SerializeToString(), ruleset.bzl_file)
+    if 'json' in self.__formats:
+      output.add(ruleset.output_file + '.json',
+                 json_format.MessageToJson(
+                     extracted.language, preserving_proto_field_name=True) +
+                 '\n',
+                 ruleset.bzl_file)
+    if self.__delimited:
+      # Paths are relative to the output root, as the pages are, even for .bzl
+      # files given by absolute path.
+      bzl_file = ruleset.bzl_file[len(self.__strip_prefix):].lstrip('/')
+      write_delimited(self.__delimited, exported_proto(bzl_file, extracted))
+
+  def finish(self, output):
+    """Writes the outputs shared by all files."""
+    if self.__delimited:
+      self.__delimited.flush()
+      output.add_file(self.__delimited.name, DELIMITED_FILE)
+      self.__delimited.close()
+      self.__delimited = None
@@ -0,0 +1,143 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import StringIO
+import unittest
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import file_extractor
+from skydoc import proto_export
+from skydoc import rule
+
+
+def _make_extracted(rule_name):
+  language = build_pb2.BuildLanguage()
+  rule_proto = language.rule.add()
+  rule_proto.name = rule_name
+  rule_proto.type = build_pb2.RuleDefinition.RULE
+  rule_proto.documentation = 'Builds the %s.' % rule_name
+  attribute = rule_proto.attribute.add()
+  attribute.name = 'srcs'
+  attribute.type = build_pb2.Attribute.LABEL_LIST
+  attribute.mandatory = False
+  return file_extractor.ExtractedFile(language, 'Title', 'Description.')
+
+
+class FakeOutput(object):
+
+  def __init__(self):
+    self.files = {}
+    self.owners = {}
+
+  def add(self, output_path, content, bzl_file=None):
+    self.files[output_path] = content
+    self.owners[output_path] = bzl_file
+
+  def add_file(self, path, output_path):
+    with open(path, 'rb') as f:
+      self.files[output_path] = f.read()
+    self.owners[output_path] = None
+
+
+class DelimitedTest(unittest.TestCase):
+
+  def test_round_trip(self):
+    protos = []
+    f = StringIO.StringIO()
+    for i in range(3):
+      proto = _make_extracted('rule_%d' % i).to_proto()
+      # Long enough for a size of more than one byte.
+      proto.description = 'x' * 100 * i
+      proto.bzl_file = 'pkg/rules_%d.bzl' % i
+      proto_export.write_delimited(f, proto)
+      protos.append(proto)
+    f.seek(0)
+    self.assertEqual(protos, list(proto_export.read_delimited(f)))
+
+  def test_empty(self):
+    self.assertEqual([], list(proto_export.read_delimited(StringIO.StringIO())))
+
+  def test_truncated(self):
+    f = StringIO.StringIO()
+    proto_export.write_delimited(f, _make_extracted('my_rule').to_proto())
+    serialized = f.getvalue()
+    with self.assertRaises(ValueError):
+      list(proto_export.read_delimited(StringIO.StringIO(serialized[:-1])))
+    with self.assertRaises(ValueError):
+      list(proto_export.read_delimited(StringIO.StringIO('\x80')))
+
+
+class ExporterTest(unittest.TestCase):
+
+  def export(self, formats):
+    output = FakeOutput()
+    exporter = proto_export.Exporter(formats)
+    for name in ['a', 'b']:
+      extracted = _make_extracted('rule_' + name)
+      ruleset = rule.RuleSet('pkg/%s.bzl' % name, extracted.language,
+                             extracted.title, extracted.description, '',
+                             'markdown')
+      exporter.add(output, ruleset, extracted)
+    exporter.finish(output)
+    return output
+
+  def test_binary(self):
+    output = self.export(['binary'])
+    self.assertEqual(['pkg/a.pb', 'pkg/b.pb'], sorted(output.files))
+    self.assertEqual('pkg/a.bzl', output.owners['pkg/a.pb'])
+    language = build_pb2.BuildLanguage()
+    language.ParseFromString(output.files['pkg/a.pb'])
+    self.assertEqual(_make_extracted('rule_a').language, language)
+
+  def test_json(self):
+    output = self.export(['json'])
+    self.assertEqual(['pkg/a.json', 'pkg/b.json'], sorted(output.files))
+    self.assertEqual('pkg/b.bzl', output.owners['pkg/b.json'])
+    language = json.loads(output.files['pkg/b.json'])
+    self.assertEqual('rule_b', language['rule'][0]['name'])
+    self.assertEqual('LABEL_LIST', language['rule'][0]['attribute'][0]['type'])
+
+  def test_delimited(self):
+    output = self.export(['delimited'])
+    self.assertEqual([proto_export.DELIMITED_FILE], output.files.keys())
+    protos = list(proto_export.read_delimited(
+        StringIO.StringIO(output.files[proto_export.DELIMITED_FILE])))
+    self.assertEqual(['pkg/a.bzl', 'pkg/b.bzl'],
+                     [proto.bzl_file for proto in protos])
+    self.assertEqual('rule_a', protos[0].language.rule[0].name)
+    self.assertEqual('Title', protos[1].title)
+
+  def test_delimited_paths_are_relative(self):
+    output = FakeOutput()
+    exporter = proto_export.Exporter(['delimited'], '/src/')
+    extracted = _make_extracted('rule_a')
+    ruleset = rule.RuleSet('/src/pkg/a.bzl', extracted.language,
+                           extracted.title, extracted.description, '/src/',
+                           'markdown')
+    exporter.add(output, ruleset, extracted)
+    exporter.finish(output)
+    protos = list(proto_export.read_delimited(
+        StringIO.StringIO(output.files[proto_export.DELIMITED_FILE])))
+    self.assertEqual(['pkg/a.bzl'], [proto.bzl_file for proto in protos])
+
+  def test_all_formats(self):
+    output = self.export(proto_export.EXPORT_FORMATS)
+    self.assertEqual(['extracted_files.pb', 'pkg/a.json', 'pkg/a.pb',
+                      'pkg/b.json', 'pkg/b.pb'], sorted(output.files))
+
+
+if __name__ == '__main__':
+  unittest.main()
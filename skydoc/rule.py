@@ -20,8 +20,29 @@ import os
 from skydoc import build_pb2
 
 
+# Interned attribute names and type prefixes. Both come from small sets of
+# values shared by most rules, so the table stays small however many rule
+# sets a process builds.
+_interned = {}
+
+
+def _intern(value):
+  """Returns a canonical copy of value shared by all equal strings.
+
+  The builtin intern() only accepts byte strings, while the strings in the
+  protos are unicode. Only use it for strings from a small set of values.
+  """
+  return _interned.setdefault(value, value)
+
+
 class Attribute(object):
-  """Representation of an attribute used to render documentation templates."""
+  """Representation of an attribute used to render documentation templates.
+
+  Attributes only keep the fields the templates use, not the proto they are
+  created from, so that the proto can be freed once the RuleSet is built.
+  """
+
+  __slots__ = ('name', 'type_prefix', 'default', 'documentation')
 
   NAME_LINK = (
       '<a href="https://bazel.build/docs/build-ref.html#name">Name</a>')
@@ -30,117 +51,114 @@ class Attribute(object):
   LABELS_LINK = (
       '<a href="https://bazel.build/docs/build-ref.html#labels">labels</a>')
 
+  TYPE_NAMES = {
+      build_pb2.Attribute.INTEGER: 'Integer',
+      build_pb2.Attribute.STRING: 'String',
+      build_pb2.Attribute.LABEL: LABEL_LINK,
+      build_pb2.Attribute.OUTPUT: 'Output',
+      build_pb2.Attribute.STRING_LIST: 'List of strings',
+      build_pb2.Attribute.LABEL_LIST: 'List of %s' % LABELS_LINK,
+      build_pb2.Attribute.OUTPUT_LIST: 'List of outputs',
+      build_pb2.Attribute.DISTRIBUTION_SET: 'Distribution Set',
+      build_pb2.Attribute.LICENSE: 'License',
+      build_pb2.Attribute.STRING_DICT: 'Dictionary mapping strings to string',
+      build_pb2.Attribute.FILESET_ENTRY_LIST: 'List of FilesetEntry',
+      build_pb2.Attribute.LABEL_LIST_DICT:
+          'Dictionary mapping strings to lists of %s' % LABELS_LINK,
+      build_pb2.Attribute.STRING_LIST_DICT:
+          'Dictionary mapping strings to lists of strings',
+      build_pb2.Attribute.BOOLEAN: 'Boolean',
+      build_pb2.Attribute.TRISTATE: 'Tristate',
+      build_pb2.Attribute.INTEGER_LIST: 'List of integers',
+      build_pb2.Attribute.LABEL_DICT_UNARY: 'Label Dict Unary',
+      build_pb2.Attribute.SELECTOR_LIST: 'Selector List',
+      build_pb2.Attribute.LABEL_KEYED_STRING_DICT:
+          'Dictionary mapping %s to strings' % LABELS_LINK,
+  }
+  """The type names of the attribute types, by Attribute.Type value."""
+
   def __init__(self, proto):
-    self.__proto = proto
-    self.name = proto.name
-    self.type = self._get_type_str(proto)
+    self.name = _intern(proto.name)
+    self.type_prefix = _intern(self._get_type_prefix(proto))
+    # Defaults are mostly unique, so they are not part of the interned prefix.
+    if proto.HasField('default') and not proto.mandatory:
+      self.default = proto.default
+    else:
+      self.default = None
     if proto.name == 'name' and not proto.documentation:
       self.documentation = 'A unique name for this rule.'
     else:
       self.documentation = proto.documentation
 
-  def _get_type_str(self, proto):
-    type_str = ''
-    if proto.type == build_pb2.Attribute.INTEGER:
-      type_str = 'Integer'
-    elif proto.type == build_pb2.Attribute.STRING:
-      type_str = 'String'
-    elif proto.type == build_pb2.Attribute.LABEL:
-      type_str = self.LABEL_LINK
-    elif proto.type == build_pb2.Attribute.OUTPUT:
-      type_str = 'Output'
-    elif proto.type == build_pb2.Attribute.STRING_LIST:
-      type_str = 'List of strings'
-    elif proto.type == build_pb2.Attribute.LABEL_LIST:
-      type_str = 'List of %s' % self.LABELS_LINK
-    elif proto.type == build_pb2.Attribute.OUTPUT_LIST:
-      type_str = 'List of outputs'
-    elif proto.type == build_pb2.Attribute.DISTRIBUTION_SET:
-      type_str = 'Distribution Set'
-    elif proto.type == build_pb2.Attribute.LICENSE:
-      type_str = 'License'
-    elif proto.type == build_pb2.Attribute.STRING_DICT:
-      type_str = 'Dictionary mapping strings to string'
-    elif proto.type == build_pb2.Attribute.FILESET_ENTRY_LIST:
-      type_str = 'List of FilesetEntry'
-    elif proto.type == build_pb2.Attribute.LABEL_LIST_DICT:
-      type_str = 'Dictionary mapping strings to lists of %s' % self.LABELS_LINK
-    elif proto.type == build_pb2.Attribute.STRING_LIST_DICT:
-      type_str = 'Dictionary mapping strings to lists of strings'
-    elif proto.type == build_pb2.Attribute.BOOLEAN:
-      type_str = 'Boolean'
-    elif proto.type == build_pb2.Attribute.TRISTATE:
-      type_str = 'Tristate'
-    elif proto.type == build_pb2.Attribute.INTEGER_LIST:
-      type_str = 'List of integers'
-    elif proto.type == build_pb2.Attribute.LABEL_DICT_UNARY:
-      type_str = 'Label Dict Unary'
-    elif proto.type == build_pb2.Attribute.SELECTOR_LIST:
-      type_str = 'Selector List'
-    elif proto.type == build_pb2.Attribute.LABEL_KEYED_STRING_DICT:
-      type_str = 'Dictionary mapping %s to strings' % self.LABELS_LINK
-    else:
+  @property
+  def type(self):
+    """The type of the attribute, whether it is required and its default."""
+    if self.default is None:
+      return self.type_prefix
+    return self.type_prefix + '; Default is ' + self.default
+
+  def _get_type_prefix(self, proto):
+    type_str = self.TYPE_NAMES.get(proto.type)
+    if type_str is None:
       if proto.name == 'name':
         type_str = self.NAME_LINK
       else:
         type_str = 'Unknown'
-
-    type_str += '; Required' if proto.mandatory else '; Optional'
-    if proto.HasField('default') and not proto.mandatory:
-      type_str += '; Default is ' + proto.default
-    return type_str
+    return type_str + ('; Required' if proto.mandatory else '; Optional')
 
 
 class Output(object):
   """Representation of an output used to render documentation templates."""
 
+  __slots__ = ('template', 'documentation')
+
   def __init__(self, proto):
-    self.__proto = proto
     self.template = proto.template
     self.documentation = proto.documentation
 
 class Rule(object):
   """Representation of a rule used to render documentation templates."""
 
-  def __init__(self, proto):
-    self.__proto = proto
+  __slots__ = ('name', 'type', 'documentation', 'example_documentation',
+               'signature', 'attributes', 'outputs', 'short_documentation',
+               'output_file')
+
+  def __init__(self, proto, output_file):
     self.name = proto.name
     self.type = proto.type
     self.documentation = proto.documentation
     self.example_documentation = proto.example_documentation
     self.signature = self._get_signature(proto)
-    self.attributes = []
-    for attribute in proto.attribute:
-      self.attributes.append(Attribute(attribute))
-    self.outputs = []
-    for output in proto.output:
-      self.outputs.append(Output(output))
-
-    parts = proto.documentation.split("\n\n")
+    self.attributes = [Attribute(attribute) for attribute in proto.attribute]
+    self.outputs = [Output(output) for output in proto.output]
+
+    parts = proto.documentation.split("\n\n", 1)
     self.short_documentation = parts[0]
+    # The output file of the page documenting the rule, without extension.
+    self.output_file = output_file
 
   def _get_signature(self, proto):
     """Returns the rule signature for this rule."""
-    signature = proto.name + '('
-    for i in range(len(proto.attribute)):
-      attr = proto.attribute[i]
-      signature += '<a href="#%s.%s">%s</a>' % (proto.name, attr.name,
-                                                attr.name)
-      if i < len(proto.attribute) - 1:
-        signature += ', '
-    signature += ')'
-    return signature
+    return '%s(%s)' % (proto.name, ', '.join(
+        '<a href="#%s.%s">%s</a>' % (proto.name, attr.name, attr.name)
+        for attr in proto.attribute))
 
 
 class RuleSet(object):
-  """Representation of a rule set used to render documentation templates."""
+  """Representation of a rule set used to render documentation templates.
+
+  The BuildLanguage proto of the rule set is not kept, so that it can be freed
+  once the RuleSet is built.
+  """
+
+  __slots__ = ('bzl_file', 'name', 'title', 'description', 'output_file',
+               'split', 'definitions', 'rules', 'repository_rules', 'macros')
 
   def __init__(self, bzl_file, language, title, description, strip_prefix,
-               format):
+               format, split_threshold=0):
     self.bzl_file = bzl_file
     file_basename = os.path.basename(bzl_file)
     self.name = file_basename.replace('.bzl', '')
-    self.language = language
     self.title = title if title else "%s Rules" % self.name
     self.description = description
 
@@ -148,7 +166,15 @@ class RuleSet(object):
     file_extension = 'html' if format == 'html' else 'md'
     assert self.bzl_file.startswith(strip_prefix)
     output_path = self.bzl_file.replace('.bzl', '')
-    self.output_file = output_path[len(strip_prefix):]
+    # Output files are always relative to the output root, even for .bzl files
+    # given by absolute path.
+    self.output_file = output_path[len(strip_prefix):].lstrip('/')
+
+    # Rule sets with more definitions than split_threshold are documented on
+    # an index page, with a page for each definition in a directory named
+    # after the rule set.
+    self.split = bool(split_threshold) and (
+        len(language.rule) > split_threshold)
 
     # Populate all rules in this ruleset.
     self.definitions = []
@@ -156,7 +182,11 @@ class RuleSet(object):
     self.repository_rules = []
     self.macros = []
     for rule_proto in language.rule:
-      definition = Rule(rule_proto)
+      if self.split:
+        rule_output_file = '%s/%s' % (self.output_file, rule_proto.name)
+      else:
+        rule_output_file = self.output_file
+      definition = Rule(rule_proto, rule_output_file)
       self.definitions.append(definition)
       if rule_proto.type == build_pb2.RuleDefinition.RULE:
         self.rules.append(definition)
@@ -171,3 +201,86 @@ class RuleSet(object):
     return not any([self.rules,
                     self.macros,
                     self.repository_rules])
+
+
+class RuleSummary(object):
+  """Summary of a rule used to render the overview and navigation."""
+
+  __slots__ = ('name', 'short_documentation', 'output_file')
+
+  def __init__(self, name, short_documentation, output_file):
+    self.name = name
+    self.short_documentation = short_documentation
+    self.output_file = output_file
+
+
+class RuleSetSummary(object):
+  """Summary of a rule set used to render the overview and navigation.
+
+  A RuleSetSummary only holds the fields of a RuleSet that the overview and
+  navigation templates use, so it is cheap to keep around for every rule set
+  and can be stored in the manifest of an incremental run.
+  """
+
+  __slots__ = ('name', 'title', 'description', 'output_file', 'rules',
+               'macros', 'repository_rules')
+
+  def __init__(self, name, title, description, output_file, rules, macros,
+               repository_rules):
+    self.name = name
+    self.title = title
+    self.description = description
+    self.output_file = output_file
+    self.rules = rules
+    self.macros = macros
+    self.repository_rules = repository_rules
+
+  @staticmethod
+  def from_ruleset(ruleset):
+    """Creates the summary of the given RuleSet."""
+    def summarize(definitions):
+      return [RuleSummary(definition.name, definition.short_documentation,
+                          definition.output_file)
+              for definition in definitions]
+    return RuleSetSummary(ruleset.name, ruleset.title, ruleset.description,
+                          ruleset.output_file, summarize(ruleset.rules),
+                          summarize(ruleset.macros),
+                          summarize(ruleset.repository_rules))
+
+  @staticmethod
+  def from_dict(value):
+    """Creates a RuleSetSummary from the dict returned by to_dict."""
+    def summarize(definitions):
+      return [RuleSummary(name, short_documentation, output_file)
+              for name, short_documentation, output_file in definitions]
+    return RuleSetSummary(value['name'], value['title'], value['description'],
+                          value['output_file'], summarize(value['rules']),
+                          summarize(value['macros']),
+                          summarize(value['repository_rules']))
+
+  def to_dict(self):
+    """Returns the summary as a dict that can be serialized as JSON."""
+    def serialize(definitions):
+      return [[definition.name, definition.short_documentation,
+               definition.output_file]
+              for definition in definitions]
+    return {
+        'name': self.name,
+        'title': self.title,
+        'description': self.description,
+        'output_file': self.output_file,
+        'rules': serialize(self.rules),
+        'macros': serialize(self.macros),
+        'repository_rules': serialize(self.repository_rules),
+    }
+
+  def nav_key(self):
+    """Returns the fields of the summary that the navigation depends on."""
+    return [self.output_file, self.title, bool(self.description),
+            [[rule.name, rule.output_file] for rule in self.rules]]
+
+  def empty(self):
+    """Return True if there is nothing to document."""
+    return not any([self.rules,
+                    self.macros,
+                    self.repository_rules])
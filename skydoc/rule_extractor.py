@@ -15,10 +15,13 @@
 """Extractor for Skylark rule documentation."""
 
 import ast
+import copy
 # internal imports
 
 from skydoc import build_pb2
 from skydoc import common
+from skydoc import profiler
+from skydoc import static_rule_extractor
 from skydoc.stubs import attr
 from skydoc.stubs import skylark_globals
 
@@ -46,29 +49,31 @@ SKYLARK_STUBS = {
 SKYLARK_GLOBAL_SYMBOLS = set(SKYLARK_STUBS.keys())
 
 
-def create_stubs(skylark_stubs, load_symbols):
+def create_stubs(skylark_stubs, load_symbols, loaded_values=None):
   """Combines Skylark stubs with loaded symbols.
 
   This function creates a copy of the global Skylark stubs and combines them
   with symbols from the list of load_extractor.LoadSymbol, which contain
   information about symbols extracted from other .bzl files. The stubs created
-  for the loaded symbols are global variables set to the empty string.
+  for the loaded symbols are global variables set to their resolved values, or
+  to the empty string if they were not resolved.
 
   Args:
     skylark_stubs: Dict containing the Skylark global stubs.
     load_symbols: List of load_extractor.LoadSymbol objects containing
       information about symbols extracted from other .bzl files.
+    loaded_values: Dict mapping the names loaded symbols are bound to to their
+      values, as resolved by module_loader.ModuleLoader.
 
   Returns:
     Dictionary containing both the Skylark global stubs and stubs created for
     the loaded symbols.
   """
   stubs = dict(skylark_stubs)
+  loaded_values = loaded_values or {}
   for load_symbol in load_symbols:
-    if load_symbol.alias:
-      stubs[load_symbol.alias] = ""
-    else:
-      stubs[load_symbol.symbol] = ""
+    name = load_symbol.alias if load_symbol.alias else load_symbol.symbol
+    stubs[name] = loaded_values.get(name, "")
   return stubs
 
 
@@ -80,25 +85,48 @@ class RuleDocExtractor(object):
     self.__language = build_pb2.BuildLanguage()
     self.__extracted_rules = {}
     self.__load_symbols = []
+    self.__loaded_files = {}
+    self.statically_extracted = False
 
-  def _process_skylark(self, bzl_file, load_symbols):
+  def _process_skylark(self, bzl_file, load_symbols, tree, module_loader,
+                       static):
     """Evaluates the Skylark code in the .bzl file.
 
     This function evaluates the Skylark code in the .bzl file as Python against
     Skylark stubs to extract the rules and attributes defined in the file. The
     extracted rules are kept in the __extracted_rules map keyed by rule name.
 
+    In static mode, the rules are evaluated from the AST by
+    static_rule_extractor instead, and the file is only run if it uses
+    constructs that static_rule_extractor does not support.
+
     Args:
       bzl_file: The .bzl file to evaluate.
       load_symbols: List of load_extractor.LoadSymbol objects containing info
         about symbols load()ed from other .bzl files.
+      tree: The ast.Module of bzl_file.
+      module_loader: A module_loader.ModuleLoader used to resolve the loaded
+        symbols, or None to stub them out with the empty string.
+      static: Whether to evaluate the rules without running the file.
     """
-    compiled = None
-    with open(bzl_file) as f:
-      compiled = compile(f.read(), bzl_file, 'exec')
-    global_stubs = create_stubs(SKYLARK_STUBS, load_symbols)
-    env = global_stubs.copy()
-    exec(compiled) in env
+    loaded_values = None
+    if module_loader:
+      with profiler.span('resolve loads'):
+        loaded_values, self.__loaded_files = module_loader.resolve(
+            bzl_file, load_symbols)
+    global_stubs = create_stubs(SKYLARK_STUBS, load_symbols, loaded_values)
+    env = None
+    if static:
+      try:
+        with profiler.span('static evaluation'):
+          env = static_rule_extractor.evaluate(bzl_file, tree, global_stubs)
+        self.statically_extracted = True
+      except static_rule_extractor.StaticExtractionError:
+        pass
+    if env is None:
+      env = global_stubs.copy()
+      with profiler.span('exec'):
+        exec(compile(tree, bzl_file, 'exec')) in env
 
     new_globals = (
       defn for defn in env.iteritems() if not global_stubs.has_key(defn[0])
@@ -106,6 +134,9 @@ class RuleDocExtractor(object):
     for name, obj in new_globals:
       if (isinstance(obj, skylark_globals.RuleDescriptor) and
           not name.startswith('_')):
+        # The rule and its attributes may be shared with modules memoized by
+        # the module loader, so document a copy of them.
+        obj = copy.deepcopy(obj)
         obj.attrs['name'] = attr.AttrDescriptor(
             type=build_pb2.Attribute.UNKNOWN, mandatory=True, name='name')
         self.__extracted_rules[name] = obj
@@ -138,38 +169,31 @@ class RuleDocExtractor(object):
           output_template = rule.outputs[output_name]
           rule.output_docs[output_template] = desc
 
-  def _extract_docstrings(self, bzl_file):
+  def _extract_docstrings(self, tree):
     """Extracts the docstrings for all public rules in the .bzl file.
 
-    This function parses the .bzl file and extracts the docstrings for all
-    public rules in the file that were extracted in _process_skylark. It calls
-    _add_rule_doc for to parse the attribute documentation in each docstring
-    and associate them with the extracted rules and attributes.
+    This function walks the AST of the .bzl file and extracts the docstrings
+    for all public rules in the file that were extracted in _process_skylark.
+    It calls _add_rule_doc for to parse the attribute documentation in each
+    docstring and associate them with the extracted rules and attributes.
 
     Args:
-      bzl_file: The .bzl file to extract docstrings from.
+      tree: The ast.Module of the .bzl file to extract docstrings from.
     """
-    try:
-      tree = None
-      with open(bzl_file) as f:
-        tree = ast.parse(f.read(), bzl_file)
+    key = None
+    for node in ast.iter_child_nodes(tree):
+      if isinstance(node, ast.Assign):
+        name = node.targets[0].id
+        if not name.startswith("_"):
+          key = name
+        continue
+      elif isinstance(node, ast.Expr) and key:
+        # Python itself does not treat strings defined immediately after a
+        # global variable definition as a docstring. Only extract string and
+        # parse as docstring if it is defined.
+        if hasattr(node.value, 's'):
+          self._add_rule_doc(key, node.value.s.strip())
       key = None
-      for node in ast.iter_child_nodes(tree):
-        if isinstance(node, ast.Assign):
-          name = node.targets[0].id
-          if not name.startswith("_"):
-            key = name
-          continue
-        elif isinstance(node, ast.Expr) and key:
-          # Python itself does not treat strings defined immediately after a
-          # global variable definition as a docstring. Only extract string and
-          # parse as docstring if it is defined.
-          if hasattr(node.value, 's'):
-            self._add_rule_doc(key, node.value.s.strip())
-        key = None
-    except IOError:
-      print("Failed to parse {0}: {1}".format(bzl_file, e.strerror))
-      pass
 
   def _assemble_protos(self):
     """Builds the BuildLanguage protos for the extracted rule documentation.
@@ -220,21 +244,45 @@ class RuleDocExtractor(object):
       load.symbol = load_symbol.symbol
       load.alias = load_symbol.alias
 
-  def parse_bzl(self, bzl_file, load_symbols):
+  def parse_bzl(self, bzl_file, load_symbols, tree=None, module_loader=None,
+                static=False):
     """Extracts the documentation for all public rules from the given .bzl file.
 
     The Skylark code is first evaluated against stubs to extract rule and
-    attributes with complete type information. Then, the .bzl file is parsed
-    to extract the docstrings for each of the rules. Finally, the BuildLanguage
-    proto is assembled with the extracted rule documentation.
+    attributes with complete type information. Then, the AST of the .bzl file
+    is walked to extract the docstrings for each of the rules. Finally, the
+    BuildLanguage proto is assembled with the extracted rule documentation.
 
     Args:
       bzl_file: The .bzl file to extract rule documentation from.
+      load_symbols: List of load_extractor.LoadSymbol objects containing info
+        about symbols load()ed from other .bzl files.
+      tree: The ast.Module of bzl_file if it has already been parsed. The same
+        tree is compiled for evaluation and walked for docstrings.
+      module_loader: A module_loader.ModuleLoader used to resolve the symbols
+        load()ed by bzl_file. If None, loaded symbols are stubbed out with the
+        empty string.
+      static: If True, the rules are extracted from the AST without running
+        the file whenever possible. See static_rule_extractor.
     """
-    self._process_skylark(bzl_file, load_symbols)
-    self._extract_docstrings(bzl_file)
-    self._assemble_protos()
+    if tree is None:
+      tree = common.parse_bzl(bzl_file)
+    with profiler.span('_process_skylark'):
+      self._process_skylark(bzl_file, load_symbols, tree, module_loader,
+                            static)
+    with profiler.span('_extract_docstrings'):
+      self._extract_docstrings(tree)
+    with profiler.span('_assemble_protos'):
+      self._assemble_protos()
 
   def proto(self):
     """Returns the proto containing the macro documentation."""
     return self.__language
+
+  def loaded_files(self):
+    """Returns a dict of the .bzl files loaded to resolve symbols.
+
+    The dict maps the path of each file loaded, directly or transitively, by
+    the module loader to the digest of its content.
+    """
+    return self.__loaded_files
@@ -59,6 +59,12 @@ class RuleExtractorTest(unittest.TestCase):
       proto = extractor.proto()
       self.assertEqual(expected_proto, proto)
 
+      # Static extraction must produce the same documentation.
+      extractor = rule_extractor.RuleDocExtractor()
+      extractor.parse_bzl(tf.name, load_symbols, static=True)
+      self.assertEqual(expected_proto, extractor.proto())
+      return extractor
+
   def test_all_types(self):
     src = textwrap.dedent("""\
         def impl(ctx):
@@ -0,0 +1,60 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import rule
+
+
+def _attribute(name, attribute_type, mandatory=False, default=None):
+  proto = build_pb2.AttributeDefinition()
+  proto.name = name
+  proto.type = attribute_type
+  proto.mandatory = mandatory
+  if default is not None:
+    proto.default = default
+  return proto
+
+
+class AttributeTest(unittest.TestCase):
+
+  def test_type(self):
+    self.assertEqual(
+        'String; Required',
+        rule.Attribute(_attribute('foo', build_pb2.Attribute.STRING,
+                                  mandatory=True, default='"a"')).type)
+    self.assertEqual(
+        'Integer; Optional; Default is 3',
+        rule.Attribute(_attribute('foo', build_pb2.Attribute.INTEGER,
+                                  default='3')).type)
+    self.assertEqual(
+        rule.Attribute.NAME_LINK + '; Required',
+        rule.Attribute(_attribute('name', build_pb2.Attribute.UNKNOWN,
+                                  mandatory=True)).type)
+
+  def test_defaults_are_not_interned(self):
+    first = rule.Attribute(_attribute(u'foo', build_pb2.Attribute.STRING,
+                                      default=u'"default_1"'))
+    second = rule.Attribute(_attribute(u'foo', build_pb2.Attribute.STRING,
+                                       default=u'"default_2"'))
+    self.assertIs(first.name, second.name)
+    self.assertIs(first.type_prefix, second.type_prefix)
+    self.assertNotIn(u'"default_1"', rule._interned)
+    self.assertNotIn(first.type, rule._interned)
+
+
+if __name__ == '__main__':
+  unittest.main()
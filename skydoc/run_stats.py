@@ -0,0 +1,194 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Collects the statistics of a run, written by --stats_json.
+
+The time spent in each stage is computed from the spans of the profiler.
+Spans nest, so the time of a stage includes the time of the stages it calls,
+such as exec in _process_skylark in extract. A span belongs to the .bzl file
+of its file argument, or else to the file of the span it is nested in, so the
+breakdown of a file covers both its extraction and the rendering and writing
+of its pages.
+"""
+
+import collections
+import json
+import os
+# internal imports
+
+from skydoc import build_pb2
+
+# The number of slowest files listed by default.
+SLOWEST_FILES = 10
+
+
+def _seconds(microseconds):
+  return round(microseconds / 1e6, 6)
+
+
+def cache_stats(hits, misses):
+  """Returns the statistics of a cache with the given number of lookups."""
+  lookups = hits + misses
+  return {
+      'hits': hits,
+      'misses': misses,
+      'hit_rate': round(float(hits) / lookups, 4) if lookups else None,
+  }
+
+
+def _parents(events):
+  """Returns the index of the span each span is nested in, or None."""
+  parents = [None] * len(events)
+  by_tid = collections.defaultdict(list)
+  for i, event in enumerate(events):
+    by_tid[event[5]].append(i)
+  for indexes in by_tid.itervalues():
+    # Parents start no later and end no earlier than their children, so they
+    # come first.
+    indexes.sort(key=lambda i: (events[i][1], -events[i][2]))
+    stack = []
+    for i in indexes:
+      end = events[i][1] + events[i][2]
+      while stack and events[stack[-1]][1] + events[stack[-1]][2] < end:
+        stack.pop()
+      if stack:
+        parents[i] = stack[-1]
+      stack.append(i)
+  return parents
+
+
+def _files(events, parents):
+  """Returns the .bzl file each span belongs to, or None."""
+  files = [None] * len(events)
+  # Parents are recorded after their children, as spans end, but start
+  # first.
+  for i in sorted(range(len(events)),
+                  key=lambda i: (events[i][1], -events[i][2])):
+    parent = parents[i]
+    files[i] = events[i][6].get('file') or (
+        files[parent] if parent is not None else None)
+  return files
+
+
+def stage_times(events):
+  """Returns the count, wall time and CPU time of each stage."""
+  stages = {}
+  for name, _, duration, _, cpu_duration, _, _ in events:
+    stage = stages.setdefault(name, {'count': 0, 'wall_s': 0, 'cpu_s': 0})
+    stage['count'] += 1
+    stage['wall_s'] += duration
+    stage['cpu_s'] += cpu_duration
+  for stage in stages.itervalues():
+    stage['wall_s'] = _seconds(stage['wall_s'])
+    stage['cpu_s'] = _seconds(stage['cpu_s'])
+  return stages
+
+
+def slowest_files(events, count):
+  """Returns the count files whose spans took the longest wall time.
+
+  The time of a file is the time of its outermost spans, and each file is
+  listed with the wall time of each of its stages.
+  """
+  parents = _parents(events)
+  files = _files(events, parents)
+  totals = collections.defaultdict(int)
+  stages = collections.defaultdict(lambda: collections.defaultdict(int))
+  for i, bzl_file in enumerate(files):
+    if bzl_file is None:
+      continue
+    name, _, duration = events[i][:3]
+    stages[bzl_file][name] += duration
+    parent = parents[i]
+    if parent is None or files[parent] != bzl_file:
+      totals[bzl_file] += duration
+
+  slowest = sorted(totals.iteritems(), key=lambda item: (-item[1], item[0]))
+  return [{
+      'file': bzl_file,
+      'wall_s': _seconds(total),
+      'stages': dict((name, _seconds(duration))
+                     for name, duration in stages[bzl_file].iteritems()),
+  } for bzl_file, total in slowest[:count]]
+
+
+class RunStats(object):
+  """Counts the files extracted and the outputs written by a run."""
+
+  def __init__(self):
+    self.files = 0
+    self.rules = 0
+    self.macros = 0
+    self.repository_rules = 0
+    self.attributes = 0
+    self.output_files = 0
+    # Dict mapping the extension of output files to their total size.
+    self.output_bytes = collections.defaultdict(int)
+
+  def add_extracted(self, extracted):
+    """Counts the definitions of a file_extractor.ExtractedFile."""
+    self.files += 1
+    for rule in extracted.language.rule:
+      if rule.type == build_pb2.RuleDefinition.MACRO:
+        self.macros += 1
+      elif rule.type == build_pb2.RuleDefinition.REPOSITORY_RULE:
+        self.repository_rules += 1
+      else:
+        self.rules += 1
+      self.attributes += len(rule.attribute)
+
+  def add_outputs(self, sizes):
+    """Counts output files, given a dict mapping their paths to their size."""
+    for path, size in sizes.iteritems():
+      self.output_files += 1
+      self.output_bytes[os.path.splitext(path)[1].lstrip('.')] += size
+
+  def write(self, path, output_format, wall_time, cpu_time, events, caches,
+            slowest_count=SLOWEST_FILES):
+    """Writes the statistics to path as JSON.
+
+    Args:
+      path: The path of the JSON file.
+      output_format: The format of the documentation, such as html.
+      wall_time: The wall time of the run in seconds.
+      cpu_time: The CPU time of the main process in seconds.
+      events: The spans recorded by the profiler.
+      caches: Dict mapping the name of each cache used to its cache_stats.
+      slowest_count: The number of slowest files listed.
+    """
+    stats = {
+        'files': self.files,
+        'definitions': {
+            'rules': self.rules,
+            'macros': self.macros,
+            'repository_rules': self.repository_rules,
+            'attributes': self.attributes,
+        },
+        'output': {
+            'format': output_format,
+            'files': self.output_files,
+            'bytes': sum(self.output_bytes.itervalues()),
+            'bytes_by_extension': dict(self.output_bytes),
+        },
+        'time': {
+            'wall_s': round(wall_time, 6),
+            'cpu_s': round(cpu_time, 6),
+        },
+        'stages': stage_times(events),
+        'caches': caches,
+        'slowest_files': slowest_files(events, slowest_count),
+    }
+    with open(path, 'w') as f:
+      json.dump(stats, f, indent=2, separators=(',', ': '), sort_keys=True)
+      f.write('\n')
@@ -0,0 +1,135 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import file_extractor
+from skydoc import run_stats
+
+
+def _span(name, start, duration, tid=1, cpu_duration=None, **args):
+  if cpu_duration is None:
+    cpu_duration = duration
+  return (name, start, duration, 0, cpu_duration, tid, args)
+
+
+# Spans of two files extracted by a worker and rendered by the main process,
+# in the order they are recorded, as they end.
+_EVENTS = [
+    _span('parse', 0, 100, tid=2),
+    _span('exec', 100, 200, tid=2),
+    _span('extract', 0, 400, tid=2, file='a.bzl'),
+    _span('parse', 400, 50, tid=2),
+    _span('extract', 400, 100, tid=2, file='b.bzl'),
+    _span('mistune', 1010, 30),
+    _span('render', 1000, 500, cpu_duration=400, file='a.bzl',
+          output='a.html'),
+    _span('write', 1500, 10, file='a.bzl', output='a.html'),
+    _span('render', 1600, 100, output='index.html'),
+]
+
+
+class StagesTest(unittest.TestCase):
+
+  def test_stage_times(self):
+    stages = run_stats.stage_times(_EVENTS)
+    self.assertEqual({'count': 2, 'wall_s': 0.0005, 'cpu_s': 0.0005},
+                     stages['extract'])
+    self.assertEqual({'count': 2, 'wall_s': 0.0006, 'cpu_s': 0.0005},
+                     stages['render'])
+    self.assertEqual(1, stages['exec']['count'])
+
+  def test_slowest_files(self):
+    slowest = run_stats.slowest_files(_EVENTS, 10)
+    self.assertEqual(['a.bzl', 'b.bzl'], [f['file'] for f in slowest])
+    a, b = slowest
+    # Nested spans are not counted twice in the time of the file, and spans
+    # of no file, like the overview, are not counted at all.
+    self.assertEqual(0.00091, a['wall_s'])
+    self.assertEqual({
+        'parse': 0.0001, 'exec': 0.0002, 'extract': 0.0004,
+        'mistune': 0.00003, 'render': 0.0005, 'write': 0.00001,
+    }, a['stages'])
+    self.assertEqual(0.0001, b['wall_s'])
+    self.assertEqual({'parse': 0.00005, 'extract': 0.0001}, b['stages'])
+
+  def test_slowest_files_count(self):
+    self.assertEqual(['a.bzl'], [f['file'] for f in
+                                 run_stats.slowest_files(_EVENTS, 1)])
+
+
+class CacheStatsTest(unittest.TestCase):
+
+  def test_hit_rate(self):
+    self.assertEqual({'hits': 3, 'misses': 1, 'hit_rate': 0.75},
+                     run_stats.cache_stats(3, 1))
+
+  def test_unused(self):
+    self.assertIsNone(run_stats.cache_stats(0, 0)['hit_rate'])
+
+
+class RunStatsTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def test_write(self):
+    language = build_pb2.BuildLanguage()
+    for name, rule_type, attributes in [
+        ('a_rule', build_pb2.RuleDefinition.RULE, 3),
+        ('a_macro', build_pb2.RuleDefinition.MACRO, 2),
+        ('a_repo', build_pb2.RuleDefinition.REPOSITORY_RULE, 1)]:
+      rule = language.rule.add()
+      rule.name = name
+      rule.type = rule_type
+      for i in range(attributes):
+        attribute = rule.attribute.add()
+        attribute.name = 'attr_%d' % i
+        attribute.type = build_pb2.Attribute.STRING
+        attribute.mandatory = False
+    stats = run_stats.RunStats()
+    stats.add_extracted(file_extractor.ExtractedFile(language, '', ''))
+    stats.add_extracted(
+        file_extractor.ExtractedFile(build_pb2.BuildLanguage(), '', ''))
+    stats.add_outputs({'a.html': 100, 'b.html': 50, 'main.css': 10})
+
+    path = os.path.join(self.temp_dir, 'stats.json')
+    stats.write(path, 'html', 1.5, 1.25, _EVENTS,
+                {'markdown': run_stats.cache_stats(1, 1)}, 1)
+    with open(path) as f:
+      written = json.load(f)
+    self.assertEqual(2, written['files'])
+    self.assertEqual({'rules': 1, 'macros': 1, 'repository_rules': 1,
+                      'attributes': 6}, written['definitions'])
+    self.assertEqual({'format': 'html', 'files': 3, 'bytes': 160,
+                      'bytes_by_extension': {'html': 150, 'css': 10}},
+                     written['output'])
+    self.assertEqual({'wall_s': 1.5, 'cpu_s': 1.25}, written['time'])
+    self.assertEqual(0.5, written['caches']['markdown']['hit_rate'])
+    self.assertEqual(['a.bzl'],
+                     [f['file'] for f in written['slowest_files']])
+    self.assertIn('exec', written['stages'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,191 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Builds the prebuilt search index of the HTML documentation.
+
+The index lists one document for each rule set, rule and attribute, and maps
+the tokens of their names and short descriptions to the documents that
+contain them. Both are split into shards, which are written as scripts so
+that the search page can load them from the file system as well as from a
+web server:
+
+* search/t_<prefix>.js holds the inverted index of the tokens that start
+  with <prefix>. A query only loads the shards of the prefixes of its words.
+* search/d_<n>.js holds documents n * DOCS_PER_SHARD to
+  (n + 1) * DOCS_PER_SHARD - 1, as [title, URL, kind, description] lists.
+  Only the shards of the displayed results are loaded.
+
+The document IDs of each token are sorted and delta-encoded.
+"""
+
+import json
+import re
+# internal imports
+
+SEARCH_DIR = 'search'
+
+# The number of leading characters of the tokens that shards are keyed by.
+PREFIX_LENGTH = 2
+
+DOCS_PER_SHARD = 500
+
+# The maximum length of the descriptions shown in the search results.
+MAX_DESCRIPTION_LENGTH = 120
+
+KIND_RULESET = 'ruleset'
+KIND_RULE = 'rule'
+KIND_ATTRIBUTE = 'attribute'
+
+# Words of descriptions that are too common to be useful in queries.
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'be', 'by', 'for', 'from', 'if', 'in',
+    'is', 'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'with',
+])
+
+_WORD_PATTERN = re.compile(r'[a-z0-9_]+')
+
+
+def tokenize(text):
+  """Returns the set of tokens of text.
+
+  Text is lowercased and split into words. Words containing underscores, as
+  most rule and attribute names do, are also split into their parts, so that
+  java_library is found by both java_library and library.
+  """
+  tokens = set()
+  for word in _WORD_PATTERN.findall(text.lower()):
+    tokens.add(word)
+    if '_' in word:
+      tokens.update(word.split('_'))
+  tokens.discard('')
+  return tokens
+
+
+def _shard_key(token):
+  return token[:PREFIX_LENGTH]
+
+
+def _short_description(documentation):
+  """Returns the first paragraph of documentation on one line, truncated."""
+  paragraph = ' '.join(documentation.split('\n\n', 1)[0].split())
+  if len(paragraph) > MAX_DESCRIPTION_LENGTH:
+    paragraph = paragraph[:MAX_DESCRIPTION_LENGTH - 3].rstrip() + '...'
+  return paragraph
+
+
+def page_config(search_root, shards):
+  """Returns the JSON configuration of the search page.
+
+  Args:
+    search_root: The URL of the directory containing the shards, ending with
+      a slash.
+    shards: The keys of the token shards, as returned by SearchIndex.finish.
+  """
+  return json.dumps({
+      'root': search_root,
+      'shards': shards,
+      'prefix_length': PREFIX_LENGTH,
+      'docs_per_shard': DOCS_PER_SHARD,
+      'stop_words': sorted(STOP_WORDS),
+  }, sort_keys=True)
+
+
+def _script(callback, key, value):
+  """Returns a script that passes key and value to a search page callback."""
+  return 'skydocSearch.%s(%s,%s);\n' % (
+      callback, json.dumps(key),
+      json.dumps(value, separators=(',', ':'), sort_keys=True))
+
+
+class SearchIndex(object):
+  """Accumulates the search index of the rule sets as they are written.
+
+  Document shards are written as soon as they are full, so only the inverted
+  index, which holds the document IDs, is kept in memory.
+  """
+
+  def __init__(self, doc_link):
+    """Inits SearchIndex.
+
+    Args:
+      doc_link: Function that returns the URL of the page of an output file,
+        like the doc_link template filter.
+    """
+    self.__doc_link = doc_link
+    self.__docs = []
+    self.__num_docs = 0
+    self.__postings = {}
+
+  @property
+  def num_docs(self):
+    return self.__num_docs
+
+  def _add_doc(self, add_file, title, url, kind, documentation, keywords):
+    doc_id = self.__num_docs
+    self.__num_docs += 1
+    description = _short_description(documentation)
+    self.__docs.append([title, url, kind, description])
+    for token in tokenize(keywords) | (tokenize(description) - STOP_WORDS):
+      self.__postings.setdefault(token, []).append(doc_id)
+    if len(self.__docs) == DOCS_PER_SHARD:
+      self._flush_docs(add_file)
+
+  def _flush_docs(self, add_file):
+    if self.__docs:
+      shard = (self.__num_docs - 1) // DOCS_PER_SHARD
+      add_file('%s/d_%d.js' % (SEARCH_DIR, shard),
+               _script('addDocs', shard, self.__docs))
+      self.__docs = []
+
+  def add_ruleset(self, add_file, ruleset):
+    """Indexes a RuleSet, its rules and their attributes.
+
+    Args:
+      add_file: Function called with the path and content of each shard of
+        documents that is complete.
+      ruleset: The rule.RuleSet.
+    """
+    url = self.__doc_link(ruleset.output_file)
+    self._add_doc(add_file, ruleset.title, url, KIND_RULESET,
+                  ruleset.description, ruleset.title + ' ' + ruleset.name)
+    for definition in ruleset.definitions:
+      # Definitions of split rule sets are documented on their own pages.
+      rule_url = self.__doc_link(definition.output_file)
+      self._add_doc(add_file, definition.name,
+                    '%s#%s' % (rule_url, definition.name), KIND_RULE,
+                    definition.documentation, definition.name)
+      for attribute in definition.attributes:
+        # Every rule has a name attribute, which is not worth a result.
+        if attribute.name == 'name':
+          continue
+        self._add_doc(add_file, '%s.%s' % (definition.name, attribute.name),
+                      '%s#%s.%s' % (rule_url, definition.name, attribute.name),
+                      KIND_ATTRIBUTE, attribute.documentation, attribute.name)
+
+  def finish(self, add_file):
+    """Writes the last document shard and all token shards.
+
+    Returns:
+      The sorted list of the keys of the token shards.
+    """
+    self._flush_docs(add_file)
+    shards = {}
+    for token, doc_ids in self.__postings.iteritems():
+      deltas = [doc_ids[0]] + [doc_ids[i] - doc_ids[i - 1]
+                               for i in range(1, len(doc_ids))]
+      shards.setdefault(_shard_key(token), {})[token] = deltas
+    for key, tokens in sorted(shards.iteritems()):
+      add_file('%s/t_%s.js' % (SEARCH_DIR, key),
+               _script('addTokens', key, tokens))
+    return sorted(shards)
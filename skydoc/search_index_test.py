@@ -0,0 +1,127 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import unittest
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import rule
+from skydoc import search_index
+
+
+def _make_ruleset(bzl_file, rule_names, attribute_names):
+  language = build_pb2.BuildLanguage()
+  for rule_name in rule_names:
+    rule_proto = language.rule.add()
+    rule_proto.name = rule_name
+    rule_proto.type = build_pb2.RuleDefinition.RULE
+    rule_proto.documentation = 'Builds the %s.\n\nMore details.' % rule_name
+    for attribute_name in ['name'] + attribute_names:
+      attribute = rule_proto.attribute.add()
+      attribute.name = attribute_name
+      attribute.type = build_pb2.Attribute.STRING
+      attribute.documentation = 'The %s of the target.' % attribute_name
+  return rule.RuleSet(bzl_file, language, '', '', '', 'html')
+
+
+def _parse(content):
+  """Returns the arguments of the callback called by a shard script."""
+  return json.loads('[%s]' % content[content.index('(') + 1:
+                                     content.rindex(')')])
+
+
+class SearchIndexTest(unittest.TestCase):
+
+  def setUp(self):
+    self.files = {}
+
+  def add_file(self, path, content):
+    self.assertNotIn(path, self.files)
+    self.files[path] = content
+
+  def build(self, rulesets):
+    index = search_index.SearchIndex(lambda output_file: '/' + output_file)
+    for ruleset in rulesets:
+      index.add_ruleset(self.add_file, ruleset)
+    return index, index.finish(self.add_file)
+
+  def docs(self):
+    docs = []
+    shard = 0
+    while 'search/d_%d.js' % shard in self.files:
+      key, shard_docs = _parse(self.files['search/d_%d.js' % shard])
+      self.assertEqual(shard, key)
+      docs.extend(shard_docs)
+      shard += 1
+    return docs
+
+  def postings(self, token):
+    path = 'search/t_%s.js' % token[:search_index.PREFIX_LENGTH]
+    if path not in self.files:
+      return []
+    _, tokens = _parse(self.files[path])
+    doc_ids = []
+    doc_id = 0
+    for delta in tokens.get(token, []):
+      doc_id += delta
+      doc_ids.append(doc_id)
+    return doc_ids
+
+  def test_tokenize(self):
+    self.assertEqual(set(['java_library', 'java', 'library', 'builds', 'a']),
+                     search_index.tokenize('Builds a Java_Library.'))
+
+  def test_documents(self):
+    _, shards = self.build([
+        _make_ruleset('pkg/java.bzl', ['java_library'], ['srcs']),
+    ])
+    self.assertEqual([
+        ['java Rules', '/pkg/java', 'ruleset', ''],
+        ['java_library', '/pkg/java#java_library', 'rule',
+         'Builds the java_library.'],
+        ['java_library.srcs', '/pkg/java#java_library.srcs', 'attribute',
+         'The srcs of the target.'],
+    ], self.docs())
+    self.assertEqual([0, 1], self.postings('java'))
+    self.assertEqual([1], self.postings('library'))
+    self.assertEqual([1, 2], self.postings('builds') + self.postings('srcs'))
+    # Stop words in descriptions are not indexed.
+    self.assertEqual([], self.postings('the'))
+    self.assertIn('ja', shards)
+    self.assertEqual(sorted(shards), shards)
+
+  def test_shards(self):
+    attribute_names = ['attr_%d' % i for i in range(99)]
+    rule_names = ['rule_%d' % i for i in range(10)]
+    index, _ = self.build([_make_ruleset('pkg/a.bzl', rule_names,
+                                         attribute_names)])
+    # One document for the rule set, and one for each rule and attribute.
+    self.assertEqual(1 + 10 * 100, index.num_docs)
+    self.assertEqual(index.num_docs, len(self.docs()))
+    self.assertEqual(
+        (index.num_docs + search_index.DOCS_PER_SHARD - 1) //
+        search_index.DOCS_PER_SHARD,
+        len([path for path in self.files if path.startswith('search/d_')]))
+    self.assertEqual(range(2, index.num_docs, 100), self.postings('attr_0'))
+
+  def test_page_config(self):
+    config = json.loads(search_index.page_config('/docs/search/', ['ab']))
+    self.assertEqual('/docs/search/', config['root'])
+    self.assertEqual(['ab'], config['shards'])
+    self.assertEqual(search_index.DOCS_PER_SHARD, config['docs_per_shard'])
+
+
+if __name__ == '__main__':
+  unittest.main()
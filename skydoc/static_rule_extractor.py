@@ -0,0 +1,250 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Evaluates the rules in a .bzl file from its AST without running it.
+
+Only the subset of Skylark needed to define rules is understood: literals,
+module-level constants, Label(), dict(), list(), + and %, and calls to the
+attr.*(), rule() and repository_rule() stubs. The stubs are called directly
+with the evaluated arguments, so the rules produced are the same as when the
+file is evaluated against them. No code from the .bzl file is run.
+"""
+
+import ast
+import operator
+# internal imports
+
+from skydoc.stubs import attr
+from skydoc.stubs import skylark_globals
+
+ATTR_FUNCTIONS = frozenset([
+    'bool',
+    'int',
+    'int_list',
+    'label',
+    'label_list',
+    'label_keyed_string_dict',
+    'license',
+    'output',
+    'output_list',
+    'string',
+    'string_dict',
+    'string_list',
+    'string_list_dict',
+])
+"""The attr module functions that can be called during static evaluation."""
+
+RULE_FUNCTIONS = frozenset(['rule', 'repository_rule'])
+
+_BUILTINS = {
+    'True': True,
+    'False': False,
+    'None': None,
+    'dict': dict,
+    'list': list,
+}
+
+# Functions without side effects that can be called with evaluated arguments.
+_PURE_FUNCTIONS = tuple([getattr(attr, name) for name in ATTR_FUNCTIONS] + [
+    dict,
+    list,
+    skylark_globals.aspect,
+    skylark_globals.FileType,
+    skylark_globals.Label,
+    skylark_globals.provider,
+    skylark_globals.repository_rule,
+    skylark_globals.rule,
+    skylark_globals.select,
+    skylark_globals.struct,
+])
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Mod: operator.mod,
+}
+
+
+class StaticExtractionError(Exception):
+  """Raised when the rules in a .bzl file cannot be evaluated statically."""
+  pass
+
+
+class _Unsupported(Exception):
+  """Raised when an expression cannot be evaluated statically."""
+  pass
+
+
+class _Function(object):
+  """Placeholder for a function defined in the .bzl file."""
+
+  def __init__(self, name):
+    self.name = name
+
+
+# Placeholder for the value of a private global that could not be evaluated.
+# It is only an error to use it.
+_UNKNOWN = object()
+
+
+def _calls_rule(node):
+  """Returns whether the expression contains a rule() or repository_rule()."""
+  for child in ast.walk(node):
+    if (isinstance(child, ast.Call) and isinstance(child.func, ast.Name) and
+        child.func.id in RULE_FUNCTIONS):
+      return True
+  return False
+
+
+def _is_load(node):
+  return (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+          node.func.id == 'load')
+
+
+class _Evaluator(object):
+  """Evaluates the supported subset of Skylark expressions."""
+
+  def __init__(self, env):
+    self.__env = env
+
+  def evaluate(self, node):
+    method = getattr(self, '_eval_' + node.__class__.__name__, None)
+    if not method:
+      raise _Unsupported('%s expressions' % node.__class__.__name__)
+    return method(node)
+
+  def _eval_Str(self, node):
+    return node.s
+
+  def _eval_Num(self, node):
+    return node.n
+
+  def _eval_Name(self, node):
+    if node.id in self.__env:
+      value = self.__env[node.id]
+    elif node.id in _BUILTINS:
+      value = _BUILTINS[node.id]
+    else:
+      raise _Unsupported('undefined name %s' % node.id)
+    if value is _UNKNOWN:
+      raise _Unsupported('%s could not be evaluated' % node.id)
+    return value
+
+  def _eval_List(self, node):
+    return [self.evaluate(elt) for elt in node.elts]
+
+  def _eval_Tuple(self, node):
+    return tuple(self.evaluate(elt) for elt in node.elts)
+
+  def _eval_Dict(self, node):
+    try:
+      return dict((self.evaluate(key), self.evaluate(value))
+                  for key, value in zip(node.keys, node.values))
+    except TypeError as e:
+      raise _Unsupported(str(e))
+
+  def _eval_UnaryOp(self, node):
+    if not isinstance(node.op, ast.USub):
+      raise _Unsupported('%s operator' % node.op.__class__.__name__)
+    return -self.evaluate(node.operand)
+
+  def _eval_BinOp(self, node):
+    op = _BINARY_OPERATORS.get(node.op.__class__)
+    if not op:
+      raise _Unsupported('%s operator' % node.op.__class__.__name__)
+    try:
+      return op(self.evaluate(node.left), self.evaluate(node.right))
+    except (TypeError, ValueError) as e:
+      raise _Unsupported(str(e))
+
+  def _eval_Subscript(self, node):
+    if not isinstance(node.slice, ast.Index):
+      raise _Unsupported('slices')
+    try:
+      return self.evaluate(node.value)[self.evaluate(node.slice.value)]
+    except (KeyError, IndexError, TypeError) as e:
+      raise _Unsupported(str(e))
+
+  def _eval_Attribute(self, node):
+    if (isinstance(node.value, ast.Name) and
+        self._eval_Name(node.value) is attr and node.attr in ATTR_FUNCTIONS):
+      return getattr(attr, node.attr)
+    raise _Unsupported('attribute %s' % node.attr)
+
+  def _eval_Call(self, node):
+    func = self.evaluate(node.func)
+    if not any(func is pure_function for pure_function in _PURE_FUNCTIONS):
+      raise _Unsupported('calls to %s' % getattr(func, 'name', func))
+
+    args = [self.evaluate(arg) for arg in node.args]
+    if node.starargs:
+      args.extend(self.evaluate(node.starargs))
+    kwargs = {}
+    if node.kwargs:
+      kwargs.update(self.evaluate(node.kwargs))
+    for keyword in node.keywords:
+      kwargs[keyword.arg] = self.evaluate(keyword.value)
+    try:
+      return func(*args, **kwargs)
+    except Exception as e:
+      # Let the fallback to evaluating the file report the actual error.
+      raise _Unsupported(str(e))
+
+
+def evaluate(bzl_file, tree, global_stubs):
+  """Evaluates the module-level definitions of a .bzl file from its AST.
+
+  Args:
+    bzl_file: The path of the .bzl file, for error messages.
+    tree: The ast.Module of the .bzl file.
+    global_stubs: Dict of the Skylark stubs and loaded symbols, as created by
+      rule_extractor.create_stubs.
+
+  Returns:
+    A dict of the globals of the .bzl file, including global_stubs, like the
+    one produced by evaluating the file against them. Private globals that
+    could not be evaluated are omitted.
+
+  Raises:
+    StaticExtractionError: If the file contains statements that are not
+      supported, or a public global or a rule that cannot be evaluated.
+  """
+  env = dict(global_stubs)
+  evaluator = _Evaluator(env)
+  for node in tree.body:
+    if isinstance(node, ast.FunctionDef):
+      env[node.name] = _Function(node.name)
+    elif isinstance(node, ast.Expr):
+      if not isinstance(node.value, ast.Str) and not _is_load(node.value):
+        raise StaticExtractionError(
+            '%s:%d: Unsupported expression statement.' % (bzl_file, node.lineno))
+    elif (isinstance(node, ast.Assign) and len(node.targets) == 1 and
+          isinstance(node.targets[0], ast.Name)):
+      name = node.targets[0].id
+      try:
+        env[name] = evaluator.evaluate(node.value)
+      except _Unsupported as e:
+        # Public globals may be rules created in other ways, such as by
+        # functions, so they must be evaluated for the documentation to be
+        # complete. Private constants only matter if they are used.
+        if not name.startswith('_') or _calls_rule(node.value):
+          raise StaticExtractionError(
+              '%s:%d: Cannot evaluate %s: %s' % (bzl_file, node.lineno, name, e))
+        env[name] = _UNKNOWN
+    else:
+      raise StaticExtractionError(
+          '%s:%d: Unsupported %s statement.' %
+          (bzl_file, node.lineno, node.__class__.__name__))
+
+  return dict((name, value) for name, value in env.iteritems()
+              if value is not _UNKNOWN)
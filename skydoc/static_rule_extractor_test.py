@@ -0,0 +1,140 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import tempfile
+import textwrap
+import unittest
+# internal imports
+
+from skydoc import build_pb2
+from skydoc import load_extractor
+from skydoc import rule_extractor
+from skydoc import static_rule_extractor
+from skydoc.stubs import skylark_globals
+
+
+class StaticRuleExtractorTest(unittest.TestCase):
+
+  def evaluate(self, src, load_symbols=[]):
+    global_stubs = rule_extractor.create_stubs(rule_extractor.SKYLARK_STUBS,
+                                               load_symbols)
+    return static_rule_extractor.evaluate(
+        'test.bzl', ast.parse(textwrap.dedent(src)), global_stubs)
+
+  def test_constants(self):
+    env = self.evaluate("""\
+        _DEFAULT = "//foo:" + "bar"
+        _COMMON_ATTRS = {
+            "deps": attr.label_list(),
+            "dep": attr.label(default = Label(_DEFAULT)),
+        }
+        _VERSION = "%s.%d" % ("1", -2)
+
+        def _impl(ctx):
+          return struct()
+
+        foo_rule = rule(
+            implementation = _impl,
+            attrs = dict(_COMMON_ATTRS, version = attr.string(default = _VERSION)),
+        )
+        """)
+    foo_rule = env['foo_rule']
+    self.assertIsInstance(foo_rule, skylark_globals.RuleDescriptor)
+    self.assertEqual(['dep', 'deps', 'version'], sorted(foo_rule.attrs))
+    self.assertEqual(build_pb2.Attribute.LABEL, foo_rule.attrs['dep'].type)
+    self.assertEqual("'//foo:bar'", repr(foo_rule.attrs['dep'].default))
+    self.assertEqual("'1.-2'", foo_rule.attrs['version'].default)
+
+  def test_loaded_symbols(self):
+    load_symbols = [
+        load_extractor.LoadSymbol('//foo:bar.bzl', 'BAR_ATTRS', None),
+    ]
+    env = self.evaluate("""\
+        load("//foo:bar.bzl", "BAR_ATTRS")
+
+        def _impl(ctx):
+          return struct()
+
+        foo_rule = rule(implementation = _impl, attrs = dict(BAR_ATTRS))
+        """, load_symbols)
+    self.assertEqual({}, env['foo_rule'].attrs)
+
+  def test_code_is_not_run(self):
+    # Running this file would fail, since fail() is not stubbed.
+    env = self.evaluate("""\
+        def _explode():
+          fail("The file was run.")
+
+        _UNUSED = _explode()
+
+        def _impl(ctx):
+          return struct()
+
+        foo_rule = rule(implementation = _impl)
+        """)
+    self.assertIsInstance(env['foo_rule'], skylark_globals.RuleDescriptor)
+    self.assertNotIn('_UNUSED', env)
+
+  def test_unsupported_rule(self):
+    with self.assertRaisesRegexp(static_rule_extractor.StaticExtractionError,
+                                 'test.bzl:6: Cannot evaluate foo_rule: '
+                                 '_ATTRS could not be evaluated'):
+      self.evaluate("""\
+          def _make_attrs():
+            return {"dep": attr.label()}
+
+          _ATTRS = _make_attrs()
+
+          foo_rule = rule(implementation = None, attrs = _ATTRS)
+          """)
+
+  def test_unsupported_public_global(self):
+    with self.assertRaisesRegexp(static_rule_extractor.StaticExtractionError,
+                                 'Cannot evaluate foo_rule'):
+      self.evaluate("""\
+          def _make_rule():
+            return rule(implementation = None)
+
+          foo_rule = _make_rule()
+          """)
+
+  def test_unsupported_statement(self):
+    with self.assertRaisesRegexp(static_rule_extractor.StaticExtractionError,
+                                 'test.bzl:2: Unsupported expression'):
+      self.evaluate("""\
+          ATTRS = {}
+          ATTRS.update({"dep": attr.label()})
+          """)
+
+  def test_falls_back_to_evaluation(self):
+    src = textwrap.dedent("""\
+        def _make_attrs():
+          return {"dep": attr.label()}
+
+        foo_rule = rule(implementation = None, attrs = _make_attrs())
+        \"\"\"A rule.\"\"\"
+        """)
+    with tempfile.NamedTemporaryFile() as tf:
+      tf.write(src)
+      tf.flush()
+      extractor = rule_extractor.RuleDocExtractor()
+      extractor.parse_bzl(tf.name, [], static=True)
+    self.assertFalse(extractor.statically_extracted)
+    self.assertEqual(['name', 'dep'], [
+        attribute.name for attribute in extractor.proto().rule[0].attribute])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,143 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Creates the Jinja environment used to render the documentation.
+
+The templates can be precompiled at build time into a zip archive of Python
+modules, one per template, so that starting skydoc does not lex, parse and
+compile any template. The archive is loaded with jinja2.ModuleLoader.
+"""
+
+import collections
+import os
+import zipfile
+# internal imports
+import jinja2
+import mistune
+
+from skydoc import profiler
+
+# The number of rendered Markdown strings kept by the markdown filter.
+MARKDOWN_CACHE_SIZE = 4096
+
+# The timestamp of the modules in the archive, which is reproducible like the
+# documentation zip archive.
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class MarkdownFilter(object):
+  """The markdown filter, which renders Markdown text to HTML.
+
+  A single mistune parser and renderer is reused for all text, and the HTML
+  of the most recently rendered strings is memoized, since the same
+  descriptions, such as the one of the name attribute, are rendered on many
+  pages.
+  """
+
+  def __init__(self, max_size=MARKDOWN_CACHE_SIZE):
+    self.__markdown = mistune.Markdown(escape=True)
+    self.__cache = collections.OrderedDict()
+    self.__max_size = max_size
+    self.hits = 0
+    self.misses = 0
+
+  @property
+  def hit_rate(self):
+    """The fraction of the strings rendered that were memoized."""
+    total = self.hits + self.misses
+    return float(self.hits) / total if total else 0.0
+
+  def clear(self):
+    """Forgets the memoized HTML and resets the counters."""
+    self.__cache.clear()
+    self.hits = 0
+    self.misses = 0
+
+  def __call__(self, text):
+    html = self.__cache.pop(text, None)
+    if html is not None:
+      self.hits += 1
+    else:
+      self.misses += 1
+      with profiler.span('mistune'):
+        html = jinja2.Markup(self.__markdown(text))
+      if len(self.__cache) >= self.__max_size:
+        self.__cache.popitem(last=False)
+    # Reinserting the text marks it as the most recently used.
+    self.__cache[text] = html
+    return html
+
+
+# The markdown filter shared by all environments.
+markdown_filter = MarkdownFilter()
+
+
+def _create_environment(loader, site_root='', link_ext='html'):
+  """Returns a Jinja environment with the options and filters of skydoc.
+
+  The options affect how templates are compiled, so the environment used to
+  precompile the templates must be created by this function as well.
+  """
+  env = jinja2.Environment(
+      loader=loader,
+      keep_trailing_newline=True,
+      line_statement_prefix='%')
+  env.filters['markdown'] = markdown_filter
+  env.filters['doc_link'] = (
+      lambda fname: site_root + '/' + fname + '.' + link_ext)
+  env.filters['link'] = lambda fname: site_root + '/' + fname
+  return env
+
+
+def create_environment(template_dir, compiled_templates, site_root, link_ext):
+  """Returns the Jinja environment for rendering the documentation.
+
+  Args:
+    template_dir: The directory containing the .jinja templates.
+    compiled_templates: The path of the archive of precompiled templates
+      written by compile_templates. If it does not exist, the templates are
+      compiled from template_dir when they are first used.
+    site_root: The root URL of the documentation, prepended to links.
+    link_ext: The file extension of the documentation pages, used in links.
+
+  Returns:
+    The jinja2.Environment.
+  """
+  if os.path.isfile(compiled_templates):
+    loader = jinja2.ModuleLoader(compiled_templates)
+  else:
+    loader = jinja2.FileSystemLoader(template_dir)
+  return _create_environment(loader, site_root, link_ext)
+
+
+def compile_templates(template_files, output_file):
+  """Precompiles templates into a zip archive for jinja2.ModuleLoader.
+
+  Args:
+    template_files: The paths of the .jinja templates. Each template is named
+      after its file name, as it is when loaded from its directory.
+    output_file: The path of the zip archive to write.
+  """
+  env = _create_environment(None)
+  with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zf:
+    for path in sorted(template_files, key=os.path.basename):
+      name = os.path.basename(path)
+      with open(path) as f:
+        source = f.read().decode('utf-8')
+      code = env.compile(source, name, path, raw=True, defer_init=True)
+      info = zipfile.ZipInfo(jinja2.ModuleLoader.get_module_filename(name),
+                             _ZIP_DATE_TIME)
+      info.compress_type = zipfile.ZIP_DEFLATED
+      info.external_attr = 0o100644 << 16
+      zf.writestr(info, code.encode('utf-8'))
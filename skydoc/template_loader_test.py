@@ -0,0 +1,114 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+# internal imports
+import jinja2
+import mistune
+
+from skydoc import template_loader
+
+
+class TemplateLoaderTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.template_dir = os.path.join(self.temp_dir, 'templates')
+    os.makedirs(self.template_dir)
+    self.write('page.jinja', """\
+        % for item in items
+        * [{{ item }}]({{ item | doc_link }})
+        % endfor
+        {% include "footer.jinja" %}
+        """)
+    self.write('footer.jinja', """\
+        {{ footer | markdown }}
+        """)
+    self.compiled_templates = os.path.join(self.temp_dir, 'compiled.zip')
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def write(self, name, src):
+    with open(os.path.join(self.template_dir, name), 'w') as f:
+      f.write(textwrap.dedent(src))
+
+  def render(self):
+    env = template_loader.create_environment(
+        self.template_dir, self.compiled_templates, '/docs', 'html')
+    return env, env.get_template('page.jinja').render(
+        items=['a', 'b'], footer='*Footer*')
+
+  def test_precompiled_templates_render_the_same(self):
+    env, from_sources = self.render()
+    self.assertIsInstance(env.loader, jinja2.FileSystemLoader)
+
+    template_loader.compile_templates(
+        [os.path.join(self.template_dir, name)
+         for name in ['page.jinja', 'footer.jinja']],
+        self.compiled_templates)
+    # The sources must not be needed any more.
+    shutil.rmtree(self.template_dir)
+    env, precompiled = self.render()
+    self.assertIsInstance(env.loader, jinja2.ModuleLoader)
+    self.assertEqual(from_sources, precompiled)
+    self.assertIn('* [a](/docs/a.html)', precompiled)
+    self.assertIn('<em>Footer</em>', precompiled)
+
+  def test_compiled_templates_are_reproducible(self):
+    template_files = [os.path.join(self.template_dir, name)
+                      for name in ['page.jinja', 'footer.jinja']]
+    template_loader.compile_templates(template_files, self.compiled_templates)
+    with open(self.compiled_templates, 'rb') as f:
+      first = f.read()
+    template_loader.compile_templates(reversed(template_files),
+                                      self.compiled_templates)
+    with open(self.compiled_templates, 'rb') as f:
+      self.assertEqual(first, f.read())
+
+
+class MarkdownFilterTest(unittest.TestCase):
+
+  def test_renders_like_mistune(self):
+    markdown_filter = template_loader.MarkdownFilter()
+    for text in ['A *rule*.', 'Footnote[^1]\n\n[^1]: The note.',
+                 '[Link][ref]\n\n[ref]: http://example.com', 'Missing [ref]',
+                 '<b>HTML</b> is escaped.']:
+      self.assertEqual(mistune.markdown(text), markdown_filter(text))
+      self.assertIsInstance(markdown_filter(text), jinja2.Markup)
+
+  def test_memoizes_least_recently_used(self):
+    markdown_filter = template_loader.MarkdownFilter(max_size=2)
+    for text in ['a', 'b', 'a', 'c', 'a', 'b']:
+      markdown_filter(text)
+    # 'b' was evicted by 'c', since 'a' was used more recently.
+    self.assertEqual(2, markdown_filter.hits)
+    self.assertEqual(4, markdown_filter.misses)
+    self.assertAlmostEqual(1.0 / 3, markdown_filter.hit_rate)
+
+  def test_clear(self):
+    markdown_filter = template_loader.MarkdownFilter()
+    markdown_filter('a')
+    markdown_filter.clear()
+    markdown_filter('a')
+    self.assertEqual(0, markdown_filter.hits)
+    self.assertEqual(1, markdown_filter.misses)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,174 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""File watching and live-reloading preview server for --watch mode."""
+
+import BaseHTTPServer
+import os
+import posixpath
+import SimpleHTTPServer
+import SocketServer
+import threading
+import time
+import urllib
+
+EVENTS_PATH = '/__skydoc/events'
+"""Path of the server-sent events stream that signals a reload."""
+
+RELOAD_SCRIPT = """<script>
+  (function() {
+    var source = new EventSource('%s');
+    source.onmessage = function() { window.location.reload(); };
+  })();
+</script>
+""" % EVENTS_PATH
+"""Script injected into the HTML pages served by the preview server."""
+
+
+class FileWatcher(object):
+  """Polls a list of files for changes."""
+
+  def __init__(self, files):
+    self.__files = files
+    self.__snapshot = self._snapshot()
+
+  def _snapshot(self):
+    snapshot = {}
+    for path in self.__files:
+      try:
+        stat = os.stat(path)
+        snapshot[path] = (stat.st_mtime, stat.st_size)
+      except OSError:
+        snapshot[path] = None
+    return snapshot
+
+  def poll(self):
+    """Returns the files that changed since the last poll, in input order."""
+    snapshot = self._snapshot()
+    changed = [path for path in self.__files
+               if snapshot[path] != self.__snapshot[path]]
+    self.__snapshot = snapshot
+    return changed
+
+  def wait_for_changes(self, interval):
+    """Blocks until at least one file changes and returns the changed files.
+
+    Args:
+      interval: The polling interval in seconds.
+    """
+    while True:
+      changed = self.poll()
+      if changed:
+        return changed
+      time.sleep(interval)
+
+
+def inject_reload_script(html):
+  """Returns the HTML page with the live reload script added to its body."""
+  index = html.rfind('</body>')
+  if index < 0:
+    return html + RELOAD_SCRIPT
+  return html[:index] + RELOAD_SCRIPT + html[index:]
+
+
+class _PreviewRequestHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+  """Serves the generated documentation and the reload event stream."""
+
+  def log_message(self, format, *args):
+    pass
+
+  def translate_path(self, path):
+    path = posixpath.normpath(urllib.unquote(path.split('?', 1)[0]))
+    parts = [part for part in path.split('/')
+             if part and part not in (os.curdir, os.pardir)]
+    return os.path.join(self.server.directory, *parts)
+
+  def do_GET(self):
+    if self.path == EVENTS_PATH:
+      self._send_events()
+      return
+    path = self.translate_path(self.path)
+    if os.path.isdir(path):
+      path = os.path.join(path, 'index.html')
+    if not path.endswith('.html') or not os.path.isfile(path):
+      SimpleHTTPServer.SimpleHTTPRequestHandler.do_GET(self)
+      return
+    with open(path, 'rb') as f:
+      content = inject_reload_script(f.read())
+    self.send_response(200)
+    self.send_header('Content-Type', 'text/html; charset=utf-8')
+    self.send_header('Content-Length', str(len(content)))
+    self.send_header('Cache-Control', 'no-cache')
+    self.end_headers()
+    self.wfile.write(content)
+
+  def _send_events(self):
+    generation = self.server.wait_for_reload(None)
+    self.send_response(200)
+    self.send_header('Content-Type', 'text/event-stream')
+    self.send_header('Cache-Control', 'no-cache')
+    self.end_headers()
+    while True:
+      generation = self.server.wait_for_reload(generation)
+      try:
+        self.wfile.write('data: reload\n\n')
+        self.wfile.flush()
+      except IOError:
+        return
+
+
+class PreviewServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  """Local HTTP server for previewing the documentation as it is regenerated.
+
+  HTML pages are served with a script that reloads them whenever
+  notify_reload is called.
+  """
+
+  daemon_threads = True
+
+  def __init__(self, directory, port):
+    BaseHTTPServer.HTTPServer.__init__(self, ('localhost', port),
+                                       _PreviewRequestHandler)
+    self.directory = directory
+    self.__generation = 0
+    self.__condition = threading.Condition()
+
+  def server_bind(self):
+    # HTTPServer.server_bind looks up the fully qualified domain name of the
+    # host, which can block for a long time without network access.
+    SocketServer.TCPServer.server_bind(self)
+    self.server_name, self.server_port = self.server_address[:2]
+
+  def start(self):
+    """Starts serving in a background thread."""
+    thread = threading.Thread(target=self.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+  def wait_for_reload(self, generation):
+    """Waits until the generation differs from the given one and returns it.
+
+    If generation is None, the current generation is returned immediately.
+    """
+    with self.__condition:
+      while generation is not None and self.__generation == generation:
+        # Waiting with a timeout keeps the thread responsive to interrupts.
+        self.__condition.wait(1.0)
+      return self.__generation
+
+  def notify_reload(self):
+    """Signals the pages open in the browser to reload."""
+    with self.__condition:
+      self.__generation += 1
+      self.__condition.notify_all()
@@ -0,0 +1,86 @@
+# Copyright 2018 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import httplib
+import os
+import shutil
+import tempfile
+import unittest
+import urllib2
+# internal imports
+
+from skydoc import watch
+
+
+class WatchTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def write_file(self, name, content):
+    path = os.path.join(self.temp_dir, name)
+    with open(path, 'w') as f:
+      f.write(content)
+    return path
+
+  def test_file_watcher(self):
+    foo = self.write_file('foo.bzl', 'foo = 1\n')
+    bar = self.write_file('bar.bzl', 'bar = 1\n')
+    watcher = watch.FileWatcher([foo, bar])
+    self.assertEqual([], watcher.poll())
+
+    self.write_file('bar.bzl', 'bar = 22\n')
+    self.assertEqual([bar], watcher.poll())
+    self.assertEqual([], watcher.poll())
+
+    os.remove(foo)
+    self.assertEqual([foo], watcher.poll())
+    self.write_file('foo.bzl', 'foo = 1\n')
+    self.assertEqual([foo], watcher.wait_for_changes(0.01))
+
+  def test_inject_reload_script(self):
+    html = watch.inject_reload_script('<html><body>Foo</body></html>')
+    self.assertEqual(
+        '<html><body>Foo' + watch.RELOAD_SCRIPT + '</body></html>', html)
+    self.assertEqual('Foo' + watch.RELOAD_SCRIPT,
+                     watch.inject_reload_script('Foo'))
+
+  def test_preview_server(self):
+    self.write_file('index.html', '<html><body>Index</body></html>')
+    self.write_file('main.css', 'body {}')
+    server = watch.PreviewServer(self.temp_dir, 0)
+    server.start()
+    try:
+      root = 'http://localhost:%d' % server.server_address[1]
+      self.assertIn(watch.EVENTS_PATH, urllib2.urlopen(root + '/').read())
+      self.assertEqual('body {}',
+                       urllib2.urlopen(root + '/main.css').read())
+
+      connection = httplib.HTTPConnection('localhost', server.server_address[1])
+      connection.request('GET', watch.EVENTS_PATH)
+      events = connection.getresponse()
+      self.assertEqual('text/event-stream', events.getheader('Content-Type'))
+      server.notify_reload()
+      self.assertEqual('data: reload\n', events.fp.readline())
+      connection.close()
+    finally:
+      server.shutdown()
+      server.server_close()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -25,8 +25,91 @@ def _skydoc(ctx):
     if not f.path.endswith(".py"):
       return f
 
+def _skydoc_args(ctx):
+  """Returns the Args of a skydoc action.
+
+  Bazel writes them to a params file, one per line, which keeps command lines
+  short however many files are documented and lets the action run on a
+  persistent worker, which keeps skydoc's imports, templates and caches warm
+  across actions.
+  """
+  args = ctx.actions.args()
+  args.use_param_file("@%s", use_always = True)
+  args.set_param_file_format("multiline")
+  return args
+
+def _run_skydoc(ctx, skydoc, args, inputs, outputs, mnemonic,
+                progress_message):
+  """Declares an action running skydoc with args."""
+  ctx.actions.run(
+      inputs = inputs,
+      tools = [skydoc],
+      executable = skydoc,
+      arguments = [args],
+      outputs = outputs,
+      mnemonic = mnemonic,
+      execution_requirements = {"supports-workers": "1"},
+      use_default_shell_env = True,
+      progress_message = progress_message)
+
+def _profile(ctx, args, path, outputs):
+  """Adds a --profile flag to args if the profile attribute is set.
+
+  Returns:
+    The list of the trace files, which is empty if profile is not set.
+  """
+  if not ctx.attr.profile:
+    return []
+  trace = ctx.actions.declare_file(path)
+  args.add(trace, format = "--profile=%s")
+  outputs.append(trace)
+  return [trace]
+
+def _extract(ctx, skydoc, source, inputs):
+  """Declares the action extracting the documentation of a .bzl file.
+
+  Args:
+    ctx: The rule context.
+    skydoc: The skydoc executable.
+    source: The .bzl file.
+    inputs: The depset of the .bzl files source may load.
+
+  Returns:
+    A (extracted, traces) pair of the file the ExtractedFile proto of source
+    is written to and the list of the trace files of the action.
+  """
+  # Sources of external repositories have short paths starting with "../".
+  path = "%s-skydoc/%s" % (ctx.label.name,
+                           source.short_path.replace("../", "external/"))
+  extracted = ctx.actions.declare_file(path + ".pb")
+  outputs = [extracted]
+  args = _skydoc_args(ctx)
+  args.add("--extract_only")
+  args.add(extracted, format = "--output_file=%s")
+  traces = _profile(ctx, args, path + ".trace.json", outputs)
+  if ctx.attr.resolve_loads:
+    args.add("--resolve_loads")
+  else:
+    # Loaded symbols are stubbed out, so only the file itself is read, and
+    # its action does not rerun when other files change.
+    inputs = depset([source])
+  if ctx.attr.static_extraction:
+    args.add("--static_extraction")
+  args.add(source)
+  _run_skydoc(ctx, skydoc, args, inputs, outputs, "SkydocExtract",
+              "Extracting Skylark doc from %s" % source.short_path)
+  return extracted, traces
+
 def _skylark_doc_impl(ctx):
-  """Implementation of the skylark_doc rule."""
+  """Implementation of the skylark_doc rule.
+
+  Each source is extracted by its own action, so that it can be cached and
+  run in parallel, and only the sources that changed are extracted again. A
+  final action renders and zips the documentation of all of them.
+
+  The transitive sources are kept in a depset, which is never flattened, so
+  analysis time does not grow with the size of the skylark_library graph.
+  """
   skylark_doc_zip = ctx.outputs.skylark_doc_zip
   direct = []
   transitive = []
@@ -39,31 +122,45 @@ def _skylark_doc_impl(ctx):
   inputs = depset(order="postorder", direct=direct, transitive=transitive + [
       dep[SkylarkLibraryInfo].transitive_srcs for dep in ctx.attr.deps
   ])
-  sources = [source.path for source in direct]
-  flags = [
-      "--format=%s" % ctx.attr.format,
-      "--output_file=%s" % ctx.outputs.skylark_doc_zip.path,
-  ]
+  skydoc = _skydoc(ctx)
+  extracted = []
+  traces = []
+  for source in direct:
+    source_extracted, source_traces = _extract(ctx, skydoc, source, inputs)
+    extracted.append(source_extracted)
+    traces.extend(source_traces)
+
+  outputs = [skylark_doc_zip]
+  args = _skydoc_args(ctx)
+  args.add(ctx.attr.format, format = "--format=%s")
+  args.add(skylark_doc_zip, format = "--output_file=%s")
+  args.add("--from_extracted")
+  traces.extend(_profile(ctx, args, ctx.label.name + "-skydoc.trace.json",
+                         outputs))
   if ctx.attr.strip_prefix:
-    flags += ["--strip_prefix=%s" % ctx.attr.strip_prefix]
+    args.add(ctx.attr.strip_prefix, format = "--strip_prefix=%s")
   if ctx.attr.overview:
-    flags += ["--overview"]
+    args.add("--overview")
   if ctx.attr.overview_filename:
-    flags += ["--overview_filename=%s" % ctx.attr.overview_filename]
+    args.add(ctx.attr.overview_filename, format = "--overview_filename=%s")
   if ctx.attr.link_ext:
-    flags += ["--link_ext=%s" % ctx.attr.link_ext]
+    args.add(ctx.attr.link_ext, format = "--link_ext=%s")
   if ctx.attr.site_root:
-    flags += ["--site_root=%s" % ctx.attr.site_root]
-  skydoc = _skydoc(ctx)
-  ctx.action(
-      inputs = list(inputs) + [skydoc],
-      executable = skydoc,
-      arguments = flags + sources,
-      outputs = [skylark_doc_zip],
-      mnemonic = "Skydoc",
-      use_default_shell_env = True,
-      progress_message = ("Generating Skylark doc for %s (%d files)"
-                          % (ctx.label.name, len(sources))))
+    args.add(ctx.attr.site_root, format = "--site_root=%s")
+  if ctx.attr.shared_nav:
+    args.add("--shared_nav")
+  if ctx.attr.search_index:
+    args.add("--search_index")
+  if ctx.attr.split_threshold:
+    args.add(ctx.attr.split_threshold, format = "--split_threshold=%d")
+  if ctx.attr.export_formats:
+    args.add_joined(ctx.attr.export_formats, join_with = ",",
+                    format_joined = "--export_formats=%s")
+  args.add_all(extracted)
+  _run_skydoc(ctx, skydoc, args, depset(extracted), outputs,
+              "Skydoc", "Generating Skylark doc for %s (%d files)"
+              % (ctx.label.name, len(direct)))
+  return [OutputGroupInfo(skydoc_profile = depset(traces))]
 
 skylark_doc = rule(
     _skylark_doc_impl,
@@ -78,6 +175,13 @@ skylark_doc = rule(
         "overview_filename": attr.string(),
         "link_ext": attr.string(),
         "site_root": attr.string(),
+        "resolve_loads": attr.bool(default = False),
+        "static_extraction": attr.bool(default = False),
+        "shared_nav": attr.bool(default = False),
+        "search_index": attr.bool(default = False),
+        "split_threshold": attr.int(default = 0),
+        "export_formats": attr.string_list(),
+        "profile": attr.bool(default = False),
         "skydoc": attr.label(
             default = Label("//skydoc"),
             cfg = "host",
@@ -126,6 +230,33 @@ Args:
     `https://host.com/rules`, then by setting
     `site_root = "https://host.com/rules"`, all links will be prefixed with
     the site root, for example, `https://host.com/rules/index.html`.
+  resolve_loads: If set to `True`, symbols loaded by the `.bzl` files in `srcs`
+    are resolved by evaluating the files they are loaded from, which must be
+    provided through `srcs` or `deps`. This documents rules whose attributes
+    are defined in other files in full. Otherwise, loaded symbols are replaced
+    with empty strings.
+  static_extraction: If set to `True`, rules are extracted from the syntax tree
+    of the `.bzl` files in `srcs` without running them, whenever they only use
+    `rule()`, `repository_rule()`, `attr` and simple constants to define rules.
+  shared_nav: If set to `True` and `format` is `"html"`, the navigation listing
+    all rule sets is written once to `nav.js`, which every page loads, instead
+    of being repeated in every page.
+  search_index: If set to `True` and `format` is `"html"`, a search page,
+    `search.html`, is generated along with a prebuilt index of the rule sets,
+    rules and attributes it searches.
+  split_threshold: If positive, `.bzl` files defining more rules, macros and
+    repository rules than this are documented on an index page plus a page
+    for each of them, such as `foo/foo.html` and `foo/foo/foo_library.html`.
+  export_formats: Formats in which the extracted rules, macros and repository
+    rules are also written to the zip file, for other tools to consume:
+    `"binary"` writes `foo/foo.pb`, a serialized `BuildLanguage` proto,
+    `"json"` writes `foo/foo.json`, the same proto as JSON, and `"delimited"`
+    writes `extracted_files.pb`, a stream of length-delimited `ExtractedFile`
+    protos for all `.bzl` files. See `skydoc/build.proto`.
+  profile: If set to `True`, each action also writes a profile of the time
+    spent in each of its stages, in the Chrome trace event format, which
+    `chrome://tracing` loads. The traces are in the `skydoc_profile` output
+    group, which is built with `--output_groups=+skydoc_profile`.
 
 Outputs:
   skylark_doc_zip: A zip file containing the generated documentation.